@@ -1,17 +1,45 @@
 import sys
 import os
+import re
 import math
+import json
+import random
+import itertools
+import abc
+import bisect
+import shutil
+import hashlib
+import subprocess
+import wave
+import shlex
+import getpass
+import argparse
+import multiprocessing
+import concurrent.futures
+import threading
+import zlib
+import mmap
+import struct
+import zipfile
+import tarfile
+import ctypes
 import pygame
 import time
 from datetime import datetime
-from collections import deque
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton, 
+from collections import deque, OrderedDict, namedtuple
+from PyQt5.QtWidgets import (QApplication, QLabel, QPushButton, 
                              QVBoxLayout, QWidget, QHBoxLayout, QFrame, 
-                             QFileDialog, QSlider, QSpinBox, QGroupBox,
+                             QFileDialog, QSlider, QSpinBox, QDoubleSpinBox, QGroupBox,
                              QListWidget, QListWidgetItem, QMenu, QAction,
-                             QMessageBox, QInputDialog, QSizePolicy, QComboBox)
-from PyQt5.QtCore import Qt, QPoint, QTimer, QPropertyAnimation, QEasingCurve, QSize, QThread, pyqtSignal
-from PyQt5.QtGui import QPixmap, QPainter, QFont, QImageReader, QIcon, QTransform, QKeySequence, QImage
+                             QMessageBox, QInputDialog, QSizePolicy, QComboBox,
+                             QCheckBox, QDialog, QFormLayout, QDialogButtonBox,
+                             QProgressDialog)
+from PyQt5.QtCore import Qt, QRect, QRectF, QTimer, QPropertyAnimation, QEasingCurve, QSize, QThread, QObject, QUrl, QBuffer, pyqtSignal
+from PyQt5.QtGui import (QPixmap, QPainter, QFont, QImageReader, QIcon, QTransform, QKeySequence, QImage,
+                         QColor, QPen)
+from PyQt5.QtNetwork import QTcpServer, QHostAddress, QLocalServer, QLocalSocket, QAbstractSocket
+from PyQt5 import sip
+from frameless import FramelessWindow
 
 try:
     import piexif
@@ -19,80 +47,3323 @@ try:
 except ImportError:
     EXIF_SUPPORT = False
 
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+try:
+    # 共享内存需要 Python 3.8 以上，不支持时由主线程拼接
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_SUPPORT = True
+except ImportError:
+    SHARED_MEMORY_SUPPORT = False
+
+try:
+    import lz4.frame
+    LZ4_SUPPORT = True
+except ImportError:
+    LZ4_SUPPORT = False
+
+try:
+    # 色彩管理需要 Qt 5.14 以上
+    from PyQt5.QtGui import QColorSpace
+    COLOR_MANAGEMENT_SUPPORT = True
+except ImportError:
+    COLOR_MANAGEMENT_SUPPORT = False
+
 # 支持的音频格式列表
 SUPPORTED_AUDIO_FORMATS = ['.mp3', '.wav', '.ogg', '.flac', '.m4a']
 
-class ImageLoaderThread(QThread):
-    """图片加载线程，避免主线程阻塞"""
-    image_loaded = pyqtSignal(str, QPixmap)
+# 切换间隔范围（秒），滑块以0.1秒为单位
+MIN_SLIDE_INTERVAL = 0.1
+MAX_SLIDE_INTERVAL = 30.0
+
+# 在截止时间之前提前准备下一帧的时间（秒）
+FRAME_PREPARE_LEAD = 0.3
+
+# 背景音乐音量和曲目切换时的交叉淡入淡出时长（毫秒，0 表示无缝衔接）
+MUSIC_VOLUME = 0.5
+MUSIC_CROSSFADE_MS = 2000
+
+# 缓存目录（节拍分析结果等）
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ave_mujica_cache")
+
+# 节拍分析参数
+BEAT_SAMPLE_RATE = 22050  # 分析用的采样率
+BEAT_FRAME_SIZE = 1024  # FFT窗口大小
+BEAT_HOP_SIZE = 512  # 帧移
+BEAT_MIN_BPM = 60
+BEAT_MAX_BPM = 180
+
+# 过渡效果名称（命令行导出时也可使用英文别名）
+TRANSITION_TYPES = ["无", "淡入淡出", "从左滑动", "从右滑动", "从上滑动", "从下滑动"]
+TRANSITION_ALIASES = {
+    "none": "无", "fade": "淡入淡出",
+    "slide-left": "从左滑动", "slide-right": "从右滑动",
+    "slide-up": "从上滑动", "slide-down": "从下滑动",
+}
+
+# 播放顺序
+PLAYBACK_ORDERS = ["顺序播放", "随机播放", "加权随机(新图片优先)", "不重复随机"]
+NO_REPEAT_WINDOW = 50  # 不重复随机：最近多少张内不重复（不超过列表长度的一半）
+PRELOAD_AHEAD = 3  # 按播放顺序预加载后面几张
+PRELOAD_BEHIND = 3  # 保留前面几张，便于回退
+
+# 内存调节：根据系统可用内存和内存压力调整缓存大小、预加载深度和工作进程数
+MEMORY_CHECK_INTERVAL_MS = 2000
+DECODE_CACHE_SHARE = 0.25  # 图片缓存最多使用可用内存的比例
+COMPRESSED_CACHE_SHARE = 0.15  # 压缩缓存最多使用可用内存的比例（不超过总内存的10%）
+MIN_COMPRESSED_CACHE_BYTES = 32 * 1024 * 1024
+MIN_CACHE_FRAMES = 3
+MAX_CACHE_FRAMES = 256
+MAX_PRELOAD_AHEAD = 16
+WORKER_MEMORY_BYTES = 256 * 1024 * 1024  # 每个工作进程预留的内存
+MEMORY_LOW_RATIO = 0.1  # 可用内存低于总量的该比例时视为内存紧张
+MEMORY_PSI_THRESHOLD = 10.0  # PSI（最近10秒内存停顿时间百分比）超过该值时视为内存紧张
+PROCESS_RSS_RATIO = 0.5  # 本进程占用超过总内存的该比例时视为内存紧张
+
+# 批量处理：输出格式和断点续传的记录文件名
+BATCH_OUTPUT_FORMATS = ["保持原格式", "jpg", "png", "webp", "bmp", "tiff"]
+BATCH_JOURNAL_NAME = ".ave_mujica_batch.jsonl"
+
+# 第二级（压缩）图片缓存的容量（字节）
+COMPRESSED_CACHE_BYTES = 512 * 1024 * 1024
+# 文件大小不到解码后像素的 1/4 时（JPEG、WebP等）直接保存原文件内容，否则快速压缩像素
+ORIGINAL_BYTES_RATIO = 4
+
+# 磁盘帧缓存：按屏幕分辨率解码好的帧，重启后循环播放直接读取（超出容量时删除最久未使用的）
+FRAME_CACHE_DIR = os.path.join(CACHE_DIR, "frames")
+FRAME_CACHE_BYTES = 2 * 1024 * 1024 * 1024  # 最小容量，播放列表较长时按列表长度放大
+FRAME_CACHE_DISK_SHARE = 0.5  # 最多占用缓存所在磁盘剩余空间的比例
+FRAME_HEADER = struct.Struct('<4sIIII')  # 标识、宽、高、每行字节数、像素格式
+FRAME_HEADER_SIZE = 64  # 像素数据从对齐的位置开始
+FRAME_MAGIC = b'AMF1'
+
+# 缩略图缓存（查重、浏览等共用）
+THUMBNAIL_SIZE = 128
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbs")
+
+# 快速浏览（按住方向键、滚轮、拖动进度条）：两次导航间隔小于该值时进入快速浏览，
+# 只显示缓存的帧或缩略图，停止操作后再渲染完整画质
+SCRUB_TRIGGER_MS = 150
+SCRUB_SETTLE_MS = 250
+SCRUB_FRAME_MS = 16  # 最多每帧渲染一次，中间的图片直接跳过
+SCRUB_THUMBNAIL_CACHE = 1024  # 内存中保留的缩略图数量
+
+# 联系表：默认列数、每页行数和格子大小（像素），每个进程任务绘制的缩略图数
+CONTACT_SHEET_COLUMNS = 40
+CONTACT_SHEET_ROWS = 40
+CONTACT_SHEET_PADDING = 4
+CONTACT_SHEET_CELL = THUMBNAIL_SIZE + 2 * CONTACT_SHEET_PADDING  # 缩略图无需再缩放
+CONTACT_SHEET_BATCH = 256
+CONTACT_SHEET_BACKGROUND = 24
+CONTACT_SHEET_DIR = os.path.join(CACHE_DIR, "sheets")
+CONTACT_SHEET_CACHE_BYTES = 1024 * 1024 * 1024  # 作为播放列表打开的联系表最多占用的磁盘空间
+
+# 重复图片检测：感知哈希的最大汉明距离，以及每个进程任务处理的图片数
+DUPLICATE_MAX_DISTANCE = 4
+HASH_BATCH_SIZE = 64
+
+# 相似图片搜索：颜色直方图（每通道分级数）+ 缩略图布局（灰度网格边长）组成的特征向量
+SIMILARITY_HISTOGRAM_LEVELS = 4
+SIMILARITY_GRID = 8
+SIMILARITY_DIMENSIONS = SIMILARITY_HISTOGRAM_LEVELS ** 3 + SIMILARITY_GRID ** 2
+SIMILARITY_COLOR_WEIGHT = 0.5  # 颜色直方图在相似度中的权重，其余为构图布局
+SIMILARITY_RESULTS = 200  # “类似”播放列表最多包含的图片数
+SIMILARITY_INDEX_DIR = os.path.join(CACHE_DIR, "similarity")
+
+# 播放列表按范围筛选的预设区间 {字段: (菜单名称, [(名称, (最小值, 最大值))])}，边界值包含在内
+RANGE_FILTERS = {
+    "pixels": ("尺寸", [
+        ("小于 1 百万像素", (None, 1000000 - 1)),
+        ("1-4 百万像素", (1000000, 4000000 - 1)),
+        ("4-12 百万像素", (4000000, 12000000 - 1)),
+        ("12 百万像素以上", (12000000, None)),
+    ]),
+    "size": ("文件大小", [
+        ("小于 500 KB", (None, 500 * 1024 - 1)),
+        ("500 KB - 5 MB", (500 * 1024, 5 * 1024 * 1024 - 1)),
+        ("5 MB 以上", (5 * 1024 * 1024, None)),
+    ]),
+}
+
+# 常见图片格式的文件头特征 (偏移, 字节, 格式)
+IMAGE_SIGNATURES = [
+    (0, b'\xff\xd8\xff', "jpeg"),
+    (0, b'\x89PNG\r\n\x1a\n', "png"),
+    (0, b'GIF87a', "gif"),
+    (0, b'GIF89a', "gif"),
+    (0, b'BM', "bmp"),
+    (0, b'II*\x00', "tiff"),
+    (0, b'MM\x00*', "tiff"),
+    (8, b'WEBP', "webp"),
+    (0, b'\x00\x00\x01\x00', "ico"),
+]
+
+# BMP 只有两个字节的特征，还要检查文件头：信息头大小为已知值，像素数据位于文件头和信息头之后
+BMP_FILE_HEADER = struct.Struct('<2sI4xII')  # 标识、文件大小、（保留）、像素数据偏移、信息头大小
+BMP_INFO_HEADER_SIZES = {12, 16, 40, 52, 56, 64, 108, 124}
+
+# 拖放导入：每批送回界面的最多图片数和最长间隔（秒）
+DROP_BATCH_SIZE = 500
+DROP_BATCH_INTERVAL = 0.2
+PLAYLIST_FILE_EXTENSIONS = ('.txt', '.m3u', '.m3u8')
+
+# 压缩包播放列表：图片的虚拟路径为 "压缩包路径::成员路径"，不解压到磁盘
+ARCHIVE_SEPARATOR = "::"
+ARCHIVE_EXTENSIONS = ('.zip', '.cbz', '.tar', '.cbt')
+ARCHIVE_INDEX_DIR = os.path.join(CACHE_DIR, "archives")
+IMAGE_HEADER_PROBE_BYTES = 64 * 1024  # 只需要图片头（尺寸、格式）时读取的字节数
+TAR_MEMBER = -1  # 成员索引中表示tar成员（偏移为数据位置）
+
+# 已读取的成员索引 {(压缩包路径, 修改时间, 大小): {成员路径: (偏移, 压缩后大小, 大小, 压缩方式)}}
+archive_indexes = {}
+archive_index_lock = threading.Lock()
+
+ImageStat = namedtuple('ImageStat', ['st_mtime', 'st_mtime_ns', 'st_size'])
+
+# 格式校验：并行读取文件头的线程数，少于该数量的文件直接在当前线程校验
+SNIFF_WORKERS = 8
+SNIFF_PARALLEL_THRESHOLD = 32
+
+# 校验结果缓存 {(路径, 修改时间, 大小): 格式}，空字符串表示无法使用的文件；超过上限时丢弃最久未用的
+FORMAT_VERDICT_LIMIT = 50000
+format_verdicts = OrderedDict()
+format_verdict_lock = threading.Lock()
+
+def split_archive_path(path):
+    """拆分虚拟路径，普通文件返回 (None, 路径)；文件名本身含有分隔符时以确实是压缩包的前缀为准"""
+    start = path.find(ARCHIVE_SEPARATOR)
+    while start != -1:
+        archive = path[:start]
+        if is_archive_file(archive):
+            return archive, path[start + len(ARCHIVE_SEPARATOR):]
+        start = path.find(ARCHIVE_SEPARATOR, start + 1)
+    return None, path
+
+def is_archive_file(path):
+    """是否为支持的压缩包文件"""
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+def build_archive_index(archive):
+    """读取压缩包目录（zip的中央目录或tar的文件头），只记录图片成员"""
+    supported = tuple('.' + fmt.data().decode().lower() for fmt in QImageReader.supportedImageFormats())
+    members = {}
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                # 跳过目录、加密的成员和非图片文件
+                if info.is_dir() or info.flag_bits & 0x1 or not info.filename.lower().endswith(supported):
+                    continue
+                members[info.filename] = (info.header_offset, info.compress_size, info.file_size, info.compress_type)
+    else:
+        # 只支持未压缩的tar，成员可以按偏移直接读取
+        with tarfile.open(archive, 'r:') as tf:
+            for info in tf:
+                if info.isfile() and info.name.lower().endswith(supported):
+                    members[info.name] = (info.offset_data, info.size, info.size, TAR_MEMBER)
+    return members
+
+def archive_index(archive):
+    """取得压缩包的成员索引：依次查内存、磁盘缓存，最后才读取压缩包目录"""
+    stat = os.stat(archive)
+    key = (archive, stat.st_mtime_ns, stat.st_size)
+    with archive_index_lock:
+        index = archive_indexes.get(key)
+    if index is not None:
+        return index
+    
+    digest = hashlib.sha1(f"{archive}|{stat.st_mtime_ns}|{stat.st_size}".encode('utf-8')).hexdigest()
+    cache_path = os.path.join(ARCHIVE_INDEX_DIR, digest + ".json")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            index = {name: tuple(entry) for name, entry in json.load(f).items()}
+    except (OSError, ValueError):
+        index = build_archive_index(archive)
+        try:
+            os.makedirs(ARCHIVE_INDEX_DIR, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+    
+    with archive_index_lock:
+        archive_indexes[key] = index
+    return index
+
+def scan_archive(archive):
+    """列出压缩包中的图片，返回按文件名自然排序的虚拟路径"""
+    archive = os.path.abspath(archive)
+    try:
+        names = sorted(archive_index(archive), key=natural_sort_key)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        print(f"警告: 无法读取压缩包 {archive}: {e}")
+        return []
+    return [archive + ARCHIVE_SEPARATOR + name for name in names]
+
+def read_image_bytes(path, limit=None):
+    """读取图片文件或压缩包成员的内容，指定 limit 时只读取开头部分"""
+    archive, member = split_archive_path(path)
+    if archive is None:
+        with open(path, 'rb') as f:
+            return f.read() if limit is None else f.read(limit)
+    
+    entry = archive_index(archive).get(member)
+    if entry is None:
+        raise FileNotFoundError(path)
+    offset, compressed_size, size, method = entry
+    with open(archive, 'rb') as f:
+        if method != TAR_MEMBER:
+            # zip的数据在本地文件头之后，文件名和扩展字段长度以本地文件头为准
+            f.seek(offset)
+            name_length, extra_length = struct.unpack('<HH', f.read(30)[26:30])
+            offset += 30 + name_length + extra_length
+        f.seek(offset)
+        
+        if method in (TAR_MEMBER, zipfile.ZIP_STORED):
+            # 未压缩的成员直接按偏移读取需要的部分
+            return f.read(size if limit is None else min(limit, size))
+        if method == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-15)
+            if limit is None:
+                return decompressor.decompress(f.read(compressed_size))
+            # 只需要开头时逐块解压，够了就停止
+            data = b''
+            remaining = compressed_size
+            while len(data) < limit and remaining > 0:
+                chunk = f.read(min(IMAGE_HEADER_PROBE_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data += decompressor.decompress(chunk)
+            return data[:limit]
+    
+    # 其他压缩方式（bzip2、lzma）交给zipfile
+    with zipfile.ZipFile(archive) as zf:
+        with zf.open(member) as f:
+            return f.read() if limit is None else f.read(limit)
+
+def image_stat(path):
+    """图片文件或压缩包成员的修改时间和大小（成员使用压缩包的修改时间）"""
+    archive, member = split_archive_path(path)
+    if archive is None:
+        return os.stat(path)
+    entry = archive_index(archive).get(member)
+    if entry is None:
+        raise FileNotFoundError(path)
+    stat = os.stat(archive)
+    return ImageStat(stat.st_mtime, stat.st_mtime_ns, entry[2])
+
+def image_exists(path):
+    """图片文件或压缩包成员是否存在"""
+    archive, member = split_archive_path(path)
+    if archive is None:
+        return os.path.exists(path)
+    try:
+        return member in archive_index(archive)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return False
+
+def image_reader(path, limit=None):
+    """创建QImageReader：普通文件直接读取，压缩包成员从内存读取（limit 指定时只读开头，用于读取图片头）"""
+    archive, _ = split_archive_path(path)
+    if archive is None:
+        return QImageReader(path)
+    try:
+        data = read_image_bytes(path, limit)
+    except (OSError, zlib.error, zipfile.BadZipFile, tarfile.TarError):
+        return QImageReader()
+    buffer = QBuffer()
+    buffer.setData(data)
+    reader = QImageReader(buffer)
+    reader.buffer = buffer  # 读取完成前保持缓冲区的引用
+    return reader
+
+def plausible_bmp_header(header):
+    """BMP文件头是否合理（以 BM 开头的其他文件大多通不过）"""
+    if len(header) < BMP_FILE_HEADER.size:
+        return False
+    _, file_size, pixel_offset, info_size = BMP_FILE_HEADER.unpack_from(header)
+    if info_size not in BMP_INFO_HEADER_SIZES or pixel_offset < 14 + info_size:
+        return False
+    # 文件大小字段有的程序写0，不为0时像素数据必须在文件范围内
+    return file_size == 0 or pixel_offset < file_size
+
+def sniff_image_format(path):
+    """根据文件头判断图片格式，无法识别时返回空字符串"""
+    try:
+        header = read_image_bytes(path, 32)
+    except (OSError, zlib.error, zipfile.BadZipFile, tarfile.TarError):
+        return ""
+    for offset, magic, fmt in IMAGE_SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            if fmt == "bmp" and not plausible_bmp_header(header):
+                return ""
+            return fmt
+    # 其他格式交给Qt的插件按内容判断
+    reader = image_reader(path, IMAGE_HEADER_PROBE_BYTES)
+    reader.setDecideFormatFromContent(True)
+    return reader.format().data().decode().lower() if reader.canRead() else ""
+
+# 显示用的色彩空间（Qt5 无法获取显示器的ICC配置文件，按sRGB显示器处理）
+DISPLAY_COLOR_SPACE = QColorSpace(QColorSpace.SRgb) if COLOR_MANAGEMENT_SUPPORT else None
+
+# 高位深的像素格式：色彩转换在高位深下进行，转换完成后才量化为8位
+# （64位和16位灰度格式在较早的Qt中不存在，按名称查找，缺少的跳过）
+HIGH_BIT_DEPTH_FORMATS = {
+    getattr(QImage, name) for name in (
+        "Format_RGBX64", "Format_RGBA64", "Format_RGBA64_Premultiplied",
+        "Format_Grayscale16", "Format_BGR30", "Format_A2BGR30_Premultiplied",
+        "Format_RGB30", "Format_A2RGB30_Premultiplied",
+    ) if hasattr(QImage, name)
+} if COLOR_MANAGEMENT_SUPPORT else set()
+
+# 已创建的色彩转换 {ICC配置文件的SHA1: QColorTransform}，每个配置文件只创建一次
+color_transforms = {}
+
+def color_transform_for(color_space):
+    """取得从图片色彩空间到显示色彩空间的转换（按ICC配置文件缓存）"""
+    key = hashlib.sha1(bytes(color_space.iccProfile())).digest()
+    transform = color_transforms.get(key)
+    if transform is None:
+        transform = color_space.transformationToColorSpace(DISPLAY_COLOR_SPACE)
+        color_transforms[key] = transform
+    return transform
+
+def convert_for_display(image):
+    """把解码后的图片转换到显示色彩空间和显示用的像素格式（在工作线程中调用）"""
+    if image.isNull():
+        return image
+    alpha = image.hasAlphaChannel()
+    if COLOR_MANAGEMENT_SUPPORT:
+        color_space = image.colorSpace()
+        if color_space.isValid() and color_space != DISPLAY_COLOR_SPACE:
+            if image.format() in HIGH_BIT_DEPTH_FORMATS:
+                image = image.convertToFormat(QImage.Format_RGBA64 if alpha else QImage.Format_RGBX64)
+            elif image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32):
+                image = image.convertToFormat(QImage.Format_ARGB32 if alpha else QImage.Format_RGB32)
+            image.applyColorTransform(color_transform_for(color_space))
+    
+    # 转为QPixmap可以直接使用的格式，16位图片在这里（工作线程中）降为8位
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied if alpha else QImage.Format_RGB32)
+    if COLOR_MANAGEMENT_SUPPORT:
+        image.setColorSpace(DISPLAY_COLOR_SPACE)
+    return image
+
+def frame_cache_path(path, max_size):
+    """磁盘帧缓存路径，按文件路径、修改时间、大小和目标尺寸计算"""
+    stat = image_stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{max_size.width()}x{max_size.height()}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(FRAME_CACHE_DIR, digest[:2], digest + ".frame")
+
+def read_cached_frame(cache_path):
+    """通过内存映射读取缓存的帧，失败时返回None
+    
+    不是零拷贝：像素从页缓存复制一次到图片（省去 read() 的中间缓冲区），之后即可释放映射
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, width, height, bytes_per_line, fmt = FRAME_HEADER.unpack_from(mapped)
+                if magic != FRAME_MAGIC or len(mapped) != FRAME_HEADER_SIZE + bytes_per_line * height:
+                    return None
+                pixels = memoryview(mapped)[FRAME_HEADER_SIZE:]
+                try:
+                    # 图片直接引用映射的内存，复制一次后即可释放映射
+                    image = QImage(sip.voidptr(pixels), width, height, bytes_per_line, QImage.Format(fmt)).copy()
+                finally:
+                    pixels.release()
+        # 更新修改时间，供容量超出时按最近使用顺序删除
+        os.utime(cache_path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if COLOR_MANAGEMENT_SUPPORT and not image.isNull():
+        image.setColorSpace(DISPLAY_COLOR_SPACE)
+    return None if image.isNull() else image
+
+# 磁盘帧缓存的占用：第一次写入时统计一次，之后随写入累加，超出容量时才重新扫描目录
+frame_cache_lock = threading.Lock()
+frame_cache_usage = {"bytes": None, "limit": FRAME_CACHE_BYTES}
+
+def set_frame_cache_limit(frame_count, frame_bytes):
+    """按播放列表长度设置磁盘帧缓存容量：尽量放下整个播放列表，至少为默认容量，但始终不超过磁盘剩余空间的一定比例"""
+    limit = max(FRAME_CACHE_BYTES, int(frame_count * frame_bytes * 1.1))
+    try:
+        os.makedirs(FRAME_CACHE_DIR, exist_ok=True)
+        free = shutil.disk_usage(FRAME_CACHE_DIR).free
+    except OSError:
+        free = None  # 无法得知剩余空间时按上面的容量
+    with frame_cache_lock:
+        if free is not None:
+            # 磁盘空间的限制最后应用，磁盘快满时缓存也不会撑到默认容量
+            limit = min(limit, int((free + (frame_cache_usage["bytes"] or 0)) * FRAME_CACHE_DISK_SHARE))
+        frame_cache_usage["limit"] = limit
+        return limit
+
+def write_cached_frame(cache_path, image):
+    """把帧以原始像素写入磁盘缓存（先写临时文件再改名），累计占用，超出容量时清理"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        try:
+            replaced = os.stat(cache_path).st_size
+        except OSError:
+            replaced = 0
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        header = FRAME_HEADER.pack(FRAME_MAGIC, image.width(), image.height(),
+                                   image.bytesPerLine(), int(image.format()))
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(header.ljust(FRAME_HEADER_SIZE, b'\0'))
+            f.write(bits)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"警告: 无法写入帧缓存: {e}")
+        return
+    with frame_cache_lock:
+        if frame_cache_usage["bytes"] is None:
+            frame_cache_usage["bytes"] = sum(size for _, size, _ in scan_cache_dir(FRAME_CACHE_DIR, ".frame"))
+        else:
+            frame_cache_usage["bytes"] += FRAME_HEADER_SIZE + image.sizeInBytes() - replaced
+        if frame_cache_usage["bytes"] > frame_cache_usage["limit"]:
+            frame_cache_usage["bytes"] = trim_cache_dir(FRAME_CACHE_DIR, ".frame", frame_cache_usage["limit"])
+
+def scan_cache_dir(directory, suffix=""):
+    """列出磁盘缓存目录中的文件 [(最后使用时间, 字节数, 路径)]"""
+    entries = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(suffix) and not name.endswith(".tmp"):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+def trim_cache_dir(directory, suffix, max_bytes, keep_dirs=()):
+    """磁盘缓存超出容量时，删除最久未使用的文件直到容量的90%，返回清理后的占用（keep_dirs 中的文件不删除）"""
+    entries = scan_cache_dir(directory, suffix)
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return total
+    entries.sort()
+    keep_dirs = {os.path.normpath(path) for path in keep_dirs}
+    for _, size, path in entries:
+        if total <= max_bytes * 0.9:
+            break
+        if os.path.dirname(path) in keep_dirs:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+def load_display_image(path, max_size=None):
+    """读取可直接显示的图片：优先使用磁盘帧缓存，未命中时按目标尺寸解码、转换色彩并写入缓存"""
+    if max_size is None:
+        return convert_for_display(load_qimage(path))
+    try:
+        cache_path = frame_cache_path(path, max_size)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return QImage()
+    image = read_cached_frame(cache_path)
+    if image is not None:
+        return image
+    image = convert_for_display(load_qimage(path, max_size))
+    if not image.isNull():
+        write_cached_frame(cache_path, image)
+    return image
+
+def read_memory_status():
+    """读取系统内存状态（总量、可用量、PSI内存压力、本进程常驻内存），无法读取时返回None"""
+    status = {"pressure": 0.0, "rss": 0}
+    if os.path.exists('/proc/meminfo'):
+        meminfo = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                meminfo[key] = int(value.split()[0]) * 1024
+        status["total"] = meminfo["MemTotal"]
+        status["available"] = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+        
+        # 容器（cgroup v2）中以内存限制为准
+        try:
+            with open('/sys/fs/cgroup/memory.max') as f:
+                limit = f.read().strip()
+            with open('/sys/fs/cgroup/memory.current') as f:
+                current = int(f.read())
+            if limit != "max" and int(limit) < status["total"]:
+                status["total"] = int(limit)
+                status["available"] = min(status["available"], max(0, int(limit) - current))
+        except (OSError, ValueError):
+            pass
+        
+        # PSI：some avg10 为最近10秒内有任务因内存不足而停顿的时间百分比
+        try:
+            with open('/proc/pressure/memory') as f:
+                for line in f:
+                    if line.startswith("some"):
+                        status["pressure"] = float(line.split("avg10=")[1].split()[0])
+        except (OSError, IndexError, ValueError):
+            pass
+        
+        try:
+            with open('/proc/self/statm') as f:
+                status["rss"] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+        return status
+    
+    if sys.platform == 'win32':
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        
+        memory = MemoryStatus()
+        memory.dwLength = ctypes.sizeof(MemoryStatus)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memory)):
+            return None
+        status["total"] = memory.ullTotalPhys
+        status["available"] = memory.ullAvailPhys
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            status["rss"] = counters.WorkingSetSize
+        return status
+    return None
+
+class MemoryGovernor:
+    """根据内存状态计算缓存大小、预加载深度和工作进程数"""
+    
+    def __init__(self):
+        self.status = None
+        self.plan = None
+    
+    def under_pressure(self, status):
+        """内存是否紧张：可用内存过少、PSI停顿过多或本进程占用过大"""
+        return (status["available"] < status["total"] * MEMORY_LOW_RATIO
+                or status["pressure"] >= MEMORY_PSI_THRESHOLD
+                or status["rss"] > status["total"] * PROCESS_RSS_RATIO)
+    
+    def update(self, status, frame_bytes, cached_frames=0):
+        """根据内存状态、平均每帧大小和当前缓存的帧数计算新的设置"""
+        pressure = self.under_pressure(status)
+        available = status["available"]
+        
+        # 内存紧张时只保留很小的缓存，否则按可用内存分配
+        share = DECODE_CACHE_SHARE / 5 if pressure else DECODE_CACHE_SHARE
+        cache_size = int(available * share // max(1, frame_bytes))
+        cache_size = max(MIN_CACHE_FRAMES, min(MAX_CACHE_FRAMES, cache_size))
+        if pressure:
+            # 压力持续时每次检查都把缓存减半，直到最小值
+            cache_size = max(MIN_CACHE_FRAMES, min(cache_size, cached_frames // 2))
+        
+        # 预加载范围不能超过缓存大小，否则刚加载的图片会被立即移除
+        behind = min(PRELOAD_BEHIND, (cache_size - 1) // 3)
+        ahead = max(1, min(MAX_PRELOAD_AHEAD, cache_size - 1 - behind))
+        
+        if pressure:
+            compressed_bytes = MIN_COMPRESSED_CACHE_BYTES
+            workers = 1
+        else:
+            compressed_bytes = int(max(MIN_COMPRESSED_CACHE_BYTES,
+                                       min(available * COMPRESSED_CACHE_SHARE, status["total"] * 0.1)))
+            workers = max(1, min(os.cpu_count() or 1, int(available // WORKER_MEMORY_BYTES)))
+        
+        self.status = status
+        self.plan = {
+            "pressure": pressure,
+            "cache_size": cache_size,
+            "preload_ahead": ahead,
+            "preload_behind": behind,
+            "compressed_bytes": compressed_bytes,
+            "workers": workers,
+        }
+        return self.plan
+
+def verdict_key(path):
+    """校验结果的缓存键，文件被修改后重新校验"""
+    stat = image_stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+def validate_image_file(path):
+    """校验图片文件：文件头特征和图片头都要有效，返回格式（无效时为空字符串）"""
+    try:
+        key = verdict_key(path)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return ""
+    with format_verdict_lock:
+        verdict = format_verdicts.get(key)
+        if verdict is not None:
+            format_verdicts.move_to_end(key)
+    if verdict is None:
+        verdict = sniff_image_format(path)
+        # 文件头能识别但图片头已损坏（如截断的文件）同样视为无效
+        if verdict and not image_reader(path, IMAGE_HEADER_PROBE_BYTES).size().isValid():
+            verdict = ""
+        remember_verdict(key, verdict)
+    return verdict
+
+def remember_verdict(key, verdict):
+    """记录校验结果，超过上限时丢弃最久未用的记录"""
+    with format_verdict_lock:
+        format_verdicts[key] = verdict
+        format_verdicts.move_to_end(key)
+        while len(format_verdicts) > FORMAT_VERDICT_LIMIT:
+            format_verdicts.popitem(last=False)
+
+def validate_image_files(paths):
+    """并行校验多个文件，返回与输入一一对应的格式列表"""
+    if len(paths) < SNIFF_PARALLEL_THRESHOLD:
+        return [validate_image_file(path) for path in paths]
+    with concurrent.futures.ThreadPoolExecutor(SNIFF_WORKERS) as executor:
+        return list(executor.map(validate_image_file, paths))
+
+def quarantine_image_file(path):
+    """把解码失败的文件记为无效，以后扫描时直接排除"""
+    try:
+        remember_verdict(verdict_key(path), "")
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        pass
+
+def scan_image_folder(folder):
+    """列出文件夹中的图片文件（按文件头判断格式，不依赖扩展名）；压缩包按扩展名列出其中的图片"""
+    if is_archive_file(folder):
+        return scan_archive(folder)
+    candidates = []
+    for entry in os.scandir(folder):
+        if entry.is_file():
+            candidates.append(entry.path)
+    verdicts = validate_image_files(candidates)
+    return [path for path, verdict in zip(candidates, verdicts) if verdict]
+
+def read_playlist_file(path):
+    """读取播放列表文件（每行一个路径，# 开头为注释，兼容m3u）"""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    image_files = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                image_files.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return image_files
+
+def single_instance_name():
+    """单实例模式使用的本地套接字名称（每个用户一个）"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return "AveMujica-" + re.sub(r'\W', '_', user)
+
+def hand_off_to_running_instance(paths, timeout_ms=500):
+    """把打开请求转交给已在运行的实例，成功时返回True"""
+    socket = QLocalSocket()
+    socket.connectToServer(single_instance_name())
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    
+    command = {"cmd": "open", "paths": [os.path.abspath(path) for path in paths]}
+    socket.write((json.dumps(command, ensure_ascii=False) + "\n").encode('utf-8'))
+    if not socket.waitForBytesWritten(timeout_ms):
+        return False
+    # 等待应答行，确认请求已被处理；没有应答时由本实例自己打开
+    deadline = time.monotonic() + timeout_ms * 4 / 1000
+    while not socket.canReadLine():
+        remaining = int((deadline - time.monotonic()) * 1000)
+        if remaining <= 0 or not socket.waitForReadyRead(remaining):
+            socket.abort()
+            return False
+    socket.disconnectFromServer()
+    return True
+
+def local_server_alive(name, timeout_ms=200):
+    """本地套接字是否有实例在监听（异常退出留下的套接字文件无法连接）"""
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    alive = socket.waitForConnected(timeout_ms)
+    socket.abort()
+    return alive
+
+def load_qimage(path, max_size=None):
+    """读取图片（路径、压缩包成员或QIODevice），指定 max_size 时在解码阶段按比例缩小（JPEG可直接按DCT缩放）"""
+    reader = image_reader(path) if isinstance(path, str) else QImageReader(path)
+    if max_size is not None:
+        original = reader.size()
+        if original.isValid() and (original.width() > max_size.width() or original.height() > max_size.height()):
+            reader.setScaledSize(original.scaled(max_size, Qt.KeepAspectRatio))
+    return reader.read()
+
+def thumbnail_cache_path(path):
+    """缩略图缓存路径，按文件路径、修改时间和大小计算"""
+    stat = image_stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{THUMBNAIL_SIZE}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(THUMBNAIL_DIR, digest[:2], digest + ".jpg")
+
+def load_thumbnail(path):
+    """读取缩略图，优先使用磁盘缓存，未命中时缩小解码并写入缓存"""
+    try:
+        cache_path = thumbnail_cache_path(path)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return QImage()
+    
+    if os.path.exists(cache_path):
+        image = QImage(cache_path)
+        if not image.isNull():
+            return image
+    
+    image = convert_for_display(load_qimage(path, QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE)))
+    if not image.isNull():
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            if image.save(temp_path, "JPEG", 85):
+                os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+    return image
+
+def qimage_to_gray_array(image, width, height):
+    """把QImage缩放为指定大小的灰度数组"""
+    gray = image.convertToFormat(QImage.Format_Grayscale8).scaled(
+        width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    data = gray.constBits()
+    data.setsize(gray.bytesPerLine() * gray.height())
+    return np.frombuffer(data, dtype=np.uint8).reshape(gray.height(), gray.bytesPerLine())[:, :gray.width()].astype(np.float32)
+
+def qimage_to_rgb_array(image):
+    """把QImage转换为 (高, 宽, 3) 的RGB数组"""
+    rgb = image.convertToFormat(QImage.Format_RGB888)
+    data = rgb.constBits()
+    data.setsize(rgb.bytesPerLine() * rgb.height())
+    return np.frombuffer(data, dtype=np.uint8).reshape(rgb.height(), rgb.bytesPerLine())[:, :rgb.width() * 3].reshape(
+        rgb.height(), rgb.width(), 3)
+
+def render_contact_tiles(shm_name, shape, cell, tasks):
+    """把一批缩略图居中绘制到联系表的格子里（在进程池中运行）
+    
+    shm_name 为共享内存名称时直接写入整页数组并返回完成数量，为None时返回 [(格子序号, 图块数组)]
+    """
+    columns = shape[1] // cell
+    inner = cell - 2 * CONTACT_SHEET_PADDING
+    shm = shared_memory.SharedMemory(name=shm_name) if shm_name else None
+    tiles = []
+    try:
+        sheet = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf) if shm else None
+        for slot, path in tasks:
+            image = load_thumbnail(path)
+            if image.isNull():
+                continue
+            if image.width() > inner or image.height() > inner:
+                image = image.scaled(inner, inner, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            tile = qimage_to_rgb_array(image)
+            if sheet is None:
+                tiles.append((slot, tile.copy()))
+                continue
+            height, width = tile.shape[:2]
+            y = (slot // columns) * cell + (cell - height) // 2
+            x = (slot % columns) * cell + (cell - width) // 2
+            sheet[y:y + height, x:x + width] = tile
+        del sheet
+    finally:
+        if shm is not None:
+            shm.close()
+    return tiles if shm is None else len(tasks)
+
+def pack_bits(bits):
+    """把 (n, 64) 的布尔数组打包为 uint64 哈希"""
+    weights = np.left_shift(np.uint64(1), np.arange(64, dtype=np.uint64))
+    return (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+def popcount64(values):
+    """逐元素计算 uint64 的二进制1的个数"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+def hash_image_batch(paths):
+    """计算一批图片的 pHash 和 dHash（在进程池中运行），返回 [(路径, phash, dhash, 像素数)]"""
+    samples, diffs, results = [], [], []
+    for path in paths:
+        image = load_thumbnail(path)
+        if image.isNull():
+            continue
+        size = image_reader(path, IMAGE_HEADER_PROBE_BYTES).size()
+        samples.append(qimage_to_gray_array(image, 32, 32))
+        diffs.append(qimage_to_gray_array(image, 9, 8))
+        results.append((path, size.width() * size.height()))
+    if not results:
+        return []
+    
+    # pHash：32×32灰度图做二维DCT，取左上角8×8低频系数与中位数比较
+    n = np.arange(32)
+    dct = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / 64).astype(np.float32)
+    coefficients = dct @ np.stack(samples) @ dct.T
+    low = coefficients[:, :8, :8].reshape(len(results), 64)
+    median = np.median(low[:, 1:], axis=1)
+    phashes = pack_bits(low > median[:, None])
+    
+    # dHash：9×8灰度图中相邻像素的亮度梯度
+    gradients = np.stack(diffs)
+    dhashes = pack_bits((gradients[:, :, 1:] > gradients[:, :, :-1]).reshape(len(results), 64))
+    
+    return [(path, int(phash), int(dhash), pixels)
+            for (path, pixels), phash, dhash in zip(results, phashes, dhashes)]
+
+def image_embedding(image):
+    """计算缩略图的特征向量：颜色直方图和灰度布局分别归一化后按权重拼接，向量长度为1"""
+    pixels = qimage_to_rgb_array(image)
+    levels = (pixels.reshape(-1, 3) // (256 // SIMILARITY_HISTOGRAM_LEVELS)).astype(np.int64)
+    bins = (levels[:, 0] * SIMILARITY_HISTOGRAM_LEVELS + levels[:, 1]) * SIMILARITY_HISTOGRAM_LEVELS + levels[:, 2]
+    # 直方图取平方根后做点积即为 Bhattacharyya 系数，对少量颜色变化不敏感
+    histogram = np.sqrt(np.bincount(bins, minlength=SIMILARITY_HISTOGRAM_LEVELS ** 3).astype(np.float32))
+    layout = qimage_to_gray_array(image, SIMILARITY_GRID, SIMILARITY_GRID).ravel()
+    layout -= layout.mean()
+    
+    parts = []
+    for part, weight in ((histogram, SIMILARITY_COLOR_WEIGHT), (layout, 1.0 - SIMILARITY_COLOR_WEIGHT)):
+        norm = np.linalg.norm(part)
+        parts.append(part * (math.sqrt(weight) / norm) if norm > 0 else part)
+    return np.concatenate(parts)
+
+def embed_image_batch(paths):
+    """计算一批图片的相似度特征（在进程池中运行），返回 [(路径, 修改时间, 大小, 向量)]"""
+    results = []
+    for path in paths:
+        try:
+            stat = image_stat(path)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError):
+            continue
+        image = load_thumbnail(path)
+        if image.isNull():
+            continue
+        results.append((path, stat.st_mtime_ns, stat.st_size, image_embedding(image)))
+    return results
+
+def find_duplicate_groups(phashes, dhashes, max_distance=DUPLICATE_MAX_DISTANCE):
+    """用多索引哈希查找近似重复，返回索引分组列表"""
+    phashes = np.asarray(phashes, dtype=np.uint64)
+    dhashes = np.asarray(dhashes, dtype=np.uint64)
+    parent = list(range(len(phashes)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    
+    # 完全相同的pHash先合并，减少后续桶的大小
+    unique_hashes, first_index, inverse = np.unique(phashes, return_index=True, return_inverse=True)
+    for i, group in enumerate(inverse):
+        union(int(first_index[group]), i)
+    
+    # 把64位分成 max_distance+1 段：距离不超过阈值的两个哈希至少有一段完全相同
+    block_count = max_distance + 1
+    block_bits = -(-64 // block_count)
+    candidates_a, candidates_b = [], []
+    for block in range(block_count):
+        shift = np.uint64(block * block_bits)
+        mask = np.uint64((1 << min(block_bits, 64 - block * block_bits)) - 1)
+        keys = (unique_hashes >> shift) & mask
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # 按偏移量逐步配对同一桶内的元素
+        offset = 1
+        while offset < len(order):
+            same = sorted_keys[offset:] == sorted_keys[:-offset]
+            if not same.any():
+                break
+            candidates_a.append(order[:-offset][same])
+            candidates_b.append(order[offset:][same])
+            offset += 1
+    
+    if candidates_a:
+        a = first_index[np.concatenate(candidates_a)]
+        b = first_index[np.concatenate(candidates_b)]
+        # pHash在阈值内、dHash也接近才认为是重复
+        close = ((popcount64(phashes[a] ^ phashes[b]) <= max_distance) &
+                 (popcount64(dhashes[a] ^ dhashes[b]) <= max_distance * 2 + 2))
+        for i, j in zip(a[close].tolist(), b[close].tolist()):
+            union(i, j)
+    
+    groups = {}
+    for i in range(len(phashes)):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+def natural_sort_key(text):
+    """自然排序键：数字部分按数值比较（img2 排在 img10 之前）"""
+    return tuple(int(part) if part.isdigit() else part for part in re.split(r'(\d+)', text.lower()))
+
+def probe_image_metadata(path):
+    """读取图片的文件信息、尺寸（只读文件头）和相机型号"""
+    stat = image_stat(path)
+    size = image_reader(path, IMAGE_HEADER_PROBE_BYTES).size()
+    camera = ""
+    if EXIF_SUPPORT and split_archive_path(path)[0] is None and path.lower().endswith(('.jpg', '.jpeg', '.tif', '.tiff')):
+        try:
+            exif_data = piexif.load(path)
+            if "0th" in exif_data and piexif.ImageIFD.Model in exif_data["0th"]:
+                camera = exif_data["0th"][piexif.ImageIFD.Model].decode('utf-8', 'ignore').strip('\x00 ')
+        except Exception:
+            pass  # 忽略EXIF解析错误
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "width": max(0, size.width()),
+        "height": max(0, size.height()),
+        "camera": camera,
+    }
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """分块计算文件内容的SHA1，用作缓存键"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def decode_audio_chunks(path, chunk_frames=BEAT_SAMPLE_RATE * 10):
+    """分块解码音频为单声道float32，返回 (采样率, 分块迭代器)"""
+    # 优先使用ffmpeg流式解码，内存占用与文件长度无关
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        def ffmpeg_chunks():
+            proc = subprocess.Popen(
+                [ffmpeg, "-v", "quiet", "-i", path, "-f", "f32le", "-ac", "1",
+                 "-ar", str(BEAT_SAMPLE_RATE), "-"],
+                stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+            try:
+                while True:
+                    data = proc.stdout.read(chunk_frames * 4)
+                    if not data:
+                        break
+                    yield np.frombuffer(data[:len(data) // 4 * 4], dtype=np.float32)
+            finally:
+                proc.stdout.close()
+                proc.wait()
+        return BEAT_SAMPLE_RATE, ffmpeg_chunks()
+    
+    # WAV文件使用标准库逐块读取
+    if path.lower().endswith('.wav'):
+        wav = wave.open(path, 'rb')
+        sample_width = wav.getsampwidth()
+        channels = wav.getnchannels()
+        
+        def wav_chunks():
+            try:
+                while True:
+                    data = wav.readframes(chunk_frames)
+                    if not data:
+                        break
+                    yield pcm_to_mono(data, sample_width, channels)
+            finally:
+                wav.close()
+        return wav.getframerate(), wav_chunks()
+    
+    # 其他格式交给pygame解码，再按块切分
+    frequency, size, channels = pygame.mixer.get_init()
+    raw = pygame.mixer.Sound(path).get_raw()
+    sample_width = abs(size) // 8
+    step = chunk_frames * sample_width * channels
+    
+    def sound_chunks():
+        view = memoryview(raw)
+        for start in range(0, len(view), step):
+            yield pcm_to_mono(view[start:start + step], sample_width, channels)
+    return frequency, sound_chunks()
+
+def pcm_to_mono(data, sample_width, channels):
+    """把交错的PCM数据转换为单声道float32"""
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648
+    else:
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768
+    usable = len(samples) // channels * channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+def analyze_beats(path):
+    """分析音频的节拍网格，返回 {tempo, beats, duration}"""
+    sample_rate, chunks = decode_audio_chunks(path)
+    window = np.hanning(BEAT_FRAME_SIZE).astype(np.float32)
+    
+    # 逐块计算频谱通量（onset强度），块之间保留重叠部分和上一帧频谱
+    envelope = []
+    pending = np.zeros(0, dtype=np.float32)
+    previous_spectrum = None
+    total_samples = 0
+    for chunk in chunks:
+        total_samples += len(chunk)
+        pending = np.concatenate((pending, chunk))
+        frame_count = (len(pending) - BEAT_FRAME_SIZE) // BEAT_HOP_SIZE + 1
+        if frame_count <= 0:
+            continue
+        
+        frames = np.lib.stride_tricks.sliding_window_view(pending, BEAT_FRAME_SIZE)[::BEAT_HOP_SIZE][:frame_count]
+        spectrum = np.log1p(np.abs(np.fft.rfft(frames * window, axis=1)))
+        if previous_spectrum is not None:
+            spectrum_prev = np.vstack((previous_spectrum[None, :], spectrum[:-1]))
+        else:
+            spectrum_prev = np.vstack((spectrum[:1], spectrum[:-1]))
+        envelope.append(np.maximum(spectrum - spectrum_prev, 0).sum(axis=1))
+        
+        previous_spectrum = spectrum[-1]
+        pending = pending[frame_count * BEAT_HOP_SIZE:]
+    
+    duration = total_samples / sample_rate if sample_rate else 0.0
+    if not envelope:
+        return {"tempo": 0.0, "beats": [], "duration": duration}
+    
+    onset = np.concatenate(envelope)
+    onset = onset - onset.mean()
+    frame_rate = sample_rate / BEAT_HOP_SIZE
+    
+    # 自相关估计节拍周期，偏好120BPM附近
+    spectrum_size = 1 << int(np.ceil(np.log2(len(onset) * 2)))
+    corr = np.fft.irfft(np.abs(np.fft.rfft(onset, spectrum_size)) ** 2)[:len(onset)]
+    min_lag = max(1, int(frame_rate * 60 / BEAT_MAX_BPM))
+    max_lag = min(len(corr) - 1, int(frame_rate * 60 / BEAT_MIN_BPM))
+    if max_lag <= min_lag:
+        return {"tempo": 0.0, "beats": [], "duration": duration}
+    lags = np.arange(min_lag, max_lag + 1)
+    bpm = 60 * frame_rate / lags
+    prior = np.exp(-0.5 * (np.log2(bpm / 120)) ** 2)
+    peak = int(np.argmax(corr[min_lag:max_lag + 1] * prior)) + min_lag
+    
+    # 抛物线插值得到小数周期，长曲目中整数周期会累积相位误差
+    period = float(peak)
+    if min_lag < peak < max_lag:
+        left, center, right = corr[peak - 1], corr[peak], corr[peak + 1]
+        denominator = left - 2 * center + right
+        if denominator != 0:
+            period += 0.5 * (left - right) / denominator
+    
+    # 选择使节拍点上onset强度之和最大的相位
+    beat_count = int((len(onset) - 1) / period) + 1
+    phases = np.arange(int(np.ceil(period)))
+    grid = np.rint(phases[:, None] + np.arange(beat_count)[None, :] * period).astype(np.int64)
+    scores = np.where(grid < len(onset), onset[np.minimum(grid, len(onset) - 1)], 0).sum(axis=1)
+    grid = grid[int(np.argmax(scores))]
+    grid = grid[grid < len(onset)]
+    
+    # 每个节拍在小范围内对齐到局部峰值
+    radius = max(1, int(period) // 10)
+    offsets = np.arange(-radius, radius + 1)
+    candidates = np.clip(grid[:, None] + offsets[None, :], 0, len(onset) - 1)
+    beat_frames = candidates[np.arange(len(grid)), np.argmax(onset[candidates], axis=1)]
+    beats = (beat_frames * BEAT_HOP_SIZE + BEAT_FRAME_SIZE / 2) / sample_rate
+    
+    return {
+        "tempo": float(60 * frame_rate / period),
+        "beats": [round(float(t), 4) for t in beats],
+        "duration": duration,
+    }
+
+class ImageLoaderThread(QThread):
+    """图片加载线程，避免主线程阻塞"""
+    image_loaded = pyqtSignal(str, QImage)
+    image_failed = pyqtSignal(str)
+    
+    def __init__(self, image_paths, max_size=None):
+        super().__init__()
+        self.image_paths = image_paths
+        self.max_size = max_size  # 解码的目标尺寸（屏幕分辨率），同时用作磁盘帧缓存的键
+    
+    def run(self):
+        for path in self.image_paths:
+            if not image_exists(path):
+                continue
+                
+            # 使用QImage加载图片，效率更高；色彩转换和位深转换也在本线程完成
+            image = load_display_image(path, self.max_size)
+            if not image.isNull():
+                self.image_loaded.emit(path, image)
+            else:
+                self.image_failed.emit(path)
+            # 添加短暂延迟，避免过于频繁的信号发射
+            self.msleep(10)
+
+class CompressedFrameCache(QObject):
+    """第二级图片缓存：保存从图片缓存中移出的帧（原文件内容或快速压缩的像素），在后台线程中压缩和还原"""
+    frame_restored = pyqtSignal(str, QImage)
+    
+    def __init__(self, max_bytes=COMPRESSED_CACHE_BYTES):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # {路径: ((路径, 修改时间, 大小), 类型, 数据, 宽, 高, 每行字节数, 格式)}，按最近使用排序
+        self.total_bytes = 0
+        self.pending = set()  # 正在还原的路径
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(2)
+    
+    def __contains__(self, path):
+        with self.lock:
+            return path in self.entries
+    
+    def demote(self, path, image):
+        """把移出第一级缓存的帧放入本缓存（压缩在后台线程中进行）"""
+        with self.lock:
+            if path in self.entries:
+                self.entries.move_to_end(path)
+                return
+        self.executor.submit(self.compress, path, image)
+    
+    def compress(self, path, image):
+        """压缩一帧并存入缓存，超出容量时移除最久未使用的帧"""
+        try:
+            version = verdict_key(path)
+            if version[2] * ORIGINAL_BYTES_RATIO < image.sizeInBytes():
+                entry = (version, "file", read_image_bytes(path), 0, 0, 0, 0)
+            else:
+                entry = None
+        except (OSError, zlib.error, zipfile.BadZipFile, tarfile.TarError):
+            return
+        if entry is None:
+            bits = image.constBits()
+            bits.setsize(image.sizeInBytes())
+            raw = bytes(bits)
+            data = lz4.frame.compress(raw) if LZ4_SUPPORT else zlib.compress(raw, 1)
+            entry = (version, "pixels", data, image.width(), image.height(), image.bytesPerLine(), int(image.format()))
+        
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= len(old[2])
+            self.entries[path] = entry
+            self.total_bytes += len(entry[2])
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted[2])
+    
+    def decode(self, entry, max_size=None):
+        """把缓存的数据还原为图片，原文件内容按目标尺寸解码"""
+        _, kind, data, width, height, bytes_per_line, fmt = entry
+        if kind == "file":
+            buffer = QBuffer()
+            buffer.setData(data)
+            return convert_for_display(load_qimage(buffer, max_size))
+        raw = lz4.frame.decompress(data) if LZ4_SUPPORT else zlib.decompress(data)
+        return QImage(raw, width, height, bytes_per_line, QImage.Format(fmt)).copy()
+    
+    def lookup(self, path):
+        """查找缓存的帧并记录命中率，返回数据或None（文件已被修改时丢弃旧的帧）"""
+        try:
+            version = verdict_key(path)
+        except (OSError, zipfile.BadZipFile, tarfile.TarError):
+            version = None
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] != version:
+                del self.entries[path]
+                self.total_bytes -= len(entry[2])
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry
+    
+    def restore(self, path, max_size=None):
+        """在当前线程中还原一帧，未命中时返回None"""
+        entry = self.lookup(path)
+        if entry is None:
+            return None
+        image = self.decode(entry, max_size)
+        return None if image.isNull() else image
+    
+    def promote(self, path, max_size=None):
+        """在后台线程中还原一帧，完成后发出 frame_restored 信号；未命中时返回False"""
+        if path in self.pending:
+            return True
+        entry = self.lookup(path)
+        if entry is None:
+            return False
+        self.pending.add(path)
+        
+        def task():
+            try:
+                image = self.decode(entry, max_size)
+            finally:
+                self.pending.discard(path)
+            if not image.isNull():
+                self.frame_restored.emit(path, image)
+        self.executor.submit(task)
+        return True
+    
+    def resize(self, max_bytes):
+        """调整容量，超出时移除最久未使用的帧"""
+        with self.lock:
+            self.max_bytes = max_bytes
+            while self.total_bytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted[2])
+    
+    def discard(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry is not None:
+                self.total_bytes -= len(entry[2])
+    
+    def stats(self):
+        """缓存统计"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "frames": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "codec": "lz4" if LZ4_SUPPORT else "zlib",
+            }
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+class ThumbnailLoader(QObject):
+    """在后台生成缩略图，只处理最近请求的图片，完成后发出 thumbnail_ready 信号"""
+    thumbnail_ready = pyqtSignal(str, QImage)
+    
+    WANTED_LIMIT = 64
+    
+    def __init__(self, workers=2):
+        super().__init__()
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.pending = set()
+        self.wanted = deque(maxlen=self.WANTED_LIMIT)  # 最近请求的图片，更早的请求已经过时
+        self.lock = threading.Lock()
+    
+    def request(self, paths):
+        for path in paths:
+            with self.lock:
+                self.wanted.append(path)
+                if path in self.pending:
+                    continue
+                self.pending.add(path)
+            self.executor.submit(self.load, path)
+    
+    def load(self, path):
+        try:
+            with self.lock:
+                wanted = path in self.wanted
+            image = load_thumbnail(path) if wanted else QImage()
+        finally:
+            with self.lock:
+                self.pending.discard(path)
+        if not image.isNull():
+            self.thumbnail_ready.emit(path, image)
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+class DropIngestThread(QThread):
+    """拖放导入线程：展开文件夹和列表文件，按文件头校验格式，分批送回界面"""
+    batch_ready = pyqtSignal(str, list)
+    ingest_finished = pyqtSignal(str, int, int)
+    
+    def __init__(self, playlist_name, paths, known_paths):
+        super().__init__()
+        self.playlist_name = playlist_name
+        self.paths = paths
+        self.known_paths = known_paths  # 播放列表中已有的图片，不重复添加
+        self.duplicates = 0  # 送回时已被同时进行的其他导入添加的图片（由界面线程统计）
+        self.cancelled = False
+    
+    def expand(self, path, depth=0):
+        """把文件夹和列表文件展开成候选文件 (路径, 是否需要校验)，压缩包成员已按扩展名筛选，与扫描文件夹时一样不再逐个校验"""
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort(key=natural_sort_key)
+                for name in sorted(files, key=natural_sort_key):
+                    file_path = os.path.join(root, name)
+                    if is_archive_file(file_path):
+                        yield from ((member, False) for member in scan_archive(file_path))
+                    else:
+                        yield file_path, True
+        elif is_archive_file(path):
+            yield from ((member, False) for member in scan_archive(path))
+        elif path.lower().endswith(PLAYLIST_FILE_EXTENSIONS) and depth == 0:
+            try:
+                entries = read_playlist_file(path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"警告: 无法读取列表文件 {path}: {e}")
+                return
+            for entry in entries:
+                yield from self.expand(entry, depth + 1)
+        else:
+            yield path, True
+    
+    def run(self):
+        added = 0
+        rejected = 0
+        batch = []
+        last_emit = time.monotonic()
+        seen = set(self.known_paths)
+        candidates = (candidate for source in self.paths for candidate in self.expand(os.path.abspath(source)))
+        with concurrent.futures.ThreadPoolExecutor(SNIFF_WORKERS) as executor:
+            while True:
+                # 每次取一组候选文件并行校验
+                chunk = []
+                for path, check in candidates:
+                    if self.cancelled:
+                        break
+                    if path not in seen:
+                        seen.add(path)
+                        chunk.append((path, check))
+                        if len(chunk) >= SNIFF_PARALLEL_THRESHOLD:
+                            break
+                if not chunk or self.cancelled:
+                    break
+                checked = [path for path, check in chunk if check]
+                verdicts = dict(zip(checked, executor.map(validate_image_file, checked)))
+                for path, check in chunk:
+                    if not check or verdicts[path]:
+                        batch.append(path)
+                    else:
+                        rejected += 1
+                
+                # 分批送回，避免一次拖入几千张时界面卡顿
+                now = time.monotonic()
+                if len(batch) >= DROP_BATCH_SIZE or (batch and now - last_emit >= DROP_BATCH_INTERVAL):
+                    self.batch_ready.emit(self.playlist_name, batch)
+                    added += len(batch)
+                    batch = []
+                    last_emit = now
+        if self.cancelled:
+            return
+        if batch:
+            self.batch_ready.emit(self.playlist_name, batch)
+            added += len(batch)
+        self.ingest_finished.emit(self.playlist_name, added, rejected)
+
+class BeatAnalysisThread(QThread):
+    """节拍分析线程，结果按文件内容哈希缓存到磁盘"""
+    analysis_finished = pyqtSignal(str, dict)
+    
+    def __init__(self, music_file):
+        super().__init__()
+        self.music_file = music_file
+    
+    def run(self):
+        try:
+            cache_path = os.path.join(CACHE_DIR, "beats", file_content_hash(self.music_file) + ".json")
+            if os.path.exists(cache_path):
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+            else:
+                result = analyze_beats(self.music_file)
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                temp_path = cache_path + ".tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(result, f)
+                os.replace(temp_path, cache_path)
+            self.analysis_finished.emit(self.music_file, result)
+        except Exception as e:
+            print(f"节拍分析失败: {e}")
+
+class TrackDecoderThread(QThread):
+    """音乐预解码线程，提前把即将播放的曲目解码到内存缓冲"""
+    track_decoded = pyqtSignal(int, object)
+    
+    def __init__(self, index, path):
+        super().__init__()
+        self.index = index
+        self.path = path
+    
+    def run(self):
+        try:
+            sound = pygame.mixer.Sound(self.path)
+        except Exception as e:
+            print(f"预解码音乐失败 {os.path.basename(self.path)}: {e}")
+            sound = None
+        self.track_decoded.emit(self.index, sound)
+
+class BackgroundAudioEngine(QObject):
+    """背景音乐引擎：按队列播放，后台预解码下一首，在Channel上无缝或交叉淡入淡出切换"""
+    track_changed = pyqtSignal(str)
+    
+    def __init__(self, tracks, volume=MUSIC_VOLUME, crossfade_ms=MUSIC_CROSSFADE_MS):
+        super().__init__()
+        self.tracks = list(tracks)
+        self.volume = volume
+        self.crossfade_ms = crossfade_ms
+        self.current = 0  # 当前曲目序号
+        self.channel = None  # 当前曲目所在的Channel，None表示使用music流播放
+        self.sounds = {}  # 已解码的曲目 {序号: Sound}
+        self.failed = set()  # 解码失败的曲目
+        self.decoders = {}  # 正在运行的解码线程
+        self.track_length = None  # 当前曲目时长(秒)，解码完成前未知
+        self.track_started = None  # 当前曲目开始播放的单调时间（已扣除暂停时长）
+        self.paused_at = None
+        self.pending_switch = False  # 无缝模式下已排队、等待切换记账
+        
+        self.transition_timer = QTimer(self)
+        self.transition_timer.setSingleShot(True)
+        self.transition_timer.setTimerType(Qt.PreciseTimer)
+        self.transition_timer.timeout.connect(self.on_transition_timer)
+    
+    def current_track(self):
+        return self.tracks[self.current]
+    
+    def next_index(self, index=None):
+        """下一首可播放曲目的序号"""
+        index = self.current if index is None else index
+        for offset in range(1, len(self.tracks) + 1):
+            candidate = (index + offset) % len(self.tracks)
+            if candidate not in self.failed:
+                return candidate
+        return None
+    
+    def start(self):
+        """开始播放，第一首直接流式播放，不等待解码"""
+        pygame.mixer.music.load(self.current_track())
+        pygame.mixer.music.set_volume(self.volume)
+        if len(self.tracks) == 1:
+            # 只有一首时保持单曲循环
+            pygame.mixer.music.play(-1)
+            return
+        
+        pygame.mixer.music.play()
+        self.track_started = time.monotonic()
+        # 后台解码当前曲目（得到时长）和下一首
+        self.request_decode(self.current)
+        self.request_decode(self.next_index())
+    
+    def request_decode(self, index):
+        """在后台线程中解码曲目"""
+        if index is None or index in self.sounds or index in self.decoders or index in self.failed:
+            return
+        thread = TrackDecoderThread(index, self.tracks[index])
+        thread.track_decoded.connect(self.on_track_decoded)
+        thread.finished.connect(lambda index=index: self.decoders.pop(index, None))
+        self.decoders[index] = thread
+        thread.start()
+    
+    def on_track_decoded(self, index, sound):
+        """曲目解码完成"""
+        if sound is None:
+            self.failed.add(index)
+            if index != self.current:
+                self.request_decode(self.next_index())
+            return
+        
+        self.sounds[index] = sound
+        if index == self.current and self.track_length is None:
+            self.track_length = sound.get_length()
+            self.schedule_transition()
+    
+    def position(self):
+        """当前曲目的播放位置(秒)"""
+        if self.track_started is None:
+            position = pygame.mixer.music.get_pos()
+            return position / 1000 if position >= 0 else None
+        return (self.paused_at or time.monotonic()) - self.track_started
+    
+    def schedule_transition(self):
+        """按当前曲目的剩余时长安排下一次切换"""
+        self.transition_timer.stop()
+        if self.track_length is None or self.paused_at is not None or len(self.tracks) == 1:
+            return
+        
+        remaining = self.track_length - self.position()
+        if self.pending_switch:
+            delay = remaining
+        elif self.crossfade_ms > 0:
+            delay = remaining - self.crossfade_ms / 1000
+        elif self.channel is not None:
+            # 无缝模式提前排队，由混音器在样本级衔接
+            delay = remaining - 0.5
+        else:
+            delay = remaining
+        self.transition_timer.start(max(0, round(delay * 1000)))
+    
+    def on_transition_timer(self):
+        if self.pending_switch:
+            # 排队的曲目已经开始播放，更新记账
+            self.pending_switch = False
+            self.begin_track(self.next_index(), self.channel, self.track_started + self.track_length)
+        else:
+            self.advance()
+    
+    def advance(self, fade_ms=None):
+        """切换到下一首"""
+        index = self.next_index()
+        if index is None:
+            return
+        sound = self.sounds.get(index)
+        if sound is None:
+            # 下一首尚未解码完成，稍后再试
+            self.request_decode(index)
+            self.transition_timer.start(200)
+            return
+        
+        fade_ms = self.crossfade_ms if fade_ms is None else fade_ms
+        if fade_ms == 0 and self.channel is not None and self.paused_at is None:
+            # 无缝衔接：排到同一Channel的队列中
+            self.channel.queue(sound)
+            self.pending_switch = True
+            self.schedule_transition()
+            return
+        
+        channel = pygame.mixer.find_channel(True)
+        channel.set_volume(self.volume)
+        channel.play(sound, fade_ms=fade_ms)
+        if self.channel is not None:
+            self.channel.fadeout(max(fade_ms, 1))
+        else:
+            pygame.mixer.music.fadeout(max(fade_ms, 1))
+        self.begin_track(index, channel, time.monotonic())
+    
+    def begin_track(self, index, channel, started):
+        """记录新曲目的播放状态，释放不再需要的缓冲并预解码下一首"""
+        self.current = index
+        self.channel = channel
+        self.track_started = started
+        self.track_length = self.sounds[index].get_length()
+        
+        following = self.next_index()
+        for cached in list(self.sounds):
+            if cached not in (index, following):
+                del self.sounds[cached]
+        self.request_decode(following)
+        
+        self.track_changed.emit(self.current_track())
+        self.schedule_transition()
+    
+    def skip(self):
+        """立即切换到下一首"""
+        if len(self.tracks) > 1 and not self.pending_switch and self.paused_at is None:
+            # 手动切换立即开始，至少短暂淡出以避免爆音
+            self.advance(fade_ms=max(self.crossfade_ms, 50))
+    
+    def pause(self):
+        pygame.mixer.music.pause()
+        pygame.mixer.pause()
+        self.paused_at = time.monotonic()
+        self.transition_timer.stop()
+    
+    def resume(self):
+        pygame.mixer.music.unpause()
+        pygame.mixer.unpause()
+        if self.paused_at is not None and self.track_started is not None:
+            self.track_started += time.monotonic() - self.paused_at
+        self.paused_at = None
+        self.schedule_transition()
+    
+    def stop(self):
+        self.transition_timer.stop()
+        pygame.mixer.music.stop()
+        pygame.mixer.stop()
+        for thread in list(self.decoders.values()):
+            thread.wait()
+
+class DuplicateScanThread(QThread):
+    """重复图片扫描线程：在进程池中计算感知哈希，再用多索引哈希分组"""
+    progress = pyqtSignal(int, int)
+    scan_finished = pyqtSignal(list)
+    
+    def __init__(self, image_paths, workers=None):
+        super().__init__()
+        self.image_paths = image_paths
+        self.workers = workers or os.cpu_count() or 1
+    
+    def run(self):
+        paths = list(dict.fromkeys(self.image_paths))
+        batches = [paths[i:i + HASH_BATCH_SIZE] for i in range(0, len(paths), HASH_BATCH_SIZE)]
+        records = []
+        done = 0
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = {executor.submit(hash_image_batch, batch): len(batch) for batch in batches}
+                for future in concurrent.futures.as_completed(futures):
+                    records.extend(future.result())
+                    done += futures[future]
+                    self.progress.emit(done, len(paths))
+        except Exception as e:
+            print(f"计算图片哈希失败: {e}")
+            self.scan_finished.emit([])
+            return
+        
+        groups = find_duplicate_groups([r[1] for r in records], [r[2] for r in records])
+        # 每组按像素数从大到小排列，第一张作为保留的原图
+        self.scan_finished.emit([
+            [records[i][0] for i in sorted(group, key=lambda i: -records[i][3])]
+            for group in groups
+        ])
+
+class SimilarityIndex:
+    """相似图片的特征向量索引：向量保存在磁盘上并按内存映射读取，查询时用一次矩阵乘法暴力搜索"""
+    
+    def __init__(self, directory=SIMILARITY_INDEX_DIR):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.entries_path = os.path.join(directory, "entries.json")
+        self.entries = []  # [(路径, 修改时间, 大小)]，与向量逐行对应
+        self.rows = {}  # 路径 -> 行号
+        self.vectors = np.zeros((0, SIMILARITY_DIMENSIONS), dtype=np.float32)
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def load(self):
+        """从磁盘读取索引，文件缺失、损坏或维度不符时从空索引开始"""
+        try:
+            with open(self.entries_path, 'r', encoding='utf-8') as f:
+                entries = [tuple(entry) for entry in json.load(f)]
+            vectors = np.load(self.vectors_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return
+        if vectors.shape != (len(entries), SIMILARITY_DIMENSIONS) or vectors.dtype != np.float32:
+            print("相似度索引与当前版本不一致，将重新建立")
+            return
+        self.entries = entries
+        self.rows = {entry[0]: row for row, entry in enumerate(entries)}
+        self.vectors = vectors
+    
+    def save(self):
+        """先写临时文件再替换，中途退出不会留下不完整的索引"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_vectors = f"{self.vectors_path}.{os.getpid()}.tmp"
+            with open(temp_vectors, 'wb') as f:
+                np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+            temp_entries = f"{self.entries_path}.{os.getpid()}.tmp"
+            with open(temp_entries, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(temp_vectors, self.vectors_path)
+            os.replace(temp_entries, self.entries_path)
+        except OSError as e:
+            print(f"保存相似度索引失败: {e}")
+            return
+        self.vectors = np.load(self.vectors_path, mmap_mode='r')
+    
+    def is_current(self, path, stat):
+        """索引中是否已有该图片当前版本的向量"""
+        row = self.rows.get(path)
+        return row is not None and self.entries[row][1:] == (stat.st_mtime_ns, stat.st_size)
+    
+    def update(self, records, removed=()):
+        """加入 embed_image_batch 的结果（已有的路径覆盖原来的向量）并删除 removed 中的条目
+        
+        整个矩阵只重新分配一次，调用方应把一次搜索中算出的所有结果合并后再调用
+        """
+        removed = set(removed)
+        if not records and not removed:
+            return
+        if removed:
+            keep = [row for row, entry in enumerate(self.entries) if entry[0] not in removed]
+            entries = [self.entries[row] for row in keep]
+        else:
+            keep = None
+            entries = list(self.entries)
+        rows = {entry[0]: row for row, entry in enumerate(entries)}
+        appended = [path for path in dict.fromkeys(record[0] for record in records) if path not in rows]
+        for path in appended:
+            rows[path] = len(entries)
+            entries.append(None)
+        
+        vectors = np.empty((len(entries), SIMILARITY_DIMENSIONS), dtype=np.float32)
+        kept = len(entries) - len(appended)
+        vectors[:kept] = self.vectors if keep is None else self.vectors[keep]
+        for path, mtime_ns, size, vector in records:
+            row = rows[path]
+            entries[row] = (path, mtime_ns, size)
+            vectors[row] = vector
+        
+        self.entries = entries
+        self.rows = rows
+        self.vectors = vectors
+    
+    def vector(self, path):
+        row = self.rows.get(path)
+        return None if row is None else np.asarray(self.vectors[row], dtype=np.float32)
+    
+    def rows_for(self, paths):
+        """路径对应的行号数组，不在索引中的为 -1"""
+        return np.fromiter((self.rows.get(path, -1) for path in paths), dtype=np.int64, count=len(paths))
+    
+    def search(self, query, rows, limit=SIMILARITY_RESULTS):
+        """在给定的行中查找与查询向量最相似的图片，返回按相似度从高到低排列的 [(路径, 相似度)]"""
+        rows = rows[rows >= 0]
+        if not len(rows):
+            return []
+        
+        # 向量长度均为1，点积即余弦相似度；对整个映射矩阵做一次矩阵向量乘法比按行取子集更快
+        scores = self.vectors @ np.asarray(query, dtype=np.float32)
+        
+        # 只在候选行中取前 limit 个，再对这部分排序
+        candidates = scores[rows]
+        if len(rows) > limit:
+            top = np.argpartition(-candidates, limit - 1)[:limit]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-candidates[top], kind='stable')]
+        return [(self.entries[row][0], float(score)) for row, score in zip(rows[top].tolist(), candidates[top].tolist())]
+
+class SimilaritySearchThread(QThread):
+    """相似图片搜索线程：在进程池中补齐索引缺少的向量并保存，然后查找与指定图片最相似的图片
+    
+    查询时只检查查询图片的版本；refresh 为True时整理整个索引（逐个检查文件，重新计算修改过的，移除已删除的），
+    query_path 为None时只整理不查询。
+    """
+    progress = pyqtSignal(int, int)
+    search_finished = pyqtSignal(str, list)
+    
+    def __init__(self, index, query_path, image_paths, workers=None, refresh=False):
+        super().__init__()
+        self.index = index
+        self.query_path = query_path
+        self.image_paths = list(dict.fromkeys(image_paths))
+        self.workers = workers or os.cpu_count() or 1
+        self.refresh = refresh
+    
+    def stale_entries(self):
+        """逐个检查候选图片和索引中所有条目，返回 (需要重新计算的, 已删除的)"""
+        stats = {}
+        for path in dict.fromkeys(itertools.chain(self.image_paths, (entry[0] for entry in self.index.entries))):
+            try:
+                stats[path] = image_stat(path)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError):
+                pass
+        missing = [path for path in self.image_paths
+                   if path in stats and not self.index.is_current(path, stats[path])]
+        dead = [entry[0] for entry in self.index.entries if entry[0] not in stats]
+        return missing, dead
+    
+    def run(self):
+        if not len(self.index):
+            self.index.load()
+        
+        if self.refresh:
+            missing, dead = self.stale_entries()
+        else:
+            # 几十万张图片时逐个检查文件要好几秒，查询时只计算尚未加入索引的图片，
+            # 已在索引中的图片修改或删除后由整理索引处理；查询图片本身必须是当前版本
+            missing = [path for path in self.image_paths if path not in self.index.rows]
+            dead = []
+            try:
+                if not self.index.is_current(self.query_path, image_stat(self.query_path)):
+                    missing.append(self.query_path)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError):
+                if self.query_path in self.index.rows:
+                    dead.append(self.query_path)
+            missing = list(dict.fromkeys(missing))
+        
+        records = []
+        if missing:
+            batches = [missing[i:i + HASH_BATCH_SIZE] for i in range(0, len(missing), HASH_BATCH_SIZE)]
+            done = 0
+            try:
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')) as executor:
+                    futures = {executor.submit(embed_image_batch, batch): len(batch) for batch in batches}
+                    for future in concurrent.futures.as_completed(futures):
+                        records.extend(future.result())
+                        done += futures[future]
+                        self.progress.emit(done, len(missing))
+                # 修改后无法再读取的图片不能继续使用旧向量
+                embedded = {record[0] for record in records}
+                dead.extend(path for path in missing if path in self.index.rows and path not in embedded)
+            except Exception as e:
+                print(f"计算图片特征失败: {e}")
+        
+        if records or dead:
+            self.index.update(records, dead)
+            self.index.save()
+        if self.query_path is None:
+            self.search_finished.emit("", [])
+            return
+        rows = self.index.rows_for(self.image_paths)
+        
+        query = self.index.vector(self.query_path)
+        if query is None:
+            self.search_finished.emit(self.query_path, [])
+            return
+        results = self.index.search(query, rows)
+        self.search_finished.emit(self.query_path, [path for path, score in results])
+
+class PlaylistIndexThread(QThread):
+    """播放列表索引线程：并行探测缺少的元数据，再建立索引并预先计算排序"""
+    progress = pyqtSignal(int, int)
+    index_ready = pyqtSignal(str, object, dict)
+    
+    def __init__(self, playlist_name, image_paths, known_metadata):
+        super().__init__()
+        self.playlist_name = playlist_name
+        self.image_paths = list(image_paths)
+        self.known_metadata = known_metadata  # {(路径, 修改时间, 大小): 信息}
+    
+    def run(self):
+        # 元数据按文件版本缓存，修改过的文件重新探测
+        keys = {}
+        for path in dict.fromkeys(self.image_paths):
+            try:
+                keys[path] = verdict_key(path)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError):
+                pass  # 无法读取的文件不参与排序和筛选
+        missing = [key for key in keys.values() if key not in self.known_metadata]
+        metadata = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {executor.submit(probe_image_metadata, key[0]): key for key in missing}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                try:
+                    metadata[futures[future]] = future.result()
+                except Exception:
+                    pass  # 无法读取的文件不参与排序和筛选
+                if done % 500 == 0:
+                    self.progress.emit(done, len(futures))
+        
+        combined = {}
+        for path, key in keys.items():
+            record = metadata.get(key) or self.known_metadata.get(key)
+            if record is not None:
+                combined[path] = record
+        index = PlaylistIndex(self.image_paths, combined)
+        for key in PlaylistIndex.SORT_KEYS:
+            index.sort_order(key)
+        self.index_ready.emit(self.playlist_name, index, metadata)
+
+class PlaylistIndex:
+    """播放列表索引：预先计算排序键和筛选索引，查询时不再访问文件系统"""
+    
+    # 可排序的字段
+    SORT_KEYS = {
+        "name": "名称",
+        "mtime": "修改时间",
+        "size": "文件大小",
+        "pixels": "尺寸",
+        "aspect": "宽高比",
+        "camera": "相机型号",
+    }
+    
+    # 方向分类
+    ORIENTATIONS = ["横向", "纵向", "方形", "未知"]
+    
+    def __init__(self, image_paths, metadata):
+        self.paths = list(image_paths)
+        empty = {"mtime": 0.0, "size": 0, "width": 0, "height": 0, "camera": ""}
+        records = [metadata.get(path, empty) for path in self.paths]
+        
+        # 列式存储的排序键
+        self.columns = {
+            "name": [natural_sort_key(os.path.basename(path)) for path in self.paths],
+            "mtime": [r["mtime"] for r in records],
+            "size": [r["size"] for r in records],
+            "pixels": [r["width"] * r["height"] for r in records],
+            "aspect": [r["width"] / r["height"] if r["height"] else 0.0 for r in records],
+            "camera": [r["camera"] for r in records],
+        }
+        self.columns["orientation"] = [self.orientation_of(r["width"], r["height"]) for r in records]
+        
+        # 分类字段的倒排索引 {字段: {值: [位置]}}
+        self.inverted = {}
+        for column in ("orientation", "camera"):
+            buckets = {}
+            for position, value in enumerate(self.columns[column]):
+                buckets.setdefault(value, []).append(position)
+            self.inverted[column] = buckets
+        
+        self.sort_orders = {}  # 按需计算并缓存的排序结果
+        if NUMPY_SUPPORT:
+            self.path_array = np.array(self.paths, dtype=object)
+    
+    @staticmethod
+    def orientation_of(width, height):
+        if not width or not height:
+            return "未知"
+        if width > height:
+            return "横向"
+        if width < height:
+            return "纵向"
+        return "方形"
+    
+    def __len__(self):
+        return len(self.paths)
+    
+    def values(self, column):
+        """分类字段的所有取值（用于生成菜单）"""
+        return sorted(value for value in self.inverted[column] if value)
+    
+    def sort_order(self, key):
+        """按字段排序后的位置序列（稳定排序），结果会被缓存"""
+        if key not in self.sort_orders:
+            column = self.columns[key]
+            if NUMPY_SUPPORT and key not in ("name", "camera"):
+                order = np.argsort(np.asarray(column), kind='stable')
+            else:
+                order = sorted(range(len(self.paths)), key=column.__getitem__)
+                if NUMPY_SUPPORT:
+                    order = np.asarray(order, dtype=np.int64)
+            self.sort_orders[key] = order
+        return self.sort_orders[key]
+    
+    def range_positions(self, key, minimum=None, maximum=None):
+        """数值字段在 [minimum, maximum] 范围内的位置，利用已排序结果二分查找"""
+        order = self.sort_order(key)
+        column = self.columns[key]
+        if NUMPY_SUPPORT:
+            values = np.asarray(column)[order]
+            start = 0 if minimum is None else int(np.searchsorted(values, minimum, 'left'))
+            end = len(values) if maximum is None else int(np.searchsorted(values, maximum, 'right'))
+        else:
+            values = [column[i] for i in order]
+            start = 0 if minimum is None else bisect.bisect_left(values, minimum)
+            end = len(values) if maximum is None else bisect.bisect_right(values, maximum)
+        return order[start:end]
+    
+    def query(self, sort=None, reverse=False, filters=None):
+        """按筛选条件和排序返回图片路径列表
+        
+        filters 支持 {"orientation": 值, "camera": 值, "pixels": (最小, 最大), ...}
+        """
+        positions_list = []
+        for column, condition in (filters or {}).items():
+            if column in self.inverted:
+                positions_list.append(self.inverted[column].get(condition, []))
+            else:
+                positions_list.append(self.range_positions(column, *condition))
+        
+        if NUMPY_SUPPORT:
+            order = self.sort_order(sort) if sort else np.arange(len(self.paths))
+            if reverse:
+                order = order[::-1]
+            if positions_list:
+                mask = np.ones(len(self.paths), dtype=bool)
+                for positions in positions_list:
+                    selected = np.zeros(len(self.paths), dtype=bool)
+                    selected[np.asarray(positions, dtype=np.int64)] = True
+                    mask &= selected
+                order = order[mask[order]]
+            return self.path_array[order].tolist()
+        
+        order = self.sort_order(sort) if sort else range(len(self.paths))
+        if reverse:
+            order = reversed(order)
+        if not positions_list:
+            return [self.paths[i] for i in order]
+        allowed = set(positions_list[0]).intersection(*positions_list[1:])
+        return [self.paths[i] for i in order if i in allowed]
+
+def render_export_slide(path, width, height):
+    """导出用：解码并缩放一张图片，居中放到黑色画布上，返回RGBA字节（在进程池中运行）"""
+    canvas = QImage(width, height, QImage.Format_RGBA8888)
+    canvas.fill(Qt.black)
+    image = convert_for_display(load_qimage(path, QSize(width, height)))
+    if not image.isNull():
+        image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        painter = QPainter(canvas)
+        painter.drawImage((width - image.width()) // 2, (height - image.height()) // 2, image)
+        painter.end()
+    data = canvas.constBits()
+    data.setsize(canvas.byteCount())
+    return bytes(data)
+
+def encode_png_frame(data, width, height, path):
+    """导出用：把RGBA帧编码为PNG（在进程池中运行），先写临时文件再改名"""
+    image = QImage(data, width, height, width * 4, QImage.Format_RGBA8888)
+    temp_path = path + ".tmp"
+    if not image.save(temp_path, "PNG", 90):
+        raise IOError(f"无法写入 {path}")
+    os.replace(temp_path, path)
+    return path
+
+def compose_transition_frame(previous, current, progress, transition, width, height):
+    """按过渡效果合成一帧，progress 为 0~1"""
+    a = np.frombuffer(previous, dtype=np.uint8).reshape(height, width, 4)
+    b = np.frombuffer(current, dtype=np.uint8).reshape(height, width, 4)
+    if transition == "淡入淡出":
+        weight = np.uint16(round(progress * 256))
+        frame = (a.astype(np.uint16) * (256 - weight) + b.astype(np.uint16) * weight) >> 8
+        return frame.astype(np.uint8).tobytes()
+    
+    # 滑动：新图片从指定方向滑入，覆盖在旧图片上
+    frame = a.copy()
+    if transition in ("从左滑动", "从右滑动"):
+        shift = round(width * progress)
+        if transition == "从左滑动":
+            frame[:, :shift] = b[:, width - shift:]
+        else:
+            frame[:, width - shift:] = b[:, :shift]
+    else:
+        shift = round(height * progress)
+        if transition == "从上滑动":
+            frame[:shift] = b[height - shift:]
+        else:
+            frame[height - shift:] = b[:shift]
+    return frame.tobytes()
+
+def apply_batch_operation(source, destination, operations):
+    """批量处理单张图片（在进程池中运行）：变换、缩放、转换格式后原子写入"""
+    max_size = operations.get("max_size") or 0
+    if max_size:
+        image = load_qimage(source, QSize(max_size, max_size))
+    else:
+        image = load_qimage(source)
+    if image.isNull():
+        raise IOError("无法解码图片")
+    
+    transform = QTransform()
+    transform.rotate(operations.get("rotation", 0))
+    if operations.get("flip_h"):
+        transform.scale(-1, 1)
+    if operations.get("flip_v"):
+        transform.scale(1, -1)
+    if not transform.isIdentity():
+        image = image.transformed(transform, Qt.SmoothTransformation)
+    
+    # 先写入同目录的临时文件再改名，中断时不会留下不完整的输出；
+    # 临时文件名无法说明格式，输出文件没有扩展名时按原图的实际格式保存
+    image_format = os.path.splitext(destination)[1][1:].upper() or sniff_image_format(source).upper() or None
+    temp_path = f"{destination}.{os.getpid()}.tmp"
+    if not image.save(temp_path, image_format, operations.get("quality", 90)):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise IOError("无法写入输出文件")
+    os.replace(temp_path, destination)
+    return source
+
+def batch_output_conflicts(image_paths, output_dir):
+    """输出文件夹中已有的源图片（压缩包成员按压缩包所在文件夹计算），批量处理会覆盖这些原图"""
+    output_dir = os.path.realpath(output_dir)
+    conflicts = []
+    for path in image_paths:
+        archive, _ = split_archive_path(path)
+        if os.path.dirname(os.path.realpath(archive or path)) == output_dir:
+            conflicts.append(path)
+    return conflicts
+
+class BatchOperationThread(QThread):
+    """批量处理线程：在进程池中处理整个播放列表，流式报告进度，支持中断后续传"""
+    progress = pyqtSignal(int, int)
+    batch_finished = pyqtSignal(int, int, list)
+    
+    def __init__(self, image_paths, output_dir, operations, workers=None):
+        super().__init__()
+        self.image_paths = list(dict.fromkeys(image_paths))
+        self.output_dir = output_dir
+        self.operations = operations
+        self.workers = workers or os.cpu_count() or 1
+        self.cancelled = False
+    
+    def destinations(self):
+        """为每张图片确定输出路径，重名时追加序号（每次运行结果相同，便于续传）"""
+        used = set()
+        result = []
+        target_format = self.operations.get("format")
+        for path in self.image_paths:
+            stem, ext = os.path.splitext(os.path.basename(path))
+            if target_format:
+                ext = "." + target_format
+            name = stem + ext
+            counter = 1
+            while name.lower() in used:
+                name = f"{stem}_{counter}{ext}"
+                counter += 1
+            used.add(name.lower())
+            result.append(os.path.join(self.output_dir, name))
+        return result
+    
+    def load_journal(self, journal_path, signature):
+        """读取已完成的记录，忽略参数不同或中断时写了一半的行"""
+        done = set()
+        if not os.path.exists(journal_path):
+            return done
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("signature") == signature and os.path.exists(entry.get("destination", "")):
+                    done.add(entry["source"])
+        return done
+    
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        signature = json.dumps(self.operations, sort_keys=True)
+        journal_path = os.path.join(self.output_dir, BATCH_JOURNAL_NAME)
+        done = self.load_journal(journal_path, signature)
+        
+        tasks = [(source, destination) for source, destination in zip(self.image_paths, self.destinations())
+                 if source not in done]
+        total = len(self.image_paths)
+        completed = total - len(tasks)
+        failed = 0
+        errors = []
+        # 界面已经拒绝了原图所在的文件夹，这里再保证不会覆盖任何原图
+        sources = {os.path.realpath(source) for source in self.image_paths}
+        overwrites = {task for task in tasks if os.path.realpath(task[1]) in sources}
+        for source, _ in overwrites:
+            failed += 1
+            errors.append(f"{os.path.basename(source)}: 输出路径与原图相同")
+        tasks = [task for task in tasks if task not in overwrites]
+        self.progress.emit(completed, total)
+        
+        with open(journal_path, 'a', encoding='utf-8') as journal, \
+                concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            # 只提前提交有限数量的任务，取消时可以尽快停止
+            pending = {}
+            task_iter = iter(tasks)
+            while True:
+                while not self.cancelled and len(pending) < self.workers * 4:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    pending[executor.submit(apply_batch_operation, *task, self.operations)] = task
+                if not pending:
+                    break
+                
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    source, destination = pending.pop(future)
+                    try:
+                        future.result()
+                        journal.write(json.dumps({"source": source, "destination": destination,
+                                                  "signature": signature}, ensure_ascii=False) + "\n")
+                        journal.flush()
+                        completed += 1
+                    except Exception as e:
+                        failed += 1
+                        errors.append(f"{os.path.basename(source)}: {e}")
+                self.progress.emit(completed + failed, total)
+        
+        self.batch_finished.emit(completed, failed, errors)
+    
+    def cancel(self):
+        self.cancelled = True
+
+class ContactSheetThread(QThread):
+    """联系表生成线程：进程池把缩略图直接绘制到共享内存中的整页数组上，再保存为图片文件"""
+    progress = pyqtSignal(int, int)
+    sheet_finished = pyqtSignal(list)
+    
+    def __init__(self, image_paths, output_dir, name, columns=CONTACT_SHEET_COLUMNS, rows=CONTACT_SHEET_ROWS,
+                 cell=CONTACT_SHEET_CELL, image_format="jpg", workers=None):
+        super().__init__()
+        self.image_paths = image_paths
+        self.output_dir = output_dir
+        self.name = re.sub(r'[\\/:*?"<>|]', '_', name)
+        self.columns = columns
+        self.rows = rows
+        self.cell = cell
+        self.image_format = image_format
+        self.workers = workers or os.cpu_count() or 1
+        self.cancelled = False
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def render_page(self, executor, paths, done):
+        """生成一页联系表，返回整页数组"""
+        rows = (len(paths) + self.columns - 1) // self.columns
+        shape = (rows * self.cell, self.columns * self.cell, 3)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape))) if SHARED_MEMORY_SUPPORT else None
+        sheet = None
+        try:
+            sheet = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf) if shm else np.empty(shape, dtype=np.uint8)
+            sheet[:] = CONTACT_SHEET_BACKGROUND
+            tasks = list(enumerate(paths))
+            futures = {executor.submit(render_contact_tiles, shm.name if shm else None, shape, self.cell,
+                                       tasks[i:i + CONTACT_SHEET_BATCH]): min(CONTACT_SHEET_BATCH, len(tasks) - i)
+                       for i in range(0, len(tasks), CONTACT_SHEET_BATCH)}
+            for future in concurrent.futures.as_completed(futures):
+                if self.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                result = future.result()
+                if shm is None:
+                    # 不支持共享内存时由本线程拼接
+                    for slot, tile in result:
+                        height, width = tile.shape[:2]
+                        y = (slot // self.columns) * self.cell + (self.cell - height) // 2
+                        x = (slot % self.columns) * self.cell + (self.cell - width) // 2
+                        sheet[y:y + height, x:x + width] = tile
+                done += futures[future]
+                self.progress.emit(done, len(self.image_paths))
+            # 复制一份后即可释放共享内存
+            return sheet.copy() if shm else sheet
+        finally:
+            if shm is not None:
+                sheet = None  # 释放对共享内存的引用后才能关闭
+                shm.close()
+                shm.unlink()
+    
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        per_page = self.columns * self.rows
+        outputs = []
+        done = 0
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                for start in range(0, len(self.image_paths), per_page):
+                    paths = self.image_paths[start:start + per_page]
+                    sheet = self.render_page(executor, paths, done)
+                    if self.cancelled:
+                        break
+                    done += len(paths)
+                    
+                    height, width = sheet.shape[:2]
+                    image = QImage(sip.voidptr(sheet.ctypes.data), width, height, width * 3, QImage.Format_RGB888)
+                    path = os.path.join(self.output_dir, f"{self.name}_{start // per_page + 1:03d}.{self.image_format}")
+                    if image.save(path, None, 90):
+                        outputs.append(path)
+                    else:
+                        print(f"警告: 无法保存联系表 {path}")
+        except Exception as e:
+            print(f"生成联系表失败: {e}")
+        self.sheet_finished.emit(outputs)
+
+class ContactSheetDialog(QDialog):
+    """联系表参数对话框"""
     
-    def __init__(self, image_paths):
-        super().__init__()
+    def __init__(self, parent, image_count):
+        super().__init__(parent)
+        self.setWindowTitle("联系表")
+        self.image_count = image_count
+        layout = QFormLayout(self)
+        
+        self.columns_spin = QSpinBox()
+        self.columns_spin.setRange(1, 200)
+        self.columns_spin.setValue(CONTACT_SHEET_COLUMNS)
+        layout.addRow("每行图片数:", self.columns_spin)
+        
+        self.rows_spin = QSpinBox()
+        self.rows_spin.setRange(1, 500)
+        self.rows_spin.setValue(CONTACT_SHEET_ROWS)
+        layout.addRow("每页行数:", self.rows_spin)
+        
+        self.cell_spin = QSpinBox()
+        self.cell_spin.setRange(32, THUMBNAIL_SIZE + 2 * CONTACT_SHEET_PADDING)
+        self.cell_spin.setValue(CONTACT_SHEET_CELL)
+        layout.addRow("格子大小(像素):", self.cell_spin)
+        
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(["jpg", "png"])
+        layout.addRow("输出格式:", self.format_combo)
+        
+        self.pages_label = QLabel()
+        layout.addRow("页数:", self.pages_label)
+        self.columns_spin.valueChanged.connect(self.update_pages)
+        self.rows_spin.valueChanged.connect(self.update_pages)
+        self.update_pages()
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+    
+    def update_pages(self):
+        per_page = self.columns_spin.value() * self.rows_spin.value()
+        self.pages_label.setText(str((self.image_count + per_page - 1) // per_page))
+    
+    def options(self):
+        """返回联系表参数"""
+        return {
+            "columns": self.columns_spin.value(),
+            "rows": self.rows_spin.value(),
+            "cell": self.cell_spin.value(),
+            "image_format": self.format_combo.currentText(),
+        }
+
+class BatchOperationDialog(QDialog):
+    """批量处理参数对话框"""
+    
+    def __init__(self, parent, rotation=0, flip_h=False, flip_v=False):
+        super().__init__(parent)
+        self.setWindowTitle("批量处理")
+        layout = QFormLayout(self)
+        
+        # 默认使用当前画面上的变换
+        self.rotation_combo = QComboBox()
+        self.rotation_combo.addItems(["0", "90", "180", "270"])
+        self.rotation_combo.setCurrentText(str(rotation))
+        layout.addRow("旋转(度):", self.rotation_combo)
+        
+        self.flip_h_check = QCheckBox("水平翻转")
+        self.flip_h_check.setChecked(flip_h)
+        layout.addRow(self.flip_h_check)
+        
+        self.flip_v_check = QCheckBox("垂直翻转")
+        self.flip_v_check.setChecked(flip_v)
+        layout.addRow(self.flip_v_check)
+        
+        self.max_size_spin = QSpinBox()
+        self.max_size_spin.setRange(0, 20000)
+        self.max_size_spin.setSingleStep(100)
+        self.max_size_spin.setSpecialValueText("不缩放")
+        layout.addRow("最长边(像素):", self.max_size_spin)
+        
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(BATCH_OUTPUT_FORMATS)
+        layout.addRow("输出格式:", self.format_combo)
+        
+        self.quality_spin = QSpinBox()
+        self.quality_spin.setRange(1, 100)
+        self.quality_spin.setValue(90)
+        layout.addRow("质量:", self.quality_spin)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+    
+    def operations(self):
+        """返回处理参数"""
+        image_format = self.format_combo.currentText()
+        return {
+            "rotation": int(self.rotation_combo.currentText()),
+            "flip_h": self.flip_h_check.isChecked(),
+            "flip_v": self.flip_v_check.isChecked(),
+            "max_size": self.max_size_spin.value(),
+            "format": None if image_format == BATCH_OUTPUT_FORMATS[0] else image_format,
+            "quality": self.quality_spin.value(),
+        }
+
+class SlideshowExporter:
+    """无界面导出：多进程解码缩放，合成过渡帧后输出PNG序列或原始RGBA帧"""
+    
+    def __init__(self, image_paths, output, width=1920, height=1080, fps=30,
+                 slide_interval=3.0, transition_type="淡入淡出", transition_duration=500,
+                 output_format="png", encoder=None, workers=None):
         self.image_paths = image_paths
+        self.output = output
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.slide_interval = slide_interval
+        self.transition_type = transition_type
+        self.transition_duration = transition_duration
+        self.output_format = output_format
+        self.encoder = encoder
+        self.workers = workers or os.cpu_count() or 1
+        
+        self.frame_number = 0
+        self.total_frames = round(len(image_paths) * slide_interval * fps)
+        self.png_futures = deque()  # 正在编码的PNG帧，数量有上限以控制内存
+        self.last_png = None  # 最近一次编码的帧及其文件路径，重复帧直接硬链接
+        self.sink = None
+        self.encoder_process = None
+        self.started = None
+    
+    def slide_start_frame(self, index):
+        """第 index 张图片的起始帧号，按整场时间计算，避免累计误差"""
+        return round(index * self.slide_interval * self.fps)
     
     def run(self):
-        for path in self.image_paths:
-            if not os.path.exists(path):
-                continue
+        if not NUMPY_SUPPORT and self.transition_type != "无":
+            print("警告: 未安装 numpy，导出时不使用过渡效果", file=sys.stderr)
+            self.transition_type = "无"
+        if self.output_format == "png":
+            os.makedirs(self.output, exist_ok=True)
+        
+        self.started = time.monotonic()
+        context = multiprocessing.get_context('spawn')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            self.executor = executor
+            self.open_sink()
+            try:
+                # 解码任务只提前提交有限数量，内存占用与播放列表长度无关
+                pending = deque()
+                next_submit = 0
+                previous = None
+                for index in range(len(self.image_paths)):
+                    while next_submit < len(self.image_paths) and len(pending) < self.workers * 2:
+                        pending.append(executor.submit(render_export_slide, self.image_paths[next_submit],
+                                                       self.width, self.height))
+                        next_submit += 1
+                    current = pending.popleft().result()
+                    self.write_slide(index, previous, current)
+                    previous = current
                 
-            # 使用QImage加载图片，效率更高
-            image = QImage(path)
-            if not image.isNull():
-                pixmap = QPixmap.fromImage(image)
-                self.image_loaded.emit(path, pixmap)
-            # 添加短暂延迟，避免过于频繁的信号发射
-            self.msleep(10)
+                while self.png_futures:
+                    self.png_futures.popleft().result()
+            finally:
+                self.close_sink()
+        
+        elapsed = time.monotonic() - self.started
+        print(f"导出完成: {self.frame_number} 帧, 用时 {elapsed:.1f} 秒 "
+              f"({self.frame_number / max(elapsed, 1e-6):.1f} 帧/秒)", file=sys.stderr)
+    
+    def write_slide(self, index, previous, current):
+        """输出一张图片对应的所有帧（开头的过渡帧和之后的静止帧）"""
+        start = self.slide_start_frame(index)
+        end = self.slide_start_frame(index + 1)
+        transition_frames = 0
+        if previous is not None and self.transition_type != "无":
+            transition_frames = min(end - start, round(self.transition_duration / 1000 * self.fps))
+        
+        for offset in range(end - start):
+            if offset < transition_frames:
+                progress = (offset + 1) / (transition_frames + 1)
+                frame = compose_transition_frame(previous, current, progress, self.transition_type,
+                                                 self.width, self.height)
+                self.write_frame(frame, repeat=False)
+            else:
+                self.write_frame(current, repeat=True)
+        
+        if index % 10 == 0:
+            elapsed = time.monotonic() - self.started
+            print(f"已导出 {self.frame_number}/{self.total_frames} 帧 "
+                  f"({self.frame_number / max(elapsed, 1e-6):.1f} 帧/秒)", file=sys.stderr)
+    
+    def write_frame(self, frame, repeat):
+        """写出一帧；PNG模式下相同的静止帧只编码一次"""
+        self.frame_number += 1
+        if self.output_format != "png":
+            self.sink.write(frame)
+            return
+        
+        path = os.path.join(self.output, f"frame_{self.frame_number:06d}.png")
+        if repeat and self.last_png is not None and self.last_png[0] is frame:
+            # 等待原帧编码完成后硬链接，不支持时复制
+            self.last_png[1].result()
+            if os.path.exists(path):
+                os.remove(path)
+            try:
+                os.link(self.last_png[2], path)
+            except OSError:
+                shutil.copyfile(self.last_png[2], path)
+            return
+        
+        future = self.executor.submit(encode_png_frame, frame, self.width, self.height, path)
+        self.png_futures.append(future)
+        self.last_png = (frame, future, path)
+        while len(self.png_futures) > self.workers * 2:
+            self.png_futures.popleft().result()
+    
+    def open_sink(self):
+        """打开原始帧输出：外部编码器、标准输出或文件"""
+        if self.output_format == "png":
+            return
+        if self.encoder:
+            command = self.encoder.format(width=self.width, height=self.height, fps=self.fps)
+            self.encoder_process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+            self.sink = self.encoder_process.stdin
+        elif self.output == "-":
+            self.sink = sys.stdout.buffer
+        else:
+            self.sink = open(self.output, 'wb')
+    
+    def close_sink(self):
+        if self.sink is None:
+            return
+        if self.encoder_process is not None:
+            self.sink.close()
+            self.encoder_process.wait()
+        elif self.sink is not sys.stdout.buffer:
+            self.sink.close()
+        else:
+            self.sink.flush()
+
+class ControlServer(QObject):
+    """远程控制服务：在本机端口或本地套接字上接收按行分隔的命令（JSON 或 "next 3" 形式的文本）
+    
+    命令先进入队列，在事件循环空闲时批量处理；连续的翻页命令合并为一次跳转，
+    只渲染最终的图片，不会阻塞界面。单实例模式下其他实例也通过本地套接字转交打开请求。
+    """
+    
+    # 可以合并的翻页命令
+    NAVIGATION_COMMANDS = ("next", "prev", "jump")
+    # 单行命令的最大长度（open 命令可以带很多路径），超出时断开连接
+    MAX_LINE_BYTES = 1024 * 1024
+    
+    def __init__(self, window, port=None, local_name=None):
+        super().__init__(window)
+        self.window = window
+        self.queue = deque()  # (连接, 命令)
+        self.buffers = {}  # 各连接未读完的数据
+        self.servers = []
+        
+        if port:
+            server = QTcpServer(self)
+            server.newConnection.connect(lambda server=server: self.on_new_connection(server))
+            if not server.listen(QHostAddress.LocalHost, port):
+                raise OSError(f"无法监听端口 {port}: {server.errorString()}")
+            self.servers.append(server)
+        
+        if local_name:
+            server = QLocalServer(self)
+            server.newConnection.connect(lambda server=server: self.on_new_connection(server))
+            listening = server.listen(local_name)
+            # 上次异常退出可能留下失效的套接字文件，确认没有实例在监听后才删除，不影响同时启动的其他实例
+            if (not listening and server.serverError() == QAbstractSocket.AddressInUseError
+                    and not local_server_alive(local_name)):
+                QLocalServer.removeServer(local_name)
+                listening = server.listen(local_name)
+            if not listening:
+                raise OSError(f"无法创建本地套接字 {local_name}: {server.errorString()}")
+            self.servers.append(server)
+        
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.process_queue)
+    
+    def on_new_connection(self, server):
+        while server.hasPendingConnections():
+            socket = server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.on_disconnected(socket))
+    
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+    
+    def on_ready_read(self, socket):
+        """读取所有完整的行并放入队列"""
+        data = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > self.MAX_LINE_BYTES:
+            # 不会结束的行不再缓存，回复错误后断开
+            self.buffers.pop(socket, None)
+            socket.write((json.dumps({"ok": False, "error": "命令过长"}, ensure_ascii=False) + "\n").encode('utf-8'))
+            socket.close()
+            return
+        self.buffers[socket] = rest
+        for line in lines:
+            line = line.strip()
+            if line:
+                self.queue.append((socket, self.parse_command(line.decode('utf-8', 'replace'))))
+        if self.queue and not self.flush_timer.isActive():
+            self.flush_timer.start(0)
+    
+    @staticmethod
+    def parse_command(text):
+        """解析命令：JSON对象，或 "命令 参数" 形式的文本"""
+        if text.startswith('{'):
+            try:
+                command = json.loads(text)
+                if isinstance(command, dict) and "cmd" in command:
+                    return command
+            except ValueError:
+                pass
+            return {"cmd": "invalid"}
+        name, _, argument = text.partition(' ')
+        command = {"cmd": name.lower()}
+        if argument.strip():
+            command["arg"] = argument.strip()
+        return command
+    
+    def process_queue(self):
+        """批量处理队列中的命令，连续的翻页只执行最终结果"""
+        replies = []
+        navigation = None  # 合并后的翻页目标 (基准序号, 偏移量)
+        waiting = []  # 等待翻页结果的连接
+        
+        while self.queue:
+            socket, command = self.queue.popleft()
+            name = command.get("cmd")
+            if name in self.NAVIGATION_COMMANDS:
+                try:
+                    navigation = self.merge_navigation(navigation, command)
+                    waiting.append(socket)
+                except IndexError as e:
+                    replies.append((socket, {"ok": False, "error": str(e)}))
+                except (TypeError, ValueError):
+                    replies.append((socket, {"ok": False, "error": f"无效的参数: {command.get('arg')}"}))
+                continue
+            
+            # 其他命令之前先执行累积的翻页，保持命令顺序语义
+            if navigation is not None:
+                replies.extend(self.apply_navigation(navigation, waiting))
+                navigation, waiting = None, []
+            replies.append((socket, self.execute(command)))
+        
+        if navigation is not None:
+            replies.extend(self.apply_navigation(navigation, waiting))
+        
+        for socket, reply in replies:
+            if socket in self.buffers:
+                socket.write((json.dumps(reply, ensure_ascii=False) + "\n").encode('utf-8'))
+    
+    def merge_navigation(self, navigation, command):
+        """把翻页命令合并为 (基准序号, 偏移量)，基准为None时相对当前图片"""
+        base, offset = navigation if navigation is not None else (None, 0)
+        argument = command.get("arg", command.get("index"))
+        if command["cmd"] == "jump":
+            # jump 使用从1开始的序号，超出范围时报错（不按负数序号从末尾数）
+            index = int(argument)
+            count = len(self.window.image_list)
+            if not 1 <= index <= count:
+                raise IndexError(f"序号超出范围: {index} (共 {count} 张)")
+            return index - 1, 0
+        steps = int(argument) if argument is not None else 1
+        return base, offset + (steps if command["cmd"] == "next" else -steps)
+    
+    def apply_navigation(self, navigation, waiting):
+        base, offset = navigation
+        self.window.navigate_to(base, offset)
+        status = self.window.control_status()
+        return [(socket, {"ok": True, **status}) for socket in waiting]
+    
+    def execute(self, command):
+        """执行单条非翻页命令，返回应答"""
+        name = command.get("cmd")
+        argument = command.get("arg", command.get("value"))
+        window = self.window
+        try:
+            if name == "play":
+                window.start_slideshow()
+            elif name == "pause":
+                window.stop_slideshow()
+            elif name == "toggle":
+                window.toggle_slideshow()
+            elif name == "interval":
+                window.set_slide_interval(float(argument))
+            elif name == "playlist":
+                if not window.select_playlist(str(argument)):
+                    return {"ok": False, "error": f"播放列表不存在: {argument}"}
+            elif name == "playlists":
+                return {"ok": True, "playlists": {name: len(images) for name, images in window.playlists.items()}}
+            elif name == "status":
+                pass
+            elif name == "metrics":
+                return {"ok": True, "metrics": window.control_metrics()}
+            elif name == "open":
+                paths = command.get("paths") or ([argument] if argument else [])
+                return {"ok": True, "opened": window.open_paths(paths), **window.control_status()}
+            else:
+                return {"ok": False, "error": f"未知命令: {name}"}
+        except (TypeError, ValueError):
+            return {"ok": False, "error": f"无效的参数: {argument}"}
+        return {"ok": True, **window.control_status()}
+    
+    def close(self):
+        for server in self.servers:
+            server.close()
+        for socket in list(self.buffers):
+            socket.abort()
+
+class BeatGrid:
+    """节拍网格：按循环播放的音乐时间查找节拍"""
+    
+    def __init__(self, beats, duration, tempo=0.0):
+        self.beats = list(beats)
+        self.duration = duration
+        self.tempo = tempo
+    
+    def __bool__(self):
+        return bool(self.beats) and self.duration > 0
+    
+    def beat_period(self):
+        """平均节拍间隔(秒)"""
+        return 60 / self.tempo if self.tempo else 0.5
+    
+    def nearest_beat(self, music_time, not_before):
+        """返回离 music_time 最近且不早于 not_before 的节拍时间（音乐循环时间轴）"""
+        loop, offset = divmod(music_time, self.duration)
+        base = loop * self.duration
+        best = None
+        # 检查上一圈、本圈和下一圈，处理循环边界
+        for shift in (-self.duration, 0.0, self.duration):
+            i = bisect.bisect_left(self.beats, offset - shift)
+            for j in (i - 1, i):
+                if 0 <= j < len(self.beats):
+                    t = base + shift + self.beats[j]
+                    if t >= not_before and (best is None or abs(t - music_time) < abs(best - music_time)):
+                        best = t
+        return best
+
+class SequentialOrder:
+    """顺序播放"""
+    
+    def __init__(self, count):
+        self.count = count
+    
+    def next_index(self, current):
+        return (current + 1) % self.count
+    
+    def prev_index(self, current):
+        return (current - 1) % self.count
+    
+    def advance(self, current, steps):
+        """前进（负数为后退）若干张"""
+        return (current + steps) % self.count
+    
+    def upcoming(self, current, k):
+        """接下来将要播放的 k 张（供预加载使用）"""
+        return [(current + i) % self.count for i in range(1, min(k, self.count - 1) + 1)]
+    
+    def previous(self, current, k):
+        """之前播放过的 k 张"""
+        return [(current - i) % self.count for i in range(1, min(k, self.count - 1) + 1)]
+
+class ShuffleOrder(SequentialOrder):
+    """随机播放：用Feistel网络生成 [0, count) 上的伪随机排列，不需要保存打乱后的列表"""
+    
+    ROUNDS = 4
+    
+    def __init__(self, count, seed=None):
+        super().__init__(count)
+        bits = max(2, (count - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.round_keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+    
+    def round_function(self, r, value):
+        x = (value ^ self.round_keys[r]) & 0xffffffff
+        x = ((x ^ (x >> 16)) * 0x45d9f3b) & 0xffffffff
+        x = ((x ^ (x >> 16)) * 0x45d9f3b) & 0xffffffff
+        return (x ^ (x >> 16)) & self.half_mask
+    
+    def encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for r in range(self.ROUNDS):
+            left, right = right, left ^ self.round_function(r, right)
+        return (left << self.half_bits) | right
+    
+    def decrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for r in reversed(range(self.ROUNDS)):
+            left, right = right ^ self.round_function(r, left), left
+        return (left << self.half_bits) | right
+    
+    def permute(self, position):
+        """播放位置 -> 图片序号（超出范围时继续迭代，保证结果落在 [0, count)）"""
+        value = self.encrypt(position)
+        while value >= self.count:
+            value = self.encrypt(value)
+        return value
+    
+    def position_of(self, index):
+        """图片序号 -> 播放位置"""
+        value = self.decrypt(index)
+        while value >= self.count:
+            value = self.decrypt(value)
+        return value
+    
+    def advance(self, current, steps):
+        return self.permute((self.position_of(current) + steps) % self.count)
+    
+    def next_index(self, current):
+        return self.advance(current, 1)
+    
+    def prev_index(self, current):
+        return self.advance(current, -1)
+    
+    def upcoming(self, current, k):
+        position = self.position_of(current)
+        return [self.permute((position + i) % self.count) for i in range(1, min(k, self.count - 1) + 1)]
+    
+    def previous(self, current, k):
+        position = self.position_of(current)
+        return [self.permute((position - i) % self.count) for i in range(1, min(k, self.count - 1) + 1)]
+
+class RandomOrder(SequentialOrder, abc.ABC):
+    """有放回随机播放的基类：按需生成后续序列，记录历史以便回退"""
+    
+    HISTORY_LIMIT = 1000
+    
+    def __init__(self, count, seed=None):
+        super().__init__(count)
+        self.rng = random.Random(seed)
+        self.history = deque(maxlen=self.HISTORY_LIMIT)  # 已播放的序号
+        self.lookahead = deque()  # 已生成、尚未播放的序号
+    
+    @abc.abstractmethod
+    def generate(self, recent):
+        """生成下一张的序号，recent 为已播放和已生成的序号"""
+    
+    def fill(self, current, k):
+        while len(self.lookahead) < k:
+            recent = list(self.history) + [current] + list(self.lookahead)
+            self.lookahead.append(self.generate(recent))
+    
+    def next_index(self, current):
+        self.fill(current, 1)
+        self.history.append(current)
+        return self.lookahead.popleft()
+    
+    def prev_index(self, current):
+        if not self.history:
+            return current
+        self.lookahead.appendleft(current)
+        return self.history.pop()
+    
+    def advance(self, current, steps):
+        for _ in range(abs(steps)):
+            current = self.next_index(current) if steps > 0 else self.prev_index(current)
+        return current
+    
+    def upcoming(self, current, k):
+        self.fill(current, k)
+        return list(itertools.islice(self.lookahead, k))
+    
+    def previous(self, current, k):
+        return list(itertools.islice(reversed(self.history), k))
+
+class WeightedRandomOrder(RandomOrder):
+    """加权随机播放：按权重抽取（累计权重上二分查找）"""
+    
+    def __init__(self, weights, seed=None):
+        super().__init__(len(weights), seed)
+        self.cumulative = list(itertools.accumulate(weights))
+    
+    def generate(self, recent):
+        target = self.rng.random() * self.cumulative[-1]
+        return min(bisect.bisect_right(self.cumulative, target), self.count - 1)
+
+class NoRepeatOrder(RandomOrder):
+    """不重复随机播放：最近播放过的若干张不会再次出现"""
+    
+    def __init__(self, count, window=NO_REPEAT_WINDOW, seed=None):
+        super().__init__(count, seed)
+        self.window = max(0, min(window, count // 2))
+    
+    def generate(self, recent):
+        blocked = set(recent[-self.window:]) if self.window else set()
+        while True:
+            index = self.rng.randrange(self.count)
+            if index not in blocked:
+                return index
+
+class SlideshowClock:
+    """幻灯片时钟：基于单调时钟计算绝对截止时间，避免定时器重启造成的累计漂移"""
+    
+    def __init__(self, interval):
+        self.interval = float(interval)  # 切换间隔(秒)，支持小数
+        self.start_time = None  # 本轮计时的起点
+        self.tick_count = 0  # 自起点以来已切换的次数
+        self.external_deadline = None  # 外部对齐的截止时间（如音乐节拍）
+        
+        # 延迟统计
+        self.lateness_samples = deque(maxlen=1000)  # 最近的延迟样本(秒)
+        self.total_ticks = 0
+        self.dropped_ticks = 0
+        self.max_lateness = 0.0
+    
+    def start(self, now=None):
+        """从当前时刻开始计时"""
+        self.start_time = time.monotonic() if now is None else now
+        self.tick_count = 0
+        self.external_deadline = None
+    
+    def interval_deadline(self):
+        """按间隔计算的下一次截止时间"""
+        return self.start_time + (self.tick_count + 1) * self.interval
+    
+    def next_deadline(self):
+        """下一次切换的绝对截止时间"""
+        if self.external_deadline is not None:
+            return self.external_deadline
+        return self.interval_deadline()
+    
+    def sync_to(self, deadline):
+        """用外部截止时间（如节拍）替代下一次按间隔计算的截止时间"""
+        self.external_deadline = deadline
+    
+    def time_until_next(self, now=None):
+        """距离下一次切换的剩余时间(秒)"""
+        now = time.monotonic() if now is None else now
+        return self.next_deadline() - now
+    
+    def tick(self, now=None):
+        """记录一次到期，返回应前进的张数（落后超过一个间隔时跳过错过的张数）"""
+        now = time.monotonic() if now is None else now
+        deadline = self.next_deadline()
+        lateness = max(0.0, now - deadline)
+        
+        if self.external_deadline is not None:
+            # 外部对齐的切换：以该截止时间为新的起点继续计时
+            self.external_deadline = None
+            self.start_time = deadline
+            self.tick_count = 0
+            steps = 1
+        else:
+            # 计算已经到期的截止时间数量，保证整场播放按时结束
+            due = int((now - self.start_time) / self.interval) - self.tick_count
+            steps = max(1, due)
+            self.tick_count += steps
+        
+        self.lateness_samples.append(lateness)
+        self.total_ticks += 1
+        self.dropped_ticks += steps - 1
+        self.max_lateness = max(self.max_lateness, lateness)
+        return steps
+    
+    def set_interval(self, interval, now=None):
+        """修改间隔，从上一次截止时间重新计时以保持节拍"""
+        interval = float(interval)
+        if self.start_time is not None:
+            last_deadline = self.start_time + self.tick_count * self.interval
+            now = time.monotonic() if now is None else now
+            # 如果新间隔下的下一张已过期，则从当前时刻重新开始
+            self.start_time = last_deadline if last_deadline + interval > now else now
+            self.tick_count = 0
+        self.external_deadline = None
+        self.interval = interval
+    
+    def reset_stats(self):
+        """清空延迟统计"""
+        self.lateness_samples.clear()
+        self.total_ticks = 0
+        self.dropped_ticks = 0
+        self.max_lateness = 0.0
+    
+    def stats(self):
+        """返回延迟统计（毫秒）"""
+        samples = sorted(self.lateness_samples)
+        if not samples:
+            return {"ticks": 0, "dropped": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return {
+            "ticks": self.total_ticks,
+            "dropped": self.dropped_ticks,
+            "mean_ms": sum(samples) / len(samples) * 1000,
+            "p95_ms": p95 * 1000,
+            "max_ms": self.max_lateness * 1000,
+        }
+
+# 程序自己的样式规则，与无边框框架的样式合成一张应用级样式表
+APP_STYLESHEET = """
+    QLabel#titleLabel {
+        color: red;
+    }
+    QMainWindow#frameWindow QStatusBar {
+        color: white;
+        background-color: rgba(40, 40, 40, 180);
+    }
+    QMenu {
+        background-color: rgba(40, 40, 40, 230);
+        color: white;
+        border: 1px solid rgba(100, 100, 100, 100);
+    }
+    QMenu::item:selected {
+        background-color: rgba(52, 152, 219, 150);
+    }
+    
+    QWidget#playlistPanel, QWidget#playlistPanel QLabel {
+        background-color: rgba(30, 30, 30, 200);
+        border-top-left-radius: 10px;
+        border-bottom-left-radius: 10px;
+    }
+    QLabel#playlistTitle {
+        color: white;
+        font-weight: bold;
+        font-size: 14px;
+    }
+    QPushButton#newPlaylistButton, QPushButton#deletePlaylistButton {
+        color: white;
+        border: none;
+        padding: 5px;
+        border-radius: 3px;
+        font-size: 11px;
+    }
+    QPushButton#newPlaylistButton {
+        background-color: #3498db;
+    }
+    QPushButton#newPlaylistButton:hover {
+        background-color: #2980b9;
+    }
+    QPushButton#deletePlaylistButton {
+        background-color: #e74c3c;
+    }
+    QPushButton#deletePlaylistButton:hover {
+        background-color: #c0392b;
+    }
+    QListWidget#playlistList {
+        background-color: rgba(50, 50, 50, 150);
+        border: 1px solid rgba(100, 100, 100, 100);
+        border-radius: 5px;
+        color: white;
+    }
+    QListWidget#playlistList::item:selected {
+        background-color: rgba(52, 152, 219, 150);
+    }
+    QPushButton#addImagesButton {
+        background-color: #27ae60;
+        color: white;
+        border: none;
+        padding: 8px;
+        border-radius: 5px;
+        font-size: 12px;
+    }
+    QPushButton#addImagesButton:hover {
+        background-color: #219653;
+    }
+    
+    QWidget#contentPanel, QWidget#imageDisplay, QWidget#controlPanel,
+    QWidget#contentPanel QLabel, QWidget#contentPanel QSlider,
+    QWidget#contentPanel QAbstractSpinBox, QWidget#contentPanel QCheckBox {
+        background-color: rgba(30, 30, 30, 200);
+        border-bottom-right-radius: 10px;
+    }
+    QWidget#contentPanel QLabel, QWidget#contentPanel QCheckBox {
+        color: white;
+        font-size: 12px;
+    }
+    QWidget#contentPanel QComboBox {
+        background-color: rgba(50, 50, 50, 200);
+        color: white;
+        border: 1px solid rgba(100, 100, 100, 100);
+        border-radius: 3px;
+        padding: 5px;
+    }
+    QPushButton[tool="true"], QPushButton#playButton {
+        background-color: #333333;
+        color: white;
+        border: none;
+        padding: 8px 15px;
+        border-radius: 5px;
+        font-size: 12px;
+    }
+    QPushButton[accent="blue"]:hover {
+        background-color: #2980b9;
+    }
+    QPushButton[accent="gray"]:hover {
+        background-color: #95a5a6;
+    }
+    QPushButton[accent="orange"]:hover {
+        background-color: #e67e22;
+    }
+    QPushButton[accent="purple"]:hover {
+        background-color: #8e44ad;
+    }
+    QPushButton[accent="red"]:hover {
+        background-color: #c0392b;
+    }
+    QPushButton#playButton {
+        background-color: #27ae60;
+    }
+    QPushButton#playButton:hover {
+        background-color: #219653;
+    }
+    QPushButton#playButton[playing="true"] {
+        background-color: #e74c3c;
+    }
+    QPushButton#playButton[playing="true"]:hover {
+        background-color: #c0392b;
+    }
+"""
+
+class ImageView(QWidget):
+    """图片显示区域：直接绘制图片，切换时只重绘图片所在的区域（setPixmap/setText 与QLabel用法相同）"""
+    
+    BORDER_WIDTH = 2
+    BORDER_RADIUS = 5
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.current_pixmap = None
+        self.current_text = ""
+        self.setMinimumHeight(400)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+    
+    def pixmap_rect(self, pixmap):
+        """图片居中显示时所在的区域"""
+        if pixmap is None or pixmap.isNull():
+            return QRect()
+        x = (self.width() - pixmap.width()) // 2
+        y = (self.height() - pixmap.height()) // 2
+        return QRect(x, y, pixmap.width(), pixmap.height())
+    
+    def setPixmap(self, pixmap):
+        # 只重绘旧图片和新图片覆盖的区域
+        dirty = self.pixmap_rect(self.current_pixmap).united(self.pixmap_rect(pixmap))
+        if self.current_text:
+            dirty = self.rect()
+        self.current_pixmap = pixmap
+        self.current_text = ""
+        self.update(dirty)
+    
+    def pixmap(self):
+        return self.current_pixmap
+    
+    def setText(self, text):
+        self.current_pixmap = None
+        self.current_text = text
+        self.update()
+    
+    def text(self):
+        return self.current_text
+    
+    def setAlignment(self, alignment):
+        """兼容QLabel的接口，内容总是居中显示"""
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor(255, 255, 255, 50), self.BORDER_WIDTH))
+        painter.setBrush(QColor(0, 0, 0, 100))
+        inset = self.BORDER_WIDTH / 2
+        painter.drawRoundedRect(QRectF(self.rect()).adjusted(inset, inset, -inset, -inset),
+                                self.BORDER_RADIUS, self.BORDER_RADIUS)
+        
+        if self.current_pixmap is not None and not self.current_pixmap.isNull():
+            painter.drawPixmap(self.pixmap_rect(self.current_pixmap).topLeft(), self.current_pixmap)
+        elif self.current_text:
+            painter.setPen(Qt.white)
+            painter.drawText(self.rect(), Qt.AlignCenter | Qt.TextWordWrap, self.current_text)
 
-class ImageViewerWindow(QMainWindow):
+class ImageViewerWindow(FramelessWindow):
+    @property
+    def image_list(self):
+        """当前显示的图片序列（播放列表本身，或排序、筛选后的视图）"""
+        return self.shown_images
+    
+    @image_list.setter
+    def image_list(self, images):
+        self.shown_images = images
+        self.image_list_version += 1
+    
     def __init__(self):
-        super().__init__()
+        super().__init__(APP_STYLESHEET)
         
         # 设置窗口属性
         self.setWindowTitle("星泉Naiku")
         self.setGeometry(350, 100, 1200, 800)
         
-        # 移除默认窗口边框
-        self.setWindowFlags(Qt.FramelessWindowHint)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        
         # 初始化变量
         self.image_folder = ""
+        self.image_list_version = 0  # 每次替换显示序列时加1，播放顺序按它缓存
         self.image_list = []
         self.playlists = {}  # 播放列表字典
         self.current_playlist = "默认列表"  # 当前播放列表
         self.current_index = 0
         self.timer = QTimer()
-        self.slide_interval = 3  # 默认3秒切换
+        self.timer.setSingleShot(True)  # 每次按截止时间重新安排
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.prepare_timer = QTimer()  # 在截止时间前准备下一帧
+        self.prepare_timer.setSingleShot(True)
+        self.prepare_timer.setTimerType(Qt.PreciseTimer)
+        self.slide_interval = 3.0  # 默认3秒切换，支持小数
+        self.slide_clock = SlideshowClock(self.slide_interval)
+        self.prepared_frame = None  # 预先准备好的下一帧 (键, 缩放后的图片)
+        self.playback_order = PLAYBACK_ORDERS[0]  # 播放顺序
+        self.play_order = None  # 当前的播放顺序对象
+        self.play_order_key = None
         self.transition_type = "淡入淡出"  # 过渡效果类型
         self.transition_duration = 500  # 过渡动画持续时间(毫秒)
-        self.is_fullscreen = False  # 全屏状态
         self.image_rotation = 0  # 图片旋转角度
         self.image_flip_h = False  # 水平翻转
         self.image_flip_v = False  # 垂直翻转
         
         # 图片缓存
-        self.image_cache = {}
+        self.image_cache = OrderedDict()  # {路径: 解码好的QImage}，按最近使用排序；显示时才缩放并转为QPixmap
         self.cache_size = 10  # 缓存最近10张图片
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.frame_cache_sized_for = None  # 上次设置磁盘帧缓存容量时的播放列表长度
+        # 第二级缓存：移出的图片压缩保存在内存中，循环播放时不必重新读取磁盘
+        self.compressed_cache = CompressedFrameCache()
+        self.compressed_cache.frame_restored.connect(self.add_to_cache)
+        
+        # 内存调节：定期根据内存状态调整缓存大小、预加载深度和工作进程数
+        self.preload_ahead = PRELOAD_AHEAD
+        self.preload_behind = PRELOAD_BEHIND
+        self.worker_count = os.cpu_count() or 1
+        self.memory_governor = MemoryGovernor()
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(self.update_memory_budget)
+        self.memory_timer.start(MEMORY_CHECK_INTERVAL_MS)
+        QTimer.singleShot(0, self.update_memory_budget)
+        
+        # 快速浏览
+        self.scrubbing = False
+        self.last_nav_time = 0.0
+        self.wheel_delta = 0
+        self.scrub_render_timer = QTimer(self)
+        self.scrub_render_timer.setSingleShot(True)
+        self.scrub_render_timer.timeout.connect(self.render_scrub_frame)
+        self.scrub_settle_timer = QTimer(self)
+        self.scrub_settle_timer.setSingleShot(True)
+        self.scrub_settle_timer.timeout.connect(self.end_scrub)
+        self.thumbnail_cache = OrderedDict()  # {路径: 缩略图}
+        self.thumbnail_loader = ThumbnailLoader()
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
         
         # 预加载线程
         self.loader_thread = None
+        self.quarantined = set()  # 已隔离的无法解码的图片
+        
+        # 重复图片扫描线程
+        self.duplicate_thread = None
+        
+        # 相似图片搜索（索引在第一次搜索时读取，之后常驻内存）
+        self.similarity_index = None
+        self.similarity_thread = None
+        
+        # 批量处理线程
+        self.batch_thread = None
+        self.batch_progress = None
+        
+        # 联系表生成线程
+        self.sheet_thread = None
+        self.sheet_progress = None
+        self.sheet_export = False
+        self.sheet_source = None
+        
+        # 拖放导入线程
+        self.ingest_threads = []
+        self.setAcceptDrops(True)
         
-        # 加载默认背景
-        self.background = QPixmap(1200, 800)
-        self.background.fill(Qt.darkGray)
+        # 远程控制服务
+        self.control_server = None
         
-        # 初始化拖动变量
-        self.oldPos = self.pos()
+        # 播放列表索引（排序和筛选）
+        self.image_metadata = {}  # 已探测的图片元数据 {(路径, 修改时间, 大小): 信息}
+        self.playlist_indexes = {}  # {播放列表名称: PlaylistIndex}
+        self.playlist_query = {"sort": None, "reverse": False, "filters": {}}
+        self.index_thread = None
+        self.pending_queries = {}  # 等待索引建立的请求 {播放列表名称: {回调: None}}
         
         # 音乐状态
         self.music_playing = False
         self.music_file = None
+        self.music_files = []  # 背景音乐队列
+        self.audio_engine = None
+        
+        # 节拍同步
+        self.beat_sync_enabled = False
+        self.beat_grid = None
+        self.beat_thread = None
         
         # 创建UI
         self.initUI()
         
         # 连接定时器信号
-        self.timer.timeout.connect(self.next_image)
+        self.timer.timeout.connect(self.on_slide_deadline)
+        self.prepare_timer.timeout.connect(self.prepare_next_frame)
         
         # 创建默认播放列表
         self.playlists[self.current_playlist] = []
@@ -102,6 +3373,11 @@ class ImageViewerWindow(QMainWindow):
     
     def find_music_file(self):
         """查找可用的音乐文件"""
+        music_files = self.find_music_files()
+        return music_files[0] if music_files else None
+    
+    def find_music_files(self):
+        """查找所有可用的音乐文件，优先的文件名排在前面"""
         # 首先尝试查找特定的音乐文件
         music_files = [
             "天球(そら)のMúsica - Ave Mujica.flac",
@@ -112,35 +3388,45 @@ class ImageViewerWindow(QMainWindow):
             "music.mp3"
         ]
         
+        found = []
+        seen = set()
+        
+        def add(path):
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                found.append(path)
+        
         # 检查当前目录
         for file in music_files:
             if os.path.exists(file):
-                return file
+                add(file)
         
         # 检查程序所在目录
         app_dir = os.path.dirname(os.path.abspath(__file__))
         for file in music_files:
             full_path = os.path.join(app_dir, file)
             if os.path.exists(full_path):
-                return full_path
+                add(full_path)
         
-        # 如果没有找到特定文件，查找任何支持的音频文件
-        for file in os.listdir('.'):
+        # 其余支持的音频文件按文件名排序加入队列
+        for file in sorted(os.listdir('.')):
             if any(file.lower().endswith(ext) for ext in SUPPORTED_AUDIO_FORMATS):
-                return file
+                add(file)
         
         # 检查程序目录中的音频文件
-        for file in os.listdir(app_dir):
+        for file in sorted(os.listdir(app_dir)):
             if any(file.lower().endswith(ext) for ext in SUPPORTED_AUDIO_FORMATS):
-                return os.path.join(app_dir, file)
+                add(os.path.join(app_dir, file))
         
-        return None
+        return found
     
     def init_music(self):
         """初始化背景音乐"""
         try:
             # 查找音乐文件
-            self.music_file = self.find_music_file()
+            self.music_files = self.find_music_files()
+            self.music_file = self.music_files[0] if self.music_files else None
             
             if not self.music_file:
                 print("警告: 未找到音乐文件，程序将在无声模式下运行")
@@ -149,17 +3435,11 @@ class ImageViewerWindow(QMainWindow):
             
             # 初始化音频 mixer 模块
             pygame.mixer.init()
+            self.start_audio_engine()
+            print(f"背景音乐开始播放: {os.path.basename(self.music_file)} (队列共 {len(self.music_files)} 首)")
             
-            # 加载音乐文件
-            pygame.mixer.music.load(self.music_file)
-            
-            # 设置音量（0.0 到 1.0）
-            pygame.mixer.music.set_volume(0.5)  # 50% 音量
-            
-            # 循环播放音乐（-1 表示无限循环）
-            pygame.mixer.music.play(-1)
-            self.music_playing = True
-            print(f"背景音乐开始循环播放: {os.path.basename(self.music_file)}")
+            # 音乐开始后再在后台分析节拍，不延迟音乐启动
+            self.start_beat_analysis()
             
         except Exception as e:
             print(f"播放音乐时出错: {e}")
@@ -168,14 +3448,107 @@ class ImageViewerWindow(QMainWindow):
                 pygame.init()
                 pygame.mixer.init()
                 if self.music_file:
-                    pygame.mixer.music.load(self.music_file)
-                    pygame.mixer.music.set_volume(0.5)
-                    pygame.mixer.music.play(-1)
-                    self.music_playing = True
-                    print(f"背景音乐开始循环播放 (重试): {os.path.basename(self.music_file)}")
+                    self.start_audio_engine()
+                    print(f"背景音乐开始播放 (重试): {os.path.basename(self.music_file)}")
+                    self.start_beat_analysis()
             except Exception as ex:
                 print(f"音乐播放完全失败: {ex}")
     
+    def start_audio_engine(self):
+        """创建背景音乐引擎并开始播放队列"""
+        if self.audio_engine is not None:
+            self.audio_engine.stop()
+        self.audio_engine = BackgroundAudioEngine(self.music_files)
+        self.audio_engine.track_changed.connect(self.on_track_changed)
+        self.audio_engine.start()
+        self.music_file = self.audio_engine.current_track()
+        self.music_playing = True
+    
+    def on_track_changed(self, music_file):
+        """背景音乐切换到下一首"""
+        self.music_file = music_file
+        self.beat_grid = None
+        self.statusBar().showMessage(f"音乐: {os.path.basename(music_file)}", 3000)
+        self.start_beat_analysis()
+        
+        # 节拍网格就绪前按间隔切换
+        if self.beat_sync_enabled and self.timer.isActive():
+            self.slide_clock.sync_to(None)
+            self.schedule_next_slide()
+    
+    def next_track(self):
+        """切换到下一首背景音乐"""
+        if self.audio_engine is not None and len(self.music_files) > 1:
+            self.audio_engine.skip()
+    
+    def start_beat_analysis(self):
+        """在后台线程中分析背景音乐的节拍"""
+        if not NUMPY_SUPPORT or not self.music_file:
+            return
+        if self.beat_thread is not None and self.beat_thread.isRunning():
+            return
+        
+        self.beat_thread = BeatAnalysisThread(self.music_file)
+        self.beat_thread.analysis_finished.connect(self.on_beat_analysis_finished)
+        self.beat_thread.finished.connect(self.on_beat_thread_finished)
+        self.beat_thread.start()
+    
+    def on_beat_thread_finished(self):
+        """分析期间曲目已切换时，继续分析当前曲目"""
+        if self.beat_thread.music_file != self.music_file:
+            self.start_beat_analysis()
+    
+    def on_beat_analysis_finished(self, music_file, result):
+        """节拍分析完成"""
+        if music_file != self.music_file:
+            return
+        
+        self.beat_grid = BeatGrid(result["beats"], result["duration"], result["tempo"])
+        if self.beat_grid:
+            print(f"节拍分析完成: {result['tempo']:.1f} BPM, {len(result['beats'])} 拍")
+            # 正在播放时立即按节拍重新安排
+            if self.beat_sync_enabled and self.timer.isActive():
+                self.schedule_next_slide()
+    
+    def music_position(self):
+        """当前音乐播放位置(秒)，未播放时返回None"""
+        if not self.music_playing or self.audio_engine is None:
+            return None
+        try:
+            return self.audio_engine.position()
+        except Exception:
+            return None
+    
+    def next_beat_deadline(self):
+        """把按间隔计算的下一次切换对齐到最近的节拍，返回单调时钟截止时间"""
+        if not self.beat_grid:
+            return None
+        music_time = self.music_position()
+        if music_time is None:
+            return None
+        
+        now = time.monotonic()
+        target = music_time + (self.slide_clock.interval_deadline() - now)
+        # 至少留出半拍，避免刚切换完又在同一拍上切换
+        beat = self.beat_grid.nearest_beat(target, music_time + min(self.beat_grid.beat_period(), self.slide_interval) / 2)
+        if beat is None:
+            return None
+        return now + (beat - music_time)
+    
+    def toggle_beat_sync(self, enabled):
+        """切换节拍同步"""
+        self.beat_sync_enabled = bool(enabled)
+        if self.beat_sync_enabled and not self.beat_grid:
+            if not NUMPY_SUPPORT:
+                self.statusBar().showMessage("节拍同步需要安装 numpy", 3000)
+            elif self.music_file:
+                self.statusBar().showMessage("正在分析音乐节拍...", 3000)
+                self.start_beat_analysis()
+        
+        if self.timer.isActive():
+            self.slide_clock.sync_to(None)
+            self.schedule_next_slide()
+    
     def toggle_music(self):
         """切换音乐播放状态"""
         if not self.music_file:
@@ -184,12 +3557,12 @@ class ImageViewerWindow(QMainWindow):
             
         try:
             if self.music_playing:
-                pygame.mixer.music.pause()
+                self.audio_engine.pause()
                 self.music_playing = False
                 print("音乐已暂停")
                 self.statusBar().showMessage("音乐已暂停", 2000)
             else:
-                pygame.mixer.music.unpause()
+                self.audio_engine.resume()
                 self.music_playing = True
                 print("音乐继续播放")
                 self.statusBar().showMessage("音乐继续播放", 2000)
@@ -208,8 +3581,8 @@ class ImageViewerWindow(QMainWindow):
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(0)
         
-        # 创建左侧播放列表面板
-        self.playlist_panel = self.create_playlist_panel()
+        # 创建左侧播放列表面板（窗口显示后再构建）
+        self.playlist_panel = self.lazy_panel(self.create_playlist_panel, ["playlist_widget"])
         main_layout.addWidget(self.playlist_panel, 1)  # 1/5的空间给播放列表
         
         # 创建右侧主内容区域
@@ -219,7 +3592,7 @@ class ImageViewerWindow(QMainWindow):
         right_layout.setSpacing(0)
         
         # 创建自定义标题栏
-        title_bar = self.create_title_bar()
+        title_bar = self.create_title_bar("Ave Mujica", fullscreen_button=True)
         right_layout.addWidget(title_bar)
         
         # 创建内容区域
@@ -228,127 +3601,22 @@ class ImageViewerWindow(QMainWindow):
         
         main_layout.addWidget(right_panel, 4)  # 4/5的空间给主内容
         
-        # 设置窗口样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background: transparent;
-            }
-            QWidget {
-                background: transparent;
-            }
-        """)
-        
         # 创建状态栏
-        self.statusBar().setStyleSheet("color: white; background-color: rgba(40, 40, 40, 180);")
+        self.statusBar()
         if self.music_file:
             self.statusBar().showMessage(f"音乐: {os.path.basename(self.music_file)}", 3000)
     
-    def create_title_bar(self):
-        # 创建标题栏容器
-        title_bar = QWidget()
-        title_bar.setFixedHeight(40)
-        title_bar.setStyleSheet("""
-            QWidget {
-                background-color: rgba(40, 40, 40, 180);
-                border-top-left-radius: 10px;
-                border-top-right-radius: 10px;
-            }
-        """)
-        
-        # 创建标题栏布局
-        title_layout = QHBoxLayout(title_bar)
-        title_layout.setContentsMargins(10, 0, 10, 0)
-        
-        # 添加标题
-        title_label = QLabel("Ave Mujica")
-        title_label.setStyleSheet("""
-            QLabel {
-                color: red;
-                font-weight: bold;
-                font-size: 14px;
-            }
-        """)
-        title_layout.addWidget(title_label)
-        
-        # 添加弹性空间
-        title_layout.addStretch()
-        
-        # 添加全屏按钮
-        fullscreen_btn = QPushButton("⛶")
-        fullscreen_btn.setFixedSize(30, 30)
-        fullscreen_btn.setToolTip("切换全屏 (F11)")
-        fullscreen_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-                font-size: 16px;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 50);
-            }
-        """)
-        fullscreen_btn.clicked.connect(self.toggle_fullscreen)
-        title_layout.addWidget(fullscreen_btn)
-        
-        # 添加最小化按钮
-        min_btn = QPushButton("—")
-        min_btn.setFixedSize(30, 30)
-        min_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 50);
-            }
-        """)
-        min_btn.clicked.connect(self.showMinimized)
-        title_layout.addWidget(min_btn)
-        
-        # 添加关闭按钮
-        close_btn = QPushButton("×")
-        close_btn.setFixedSize(30, 30)
-        close_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-                font-size: 18px;
-            }
-            QPushButton:hover {
-                background-color: #e81123;
-            }
-        """)
-        close_btn.clicked.connect(self.close)
-        title_layout.addWidget(close_btn)
-        
-        return title_bar
-    
     def create_playlist_panel(self):
         # 创建播放列表面板
         panel = QWidget()
-        panel.setStyleSheet("""
-            QWidget {
-                background-color: rgba(30, 30, 30, 200);
-                border-top-left-radius: 10px;
-                border-bottom-left-radius: 10px;
-            }
-        """)
+        panel.setObjectName("playlistPanel")
         
         layout = QVBoxLayout(panel)
         layout.setContentsMargins(10, 10, 10, 10)
         
         # 播放列表标题
         playlist_label = QLabel("神人列表")
-        playlist_label.setStyleSheet("color: white; font-weight: bold; font-size: 14px;")
+        playlist_label.setObjectName("playlistTitle")
         layout.addWidget(playlist_label)
         
         # 播放列表操作按钮
@@ -356,37 +3624,13 @@ class ImageViewerWindow(QMainWindow):
         
         # 新建播放列表按钮
         new_list_btn = QPushButton("新建")
-        new_list_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 5px;
-                border-radius: 3px;
-                font-size: 11px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-        """)
+        new_list_btn.setObjectName("newPlaylistButton")
         new_list_btn.clicked.connect(self.create_new_playlist)
         btn_layout.addWidget(new_list_btn)
         
         # 删除播放列表按钮
         del_list_btn = QPushButton("删除")
-        del_list_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                border: none;
-                padding: 5px;
-                border-radius: 3px;
-                font-size: 11px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-        """)
+        del_list_btn.setObjectName("deletePlaylistButton")
         del_list_btn.clicked.connect(self.delete_playlist)
         btn_layout.addWidget(del_list_btn)
         
@@ -394,18 +3638,10 @@ class ImageViewerWindow(QMainWindow):
         
         # 播放列表
         self.playlist_widget = QListWidget()
-        self.playlist_widget.setStyleSheet("""
-            QListWidget {
-                background-color: rgba(50, 50, 50, 150);
-                border: 1px solid rgba(100, 100, 100, 100);
-                border-radius: 5px;
-                color: white;
-            }
-            QListWidget::item:selected {
-                background-color: rgba(52, 152, 219, 150);
-            }
-        """)
+        self.playlist_widget.setObjectName("playlistList")
         self.playlist_widget.currentItemChanged.connect(self.switch_playlist)
+        self.playlist_widget.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.playlist_widget.customContextMenuRequested.connect(self.show_playlist_menu)
         layout.addWidget(self.playlist_widget)
         
         # 添加当前播放列表项
@@ -413,19 +3649,7 @@ class ImageViewerWindow(QMainWindow):
         
         # 添加图片到播放列表按钮
         add_to_list_btn = QPushButton("添加图片到列表")
-        add_to_list_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #219653;
-            }
-        """)
+        add_to_list_btn.setObjectName("addImagesButton")
         add_to_list_btn.clicked.connect(self.add_images_to_playlist)
         layout.addWidget(add_to_list_btn)
         
@@ -434,12 +3658,7 @@ class ImageViewerWindow(QMainWindow):
     def create_content_widget(self):
         # 创建内容容器
         content_widget = QWidget()
-        content_widget.setStyleSheet("""
-            QWidget {
-                background-color: rgba(30, 30, 30, 200);
-                border-bottom-right-radius: 10px;
-            }
-        """)
+        content_widget.setObjectName("contentPanel")
         
         # 创建内容布局
         content_layout = QVBoxLayout(content_widget)
@@ -447,68 +3666,56 @@ class ImageViewerWindow(QMainWindow):
         
         # 创建图片显示区域
         self.image_display_widget = QWidget()
+        self.image_display_widget.setObjectName("imageDisplay")
         image_display_layout = QVBoxLayout(self.image_display_widget)
         image_display_layout.setContentsMargins(0, 0, 0, 0)
         
-        # 创建图片标签（用于显示图片）
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setStyleSheet("""
-            QLabel {
-                background-color: rgba(0, 0, 0, 100);
-                border: 2px solid rgba(255, 255, 255, 50);
-                border-radius: 5px;
-                min-height: 400px;
-            }
-        """)
+        # 创建图片显示区域（自绘，切换图片时只重绘变化的区域）
+        self.image_label = ImageView()
         self.image_label.setText("还真是低低在下呢！")
         self.image_label.setFont(QFont("Arial", 16))
         image_display_layout.addWidget(self.image_label)
         
         # 创建图片信息显示区域
         self.image_info_label = QLabel()
-        self.image_info_label.setStyleSheet("color: white; font-size: 12px;")
         self.image_info_label.setAlignment(Qt.AlignCenter)
         self.image_info_label.setText("图片信息将显示在这里")
         image_display_layout.addWidget(self.image_info_label)
         
         content_layout.addWidget(self.image_display_widget, 3)  # 3/4的空间给图片显示
         
-        # 创建控制面板
-        control_panel = self.create_control_panel()
-        content_layout.addWidget(control_panel, 1)  # 1/4的空间给控制面板
+        # 创建控制面板（窗口显示后再构建）
+        self.control_panel = self.lazy_panel(self.create_control_panel, [
+            "info_label", "play_btn", "position_slider", "transition_combo",
+            "order_combo", "interval_slider", "interval_spin", "beat_sync_check"])
+        content_layout.addWidget(self.control_panel, 1)  # 1/4的空间给控制面板
         
         return content_widget
     
+    def create_tool_button(self, text, accent, slot, shortcut):
+        """控制面板中的按钮：样式由 accent 属性决定悬停颜色"""
+        button = QPushButton(text)
+        button.setProperty("tool", True)
+        button.setProperty("accent", accent)
+        button.clicked.connect(slot)
+        if shortcut:
+            button.setShortcut(QKeySequence(shortcut))
+        return button
+    
     def create_control_panel(self):
         # 创建控制面板容器
         panel = QWidget()
+        panel.setObjectName("controlPanel")
         panel_layout = QVBoxLayout(panel)
         
         # 第一行：文件夹选择和当前图片信息
         folder_row = QHBoxLayout()
         
         # 文件夹选择按钮
-        folder_btn = QPushButton("选择图片文件夹")
-        folder_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-        """)
-        folder_btn.clicked.connect(self.select_folder)
-        folder_row.addWidget(folder_btn)
+        folder_row.addWidget(self.create_tool_button("选择图片文件夹", "blue", self.select_folder, None))
         
         # 当前图片信息
         self.info_label = QLabel("未选择文件夹")
-        self.info_label.setStyleSheet("color: white; font-size: 12px;")
         folder_row.addWidget(self.info_label)
         
         folder_row.addStretch()
@@ -517,210 +3724,85 @@ class ImageViewerWindow(QMainWindow):
         # 第二行：导航控制
         nav_row = QHBoxLayout()
         
-        # 上一张按钮
-        prev_btn = QPushButton("上一张")
-        prev_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #95a5a6;
-            }
-        """)
-        prev_btn.clicked.connect(self.prev_image)
-        prev_btn.setShortcut(QKeySequence("Left"))  # 左箭头快捷键
-        nav_row.addWidget(prev_btn)
+        # 上一张按钮（左箭头快捷键）
+        nav_row.addWidget(self.create_tool_button("上一张", "gray", lambda: self.navigate_step(-1), "Left"))
         
         # 播放/暂停按钮
+        # 播放和暂停两种状态的样式在应用样式表中，切换时只改变 playing 属性
         self.play_btn = QPushButton("播放")
-        self.play_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #219653;
-            }
-        """)
+        self.play_btn.setObjectName("playButton")
+        self.play_btn.setProperty("playing", False)
         self.play_btn.clicked.connect(self.toggle_slideshow)
         self.play_btn.setShortcut(QKeySequence("Space"))  # 空格键快捷键
         nav_row.addWidget(self.play_btn)
         
-        # 下一张按钮
-        next_btn = QPushButton("下一张")
-        next_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #95a5a6;
-            }
-        """)
-        next_btn.clicked.connect(self.next_image)
-        next_btn.setShortcut(QKeySequence("Right"))  # 右箭头快捷键
-        nav_row.addWidget(next_btn)
+        # 下一张按钮（右箭头快捷键）
+        nav_row.addWidget(self.create_tool_button("下一张", "gray", lambda: self.navigate_step(1), "Right"))
         
         panel_layout.addLayout(nav_row)
         
+        # 播放位置滑块（拖动时快速浏览）
+        self.position_slider = QSlider(Qt.Horizontal)
+        self.position_slider.setRange(0, 0)
+        self.position_slider.valueChanged.connect(lambda value: self.scrub_to(value))
+        panel_layout.addWidget(self.position_slider)
+        
         # 第三行：图片编辑控制
         edit_row = QHBoxLayout()
-        
-        # 旋转按钮
-        rotate_btn = QPushButton("旋转")
-        rotate_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #e67e22;
-            }
-        """)
-        rotate_btn.clicked.connect(self.rotate_image)
-        rotate_btn.setShortcut(QKeySequence("R"))  # R键快捷键
-        edit_row.addWidget(rotate_btn)
-        
-        # 水平翻转按钮
-        flip_h_btn = QPushButton("水平翻转")
-        flip_h_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #8e44ad;
-            }
-        """)
-        flip_h_btn.clicked.connect(self.flip_horizontal)
-        flip_h_btn.setShortcut(QKeySequence("H"))  # H键快捷键
-        edit_row.addWidget(flip_h_btn)
-        
-        # 垂直翻转按钮
-        flip_v_btn = QPushButton("垂直翻转")
-        flip_v_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #8e44ad;
-            }
-        """)
-        flip_v_btn.clicked.connect(self.flip_vertical)
-        flip_v_btn.setShortcut(QKeySequence("V"))  # V键快捷键
-        edit_row.addWidget(flip_v_btn)
-        
-        # 重置按钮
-        reset_btn = QPushButton("重置")
-        reset_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-        """)
-        reset_btn.clicked.connect(self.reset_image_transform)
-        reset_btn.setShortcut(QKeySequence("Ctrl+R"))  # Ctrl+R快捷键
-        edit_row.addWidget(reset_btn)
-        
-        # 音乐控制按钮
-        music_btn = QPushButton("音乐")
-        music_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #333333;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #8e44ad;
-            }
-        """)
-        music_btn.clicked.connect(self.toggle_music)
-        music_btn.setShortcut(QKeySequence("M"))  # M键快捷键
-        edit_row.addWidget(music_btn)
-        
+        edit_row.addWidget(self.create_tool_button("旋转", "orange", self.rotate_image, "R"))
+        edit_row.addWidget(self.create_tool_button("水平翻转", "purple", self.flip_horizontal, "H"))
+        edit_row.addWidget(self.create_tool_button("垂直翻转", "purple", self.flip_vertical, "V"))
+        edit_row.addWidget(self.create_tool_button("重置", "red", self.reset_image_transform, "Ctrl+R"))
+        edit_row.addWidget(self.create_tool_button("音乐", "purple", self.toggle_music, "M"))
         panel_layout.addLayout(edit_row)
         
         # 第四行：播放控制
         control_row = QHBoxLayout()
         
         # 过渡效果选择
-        transition_label = QLabel("过渡效果:")
-        transition_label.setStyleSheet("color: white; font-size: 12px;")
-        control_row.addWidget(transition_label)
+        control_row.addWidget(QLabel("过渡效果:"))
         
         # 过渡效果下拉菜单
         self.transition_combo = QComboBox()
-        self.transition_combo.addItems(["无", "淡入淡出", "从左滑动", "从右滑动", "从上滑动", "从下滑动"])
+        self.transition_combo.addItems(TRANSITION_TYPES)
         self.transition_combo.setCurrentText(self.transition_type)
         self.transition_combo.currentTextChanged.connect(self.change_transition)
-        self.transition_combo.setStyleSheet("""
-            QComboBox {
-                background-color: rgba(50, 50, 50, 200);
-                color: white;
-                border: 1px solid rgba(100, 100, 100, 100);
-                border-radius: 3px;
-                padding: 5px;
-            }
-        """)
         control_row.addWidget(self.transition_combo)
         
+        # 播放顺序下拉菜单
+        self.order_combo = QComboBox()
+        self.order_combo.addItems(PLAYBACK_ORDERS)
+        self.order_combo.setCurrentText(self.playback_order)
+        self.order_combo.currentTextChanged.connect(self.change_playback_order)
+        control_row.addWidget(self.order_combo)
+        
         # 间隔时间标签
-        interval_label = QLabel("切换间隔(秒):")
-        interval_label.setStyleSheet("color: white; font-size: 12px;")
-        control_row.addWidget(interval_label)
+        control_row.addWidget(QLabel("切换间隔(秒):"))
         
-        # 间隔时间滑块
+        # 间隔时间滑块（以0.1秒为单位）
         self.interval_slider = QSlider(Qt.Horizontal)
-        self.interval_slider.setRange(1, 30)  # 1-30秒
-        self.interval_slider.setValue(self.slide_interval)
+        self.interval_slider.setRange(round(MIN_SLIDE_INTERVAL * 10), round(MAX_SLIDE_INTERVAL * 10))  # 0.1-30秒
+        self.interval_slider.setValue(round(self.slide_interval * 10))
         self.interval_slider.setTickPosition(QSlider.TicksBelow)
-        self.interval_slider.setTickInterval(5)
+        self.interval_slider.setTickInterval(50)
         self.interval_slider.valueChanged.connect(self.change_interval)
         control_row.addWidget(self.interval_slider)
         
         # 间隔时间数字显示
-        self.interval_spin = QSpinBox()
-        self.interval_spin.setRange(1, 30)
+        self.interval_spin = QDoubleSpinBox()
+        self.interval_spin.setRange(MIN_SLIDE_INTERVAL, MAX_SLIDE_INTERVAL)
+        self.interval_spin.setDecimals(1)
+        self.interval_spin.setSingleStep(0.1)
         self.interval_spin.setValue(self.slide_interval)
         self.interval_spin.valueChanged.connect(self.change_interval_spin)
         control_row.addWidget(self.interval_spin)
         
+        # 节拍同步开关
+        self.beat_sync_check = QCheckBox("节拍同步")
+        self.beat_sync_check.setToolTip("在背景音乐的节拍上切换图片")
+        self.beat_sync_check.toggled.connect(self.toggle_beat_sync)
+        control_row.addWidget(self.beat_sync_check)
+        
         panel_layout.addLayout(control_row)
         
         return panel
@@ -738,18 +3820,13 @@ class ImageViewerWindow(QMainWindow):
     
     def load_images_from_folder(self):
         """从文件夹加载图片"""
-        # 支持的图片格式
-        supported_formats = [fmt.data().decode().lower() for fmt in QImageReader.supportedImageFormats()]
-        
         # 获取文件夹中的所有图片文件
-        image_files = []
-        for file in os.listdir(self.image_folder):
-            if file.split('.')[-1].lower() in supported_formats:
-                image_files.append(os.path.join(self.image_folder, file))
+        image_files = self.without_quarantined(scan_image_folder(self.image_folder))
         
         # 更新当前播放列表
         if image_files:
             self.playlists[self.current_playlist] = image_files
+            self.reset_playlist_query()
             self.image_list = image_files
             self.current_index = 0
             
@@ -766,49 +3843,196 @@ class ImageViewerWindow(QMainWindow):
             self.info_label.setText("未找到图片文件")
     
     def preload_images(self):
-        """预加载图片到缓存"""
+        """按播放顺序预加载图片到缓存"""
         if not self.image_list:
             return
         
-        # 清空缓存
-        self.image_cache.clear()
+        # 预加载范围：当前图片、按播放顺序接下来的几张和之前的几张
+        order = self.current_order()
+        window = [self.current_index]
+        window += order.upcoming(self.current_index, self.preload_ahead)
+        window += order.previous(self.current_index, self.preload_behind)
+        window_paths = list(dict.fromkeys(self.image_list[i] for i in window))
         
-        # 确定预加载范围（当前索引前后各几张）
-        start_idx = max(0, self.current_index - 3)
-        end_idx = min(len(self.image_list), self.current_index + 4)
+        # 只移除不在预加载范围内的图片（移入压缩缓存），范围内已缓存的不再重复解码
+        keep = set(window_paths)
+        for path in [path for path in self.image_cache if path not in keep]:
+            self.compressed_cache.demote(path, self.image_cache.pop(path))
         
-        preload_paths = []
-        for i in range(start_idx, end_idx):
-            path = self.image_list[i]
-            if path not in self.image_cache:
-                preload_paths.append(path)
+        # 压缩缓存中有的在后台还原，其余从磁盘读取；磁盘帧缓存的容量只在播放列表长度改变时重新计算
+        target_size = self.frame_target_size()
+        if self.frame_cache_sized_for != len(self.image_list):
+            self.frame_cache_sized_for = len(self.image_list)
+            set_frame_cache_limit(len(self.image_list), self.average_frame_bytes())
+        preload_paths = [path for path in window_paths
+                         if path not in self.image_cache and not self.compressed_cache.promote(path, target_size)]
         
         # 启动预加载线程
         if preload_paths and (self.loader_thread is None or not self.loader_thread.isRunning()):
-            self.loader_thread = ImageLoaderThread(preload_paths)
+            self.loader_thread = ImageLoaderThread(preload_paths, target_size)
             self.loader_thread.image_loaded.connect(self.add_to_cache)
+            self.loader_thread.image_failed.connect(self.quarantine_image)
             self.loader_thread.start()
     
-    def add_to_cache(self, path, pixmap):
+    def frame_target_size(self):
+        """解码的目标尺寸：屏幕的像素大小，旋转90度时宽高互换，帧不会比铺满屏幕所需的更大"""
+        screen = self.screen() if hasattr(self, 'screen') else QApplication.primaryScreen()
+        size = screen.size() * screen.devicePixelRatio()
+        if self.image_rotation in (90, 270):
+            size.transpose()
+        return size
+    
+    def current_order(self):
+        """当前播放顺序对象，播放列表或顺序类型改变时重新生成"""
+        # 按播放列表名称和显示序列的版本缓存（列表被回收后 id 可能被新列表重用，不能作为键）
+        key = (self.playback_order, self.current_playlist, self.image_list_version, len(self.image_list))
+        if self.play_order is None or self.play_order_key != key:
+            count = len(self.image_list)
+            if self.playback_order == "随机播放":
+                self.play_order = ShuffleOrder(count)
+            elif self.playback_order == "加权随机(新图片优先)":
+                self.play_order = WeightedRandomOrder(self.recency_weights())
+            elif self.playback_order == "不重复随机":
+                self.play_order = NoRepeatOrder(count)
+            else:
+                self.play_order = SequentialOrder(count)
+            self.play_order_key = key
+        return self.play_order
+    
+    def recency_weights(self):
+        """加权随机的权重：按修改时间排名，最新的图片权重是最旧的4倍；索引建立之前使用相同的权重"""
+        metadata = [self.cached_metadata(path) for path in self.image_list]
+        if None in metadata:
+            # 缺少修改时间时排名会退化为播放列表中的位置，等索引建立后再重新生成
+            return [1.0] * len(metadata)
+        mtimes = [record["mtime"] for record in metadata]
+        ranks = sorted(range(len(mtimes)), key=mtimes.__getitem__)
+        weights = [1.0] * len(mtimes)
+        for rank, i in enumerate(ranks):
+            weights[i] = 1.0 + 3.0 * rank / max(1, len(mtimes) - 1)
+        return weights
+    
+    def change_playback_order(self, order):
+        """改变播放顺序"""
+        self.playback_order = order
+        self.play_order = None
+        self.prepared_frame = None
+        if order == "加权随机(新图片优先)" and self.image_list:
+            # 需要修改时间，缺少时先建立索引
+            self.ensure_playlist_index(self.reset_play_order)
+        if self.image_list:
+            self.preload_images()
+    
+    def reset_play_order(self, index=None):
+        """元数据更新后按新的权重重新生成播放顺序"""
+        self.play_order = None
+        self.prepared_frame = None
+    
+    def average_frame_bytes(self):
+        """缓存中每帧的平均字节数，缓存为空时按目标尺寸估算"""
+        if self.image_cache:
+            total = sum(image.sizeInBytes() for image in self.image_cache.values())
+            return max(1, total // len(self.image_cache))
+        target = self.frame_target_size()
+        return target.width() * target.height() * 3  # 按图片占屏幕的3/4估算
+    
+    def update_memory_budget(self):
+        """读取内存状态并应用新的缓存大小、预加载深度和工作进程数"""
+        status = read_memory_status()
+        if status is None:
+            return
+        plan = self.memory_governor.update(status, self.average_frame_bytes(), len(self.image_cache))
+        self.cache_size = plan["cache_size"]
+        self.preload_ahead = plan["preload_ahead"]
+        self.preload_behind = plan["preload_behind"]
+        self.worker_count = plan["workers"]
+        self.compressed_cache.resize(plan["compressed_bytes"])
+        if len(self.image_cache) > self.cache_size:
+            self.shed_frames(plan["pressure"])
+    
+    def shed_frames(self, pressure=False):
+        """缓存超出大小时移除价值最低的帧：先移除预加载范围以外最久未使用的，再移除最远的预加载帧"""
+        keep = []
+        if self.image_list:
+            order = self.current_order()
+            keep = [self.current_index]
+            keep += order.upcoming(self.current_index, self.preload_ahead)
+            keep += order.previous(self.current_index, self.preload_behind)
+            keep = list(dict.fromkeys(self.image_list[i] for i in keep))
+        keep_set = set(keep)
+        victims = [path for path in self.image_cache if path not in keep_set]
+        victims += [path for path in reversed(keep) if path in self.image_cache]
+        for path in victims:
+            if len(self.image_cache) <= self.cache_size:
+                break
+            image = self.image_cache.pop(path)
+            # 内存紧张时直接丢弃，不再放入压缩缓存
+            if not pressure:
+                self.compressed_cache.demote(path, image)
+    
+    def quarantine_image(self, path):
+        """隔离无法解码的图片：从所有播放列表中移除（包括重复出现的），以后不再占用播放位置"""
+        if path not in self.quarantined:
+            self.quarantined.add(path)
+            quarantine_image_file(path)
+            print(f"警告: 无法解码图片，已从播放列表中移除: {path}")
+        self.image_cache.pop(path, None)
+        self.compressed_cache.discard(path)
+        
+        # 当前显示序列（可能是排序或筛选后的视图），当前位置之前被移除的条目要从索引中扣除
+        if path in self.image_list:
+            removed_before = self.image_list[:self.current_index].count(path)
+            self.image_list[:] = [item for item in self.image_list if item != path]
+            self.current_index -= removed_before
+            if self.current_index >= len(self.image_list):
+                self.current_index = 0
+        for playlist in self.playlists.values():
+            if playlist is not self.image_list and path in playlist:
+                playlist[:] = [item for item in playlist if item != path]
+        self.update_info_label()
+    
+    def without_quarantined(self, paths):
+        """过滤掉已隔离的图片（修改过的文件、压缩包成员和播放列表文件可能再次带入）"""
+        if not self.quarantined:
+            return list(paths)
+        return [path for path in paths if path not in self.quarantined]
+    
+    def add_to_cache(self, path, image):
         """将图片添加到缓存"""
-        self.image_cache[path] = pixmap
+        self.image_cache[path] = image
+        self.image_cache.move_to_end(path)
         
-        # 如果缓存超过限制，移除最旧的图片
-        if len(self.image_cache) > self.cache_size:
-            # 使用LRU策略移除最旧的图片
-            oldest_key = next(iter(self.image_cache))
-            del self.image_cache[oldest_key]
+        # 如果缓存超过限制，移除最久未使用的图片（移入压缩缓存）
+        while len(self.image_cache) > self.cache_size:
+            oldest_key, oldest = self.image_cache.popitem(last=False)
+            self.compressed_cache.demote(oldest_key, oldest)
     
     def add_images_to_playlist(self):
         """添加图片到当前播放列表"""
+        # 文件类型过滤使用Qt实际支持的格式，另外允许选择任意文件（按文件头校验）
+        patterns = " ".join(f"*.{fmt.data().decode()}" for fmt in QImageReader.supportedImageFormats())
+        archives = " ".join("*" + ext for ext in ARCHIVE_EXTENSIONS)
         files, _ = QFileDialog.getOpenFileNames(
             self, "选择图片文件", "",
-            "图片文件 (*.jpg *.jpeg *.png *.bmp *.gif *.tiff *.webp)"
+            f"图片文件 ({patterns});;压缩包 ({archives});;所有文件 (*)"
         )
         
+        # 压缩包中的图片按扩展名列出，解码失败时再隔离，避免逐个读取成员
+        archive_files = [path for path in files if is_archive_file(path)]
+        files = [path for path in files if path not in archive_files]
+        verdicts = validate_image_files(files)
+        rejected = len(files) - sum(1 for verdict in verdicts if verdict)
+        files = [path for path, verdict in zip(files, verdicts) if verdict]
+        for archive in archive_files:
+            files.extend(scan_archive(archive))
+        files = self.without_quarantined(files)
+        if rejected:
+            self.statusBar().showMessage(f"跳过 {rejected} 个无法识别的文件", 5000)
+        
         if files:
             # 添加到当前播放列表
             self.playlists[self.current_playlist].extend(files)
+            self.reset_playlist_query()
             self.image_list = self.playlists[self.current_playlist]
             
             # 如果是第一次添加图片，显示第一张
@@ -820,6 +4044,89 @@ class ImageViewerWindow(QMainWindow):
             self.update_info_label()
             QMessageBox.information(self, "成功", f"已添加 {len(files)} 张图片到播放列表")
     
+    def dragEnterEvent(self, event):
+        """接受拖入的文件、文件夹和路径列表"""
+        mime = event.mimeData()
+        if mime.hasUrls() or mime.hasText():
+            event.acceptProposedAction()
+        else:
+            event.ignore()
+    
+    def dragMoveEvent(self, event):
+        event.acceptProposedAction()
+    
+    def dropEvent(self, event):
+        """拖放导入：展开和校验在后台线程中进行"""
+        mime = event.mimeData()
+        if mime.hasUrls():
+            urls = mime.urls()
+        else:
+            urls = [QUrl.fromUserInput(line.strip()) for line in mime.text().splitlines() if line.strip()]
+        
+        paths = [url.toLocalFile() for url in urls if url.isLocalFile()]
+        if len(paths) < len(urls):
+            print(f"警告: 忽略了 {len(urls) - len(paths)} 个非本地文件的链接")
+        if not paths:
+            event.ignore()
+            return
+        event.acceptProposedAction()
+        
+        # 拖到左侧某个播放列表上时添加到该列表，否则添加到当前播放列表
+        target = self.current_playlist
+        viewport = self.playlist_widget.viewport()
+        item = self.playlist_widget.itemAt(viewport.mapFrom(self, event.pos()))
+        if item is not None and item.text() in self.playlists:
+            target = item.text()
+        self.ingest_dropped_paths(target, paths)
+    
+    def ingest_dropped_paths(self, playlist_name, paths):
+        """启动拖放导入线程"""
+        thread = DropIngestThread(playlist_name, paths, list(self.playlists[playlist_name]))
+        thread.batch_ready.connect(lambda name, batch: self.on_ingest_batch(name, batch, thread))
+        thread.ingest_finished.connect(
+            lambda name, added, rejected: self.on_ingest_finished(name, added - thread.duplicates, rejected))
+        thread.finished.connect(lambda: self.ingest_threads.remove(thread))
+        self.ingest_threads.append(thread)
+        self.statusBar().showMessage("正在导入拖入的文件...")
+        thread.start()
+    
+    def on_ingest_batch(self, playlist_name, paths, thread=None):
+        """把一批校验过的图片追加到播放列表"""
+        if playlist_name not in self.playlists:
+            return
+        playlist = self.playlists[playlist_name]
+        # 导入线程只知道开始时的播放列表，同时拖入的几批可能包含相同的图片，按当前列表去重
+        existing = set(playlist)
+        fresh = [path for path in dict.fromkeys(paths) if path not in existing]
+        if thread is not None:
+            thread.duplicates += len(paths) - len(fresh)
+        paths = self.without_quarantined(fresh)
+        if not paths:
+            return
+        playlist.extend(paths)
+        
+        if playlist_name == self.current_playlist:
+            if self.image_list is not playlist:
+                # 有排序或筛选时恢复完整列表，尽量保持当前图片不变
+                current_path = self.image_list[self.current_index] if self.image_list else None
+                self.reset_playlist_query()
+                self.image_list = playlist
+                self.current_index = playlist.index(current_path) if current_path in playlist else 0
+            # 第一次添加图片时显示第一张
+            if len(playlist) == len(paths):
+                self.current_index = 0
+                self.preload_images()
+                self.display_current_image()
+            self.update_info_label()
+        self.statusBar().showMessage(f"正在导入: '{playlist_name}' 共 {len(playlist)} 张图片")
+    
+    def on_ingest_finished(self, playlist_name, added, rejected):
+        """拖放导入完成"""
+        message = f"已添加 {added} 张图片到 '{playlist_name}'"
+        if rejected:
+            message += f"，跳过 {rejected} 个无法识别的文件"
+        self.statusBar().showMessage(message, 5000)
+    
     def create_new_playlist(self):
         """创建新的播放列表"""
         name, ok = QInputDialog.getText(self, "新建播放列表", "请输入播放列表名称:")
@@ -831,6 +4138,7 @@ class ImageViewerWindow(QMainWindow):
             
             self.playlists[name] = []
             self.current_playlist = name
+            self.reset_playlist_query()
             self.image_list = []
             self.current_index = 0
             self.update_playlist_display()
@@ -852,12 +4160,429 @@ class ImageViewerWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             del self.playlists[self.current_playlist]
             self.current_playlist = "默认列表"
+            self.reset_playlist_query()
             self.image_list = self.playlists[self.current_playlist]
             self.current_index = 0
             self.update_playlist_display()
             self.update_info_label()
             self.image_label.setText("请添加图片到播放列表")
     
+    def show_playlist_menu(self, pos):
+        """播放列表右键菜单"""
+        menu = QMenu(self)
+        
+        find_duplicates_action = QAction("查找重复图片", self)
+        find_duplicates_action.triggered.connect(self.find_duplicate_images)
+        menu.addAction(find_duplicates_action)
+        
+        find_similar_action = QAction("查找类似图片", self)
+        find_similar_action.setEnabled(bool(self.image_list))
+        find_similar_action.triggered.connect(self.find_similar_images)
+        menu.addAction(find_similar_action)
+        
+        refresh_similar_action = QAction("整理相似度索引", self)
+        refresh_similar_action.triggered.connect(self.refresh_similarity_index)
+        menu.addAction(refresh_similar_action)
+        
+        batch_action = QAction("批量处理...", self)
+        batch_action.triggered.connect(self.batch_process_playlist)
+        menu.addAction(batch_action)
+        
+        sheet_action = QAction("生成联系表...", self)
+        sheet_action.triggered.connect(lambda: self.create_contact_sheet(export=False))
+        menu.addAction(sheet_action)
+        
+        export_sheet_action = QAction("导出联系表...", self)
+        export_sheet_action.triggered.connect(lambda: self.create_contact_sheet(export=True))
+        menu.addAction(export_sheet_action)
+        
+        archive_action = QAction("打开压缩包...", self)
+        archive_action.triggered.connect(self.open_archive)
+        menu.addAction(archive_action)
+        
+        # 排序
+        sort_menu = menu.addMenu("排序")
+        for key, label in PlaylistIndex.SORT_KEYS.items():
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(self.playlist_query["sort"] == key)
+            action.triggered.connect(lambda checked, key=key: self.sort_playlist(key))
+            sort_menu.addAction(action)
+        sort_menu.addSeparator()
+        reverse_action = QAction("倒序", self)
+        reverse_action.setCheckable(True)
+        reverse_action.setChecked(self.playlist_query["reverse"])
+        reverse_action.triggered.connect(self.toggle_sort_reverse)
+        sort_menu.addAction(reverse_action)
+        
+        # 筛选
+        filter_menu = menu.addMenu("筛选")
+        filters = self.playlist_query["filters"]
+        for orientation in PlaylistIndex.ORIENTATIONS[:3]:
+            action = QAction(orientation, self)
+            action.setCheckable(True)
+            action.setChecked(filters.get("orientation") == orientation)
+            action.triggered.connect(lambda checked, value=orientation: self.filter_playlist("orientation", value))
+            filter_menu.addAction(action)
+        
+        index = self.playlist_indexes.get(self.current_playlist)
+        cameras = index.values("camera") if index is not None else []
+        if cameras:
+            camera_menu = filter_menu.addMenu("相机")
+            for camera in cameras:
+                action = QAction(camera, self)
+                action.setCheckable(True)
+                action.setChecked(filters.get("camera") == camera)
+                action.triggered.connect(lambda checked, value=camera: self.filter_playlist("camera", value))
+                camera_menu.addAction(action)
+        
+        # 尺寸和文件大小按预设区间筛选
+        for column, (title, ranges) in RANGE_FILTERS.items():
+            range_menu = filter_menu.addMenu(title)
+            for label, bounds in ranges:
+                action = QAction(label, self)
+                action.setCheckable(True)
+                action.setChecked(filters.get(column) == bounds)
+                action.triggered.connect(lambda checked, column=column, bounds=bounds: self.filter_playlist(column, bounds))
+                range_menu.addAction(action)
+        
+        filter_menu.addSeparator()
+        clear_action = QAction("清除筛选", self)
+        clear_action.setEnabled(bool(filters))
+        clear_action.triggered.connect(self.clear_playlist_filter)
+        filter_menu.addAction(clear_action)
+        
+        menu.exec_(self.playlist_widget.mapToGlobal(pos))
+    
+    def batch_process_playlist(self):
+        """对当前显示的整个播放列表批量旋转、翻转、缩放或转换格式"""
+        if self.batch_thread is not None and self.batch_thread.isRunning():
+            QMessageBox.information(self, "批量处理", "已有批量处理正在进行")
+            return
+        if not self.image_list:
+            QMessageBox.information(self, "批量处理", "播放列表为空")
+            return
+        
+        dialog = BatchOperationDialog(self, self.image_rotation, self.image_flip_h, self.image_flip_v)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "选择输出文件夹", self.image_folder)
+        if not output_dir:
+            return
+        # 输出到原图所在的文件夹会直接覆盖原图（断点续传的记录也会写进去），不允许
+        conflicts = batch_output_conflicts(self.image_list, output_dir)
+        if conflicts:
+            QMessageBox.warning(self, "批量处理",
+                                f"输出文件夹中有 {len(conflicts)} 张原图（如 {os.path.basename(conflicts[0])}），"
+                                "处理结果会覆盖原图。\n请选择其他文件夹。")
+            return
+        
+        self.batch_thread = BatchOperationThread(self.image_list, output_dir, dialog.operations(), self.worker_count)
+        self.batch_progress = QProgressDialog("正在批量处理图片...", "取消", 0, len(self.batch_thread.image_paths), self)
+        self.batch_progress.setWindowTitle("批量处理")
+        self.batch_progress.setWindowModality(Qt.NonModal)
+        self.batch_progress.canceled.connect(self.batch_thread.cancel)
+        self.batch_thread.progress.connect(self.on_batch_progress)
+        self.batch_thread.batch_finished.connect(self.on_batch_finished)
+        self.batch_thread.start()
+    
+    def on_batch_progress(self, done, total):
+        """批量处理进度"""
+        if self.batch_progress is not None and not self.batch_progress.wasCanceled():
+            self.batch_progress.setValue(done)
+        self.statusBar().showMessage(f"批量处理: {done}/{total}")
+    
+    def on_batch_finished(self, completed, failed, errors):
+        """批量处理完成"""
+        if self.batch_progress is not None:
+            self.batch_progress.close()
+            self.batch_progress = None
+        self.statusBar().clearMessage()
+        
+        message = f"已完成 {completed} 张，失败 {failed} 张"
+        if self.batch_thread.cancelled:
+            message = "批量处理已取消，再次对同一文件夹执行相同操作可继续。\n" + message
+        if errors:
+            message += "\n\n" + "\n".join(errors[:10])
+        QMessageBox.information(self, "批量处理", message)
+    
+    def create_contact_sheet(self, export=False):
+        """为当前显示的播放列表生成联系表（缩略图网格），在播放器中查看或导出到文件夹"""
+        if not NUMPY_SUPPORT:
+            QMessageBox.warning(self, "联系表", "生成联系表需要安装 numpy")
+            return
+        if self.sheet_thread is not None and self.sheet_thread.isRunning():
+            QMessageBox.information(self, "联系表", "已有联系表正在生成")
+            return
+        if not self.image_list:
+            QMessageBox.information(self, "联系表", "播放列表为空")
+            return
+        
+        dialog = ContactSheetDialog(self, len(self.image_list))
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        if export:
+            output_dir = QFileDialog.getExistingDirectory(self, "选择输出文件夹", self.image_folder)
+            if not output_dir:
+                return
+        else:
+            output_dir = os.path.join(CONTACT_SHEET_DIR, hashlib.sha1(self.current_playlist.encode('utf-8')).hexdigest()[:12])
+            # 生成之前清理最久未使用的联系表，新生成的页面和仍作为播放列表打开的联系表不会被删除
+            live_dirs = {os.path.dirname(page) for name, pages in self.playlists.items()
+                         if name.startswith("联系表: ") for page in pages}
+            trim_cache_dir(CONTACT_SHEET_DIR, "", CONTACT_SHEET_CACHE_BYTES, live_dirs)
+        
+        self.sheet_thread = ContactSheetThread(list(self.image_list), output_dir, self.current_playlist,
+                                               workers=self.worker_count, **dialog.options())
+        self.sheet_export = export
+        self.sheet_source = self.current_playlist
+        self.sheet_progress = QProgressDialog("正在生成联系表...", "取消", 0, len(self.image_list), self)
+        self.sheet_progress.setWindowTitle("联系表")
+        self.sheet_progress.setWindowModality(Qt.NonModal)
+        self.sheet_progress.canceled.connect(self.sheet_thread.cancel)
+        self.sheet_thread.progress.connect(self.on_sheet_progress)
+        self.sheet_thread.sheet_finished.connect(self.on_sheet_finished)
+        self.sheet_thread.start()
+    
+    def on_sheet_progress(self, done, total):
+        """联系表生成进度"""
+        if self.sheet_progress is not None and not self.sheet_progress.wasCanceled():
+            self.sheet_progress.setValue(done)
+        self.statusBar().showMessage(f"正在生成联系表: {done}/{total}")
+    
+    def on_sheet_finished(self, pages):
+        """联系表生成完成：导出时提示结果，否则作为新播放列表打开"""
+        if self.sheet_progress is not None:
+            self.sheet_progress.close()
+            self.sheet_progress = None
+        self.statusBar().clearMessage()
+        if self.sheet_thread.cancelled or not pages:
+            return
+        if self.sheet_export:
+            QMessageBox.information(self, "联系表", f"已导出 {len(pages)} 页联系表到\n{os.path.dirname(pages[0])}")
+            return
+        
+        # 同一播放列表上次生成的页数更多时，多出的旧页面已不再使用
+        output_dir = os.path.dirname(pages[0])
+        current = {os.path.basename(page) for page in pages}
+        for entry in os.scandir(output_dir):
+            if entry.is_file() and entry.name not in current:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        
+        name = f"联系表: {self.sheet_source}"
+        self.playlists[name] = pages
+        self.update_playlist_display()
+        self.select_playlist(name)
+    
+    def cached_metadata(self, path):
+        """当前版本图片的已探测元数据，没有时返回None"""
+        try:
+            return self.image_metadata.get(verdict_key(path))
+        except (OSError, zipfile.BadZipFile, tarfile.TarError):
+            return None
+    
+    def ensure_playlist_index(self, callback):
+        """确保当前播放列表已建立索引，否则在后台建立后再回调"""
+        images = self.playlists[self.current_playlist]
+        index = self.playlist_indexes.get(self.current_playlist)
+        if index is not None and index.paths == images:
+            callback(index)
+            return
+        
+        # 请求按播放列表记录，同一个回调只执行一次
+        self.pending_queries.setdefault(self.current_playlist, {})[callback] = None
+        if self.index_thread is not None and self.index_thread.isRunning():
+            return  # 正在为其他播放列表建立索引时，完成后再为当前播放列表建立
+        self.statusBar().showMessage("正在建立播放列表索引...")
+        self.index_thread = PlaylistIndexThread(self.current_playlist, images, self.image_metadata)
+        self.index_thread.progress.connect(
+            lambda done, total: self.statusBar().showMessage(f"正在建立索引: {done}/{total}"))
+        self.index_thread.index_ready.connect(self.on_playlist_index_ready)
+        self.index_thread.start()
+    
+    def on_playlist_index_ready(self, playlist_name, index, metadata):
+        """播放列表索引建立完成"""
+        # 发出信号后线程随即结束，等它退出后才能为其他播放列表启动新的线程
+        self.index_thread.wait()
+        self.image_metadata.update(metadata)
+        self.statusBar().clearMessage()
+        if playlist_name in self.playlists:
+            self.playlist_indexes[playlist_name] = index
+        
+        # 只执行当前播放列表的请求（建立索引期间切换了播放列表时为新的播放列表重新建立），
+        # 其他播放列表的请求已经过时
+        callbacks = self.pending_queries.pop(self.current_playlist, {})
+        self.pending_queries.clear()
+        for callback in callbacks:
+            self.ensure_playlist_index(callback)
+    
+    def sort_playlist(self, key):
+        """按字段排序当前播放列表"""
+        self.playlist_query["sort"] = key
+        self.ensure_playlist_index(self.apply_playlist_query)
+    
+    def toggle_sort_reverse(self, checked):
+        """切换倒序"""
+        self.playlist_query["reverse"] = checked
+        self.ensure_playlist_index(self.apply_playlist_query)
+    
+    def filter_playlist(self, column, value):
+        """按字段筛选当前播放列表，再次选择相同的值时取消该条件"""
+        filters = self.playlist_query["filters"]
+        if filters.get(column) == value:
+            del filters[column]
+        else:
+            filters[column] = value
+        self.ensure_playlist_index(self.apply_playlist_query)
+    
+    def clear_playlist_filter(self):
+        """清除筛选条件"""
+        self.playlist_query["filters"] = {}
+        self.ensure_playlist_index(self.apply_playlist_query)
+    
+    def reset_playlist_query(self):
+        """清除排序和筛选，显示完整的播放列表"""
+        self.playlist_query = {"sort": None, "reverse": False, "filters": {}}
+    
+    def apply_playlist_query(self, index):
+        """用索引生成当前显示的图片序列，尽量保持当前图片不变"""
+        current_path = self.image_list[self.current_index] if self.image_list else None
+        query = self.playlist_query
+        
+        # 排序和筛选只改变显示序列，播放列表本身保持原有顺序
+        if query["sort"] or query["reverse"] or query["filters"]:
+            self.image_list = index.query(query["sort"], query["reverse"], query["filters"])
+        else:
+            self.image_list = self.playlists[self.current_playlist]
+        
+        if current_path in self.image_list:
+            self.current_index = self.image_list.index(current_path)
+        else:
+            self.current_index = 0
+        
+        if self.image_list:
+            self.preload_images()
+            self.display_current_image()
+        else:
+            self.image_label.setText("没有符合筛选条件的图片")
+        self.update_info_label()
+    
+    def find_duplicate_images(self):
+        """在所有播放列表中查找重复和近似重复的图片"""
+        if not NUMPY_SUPPORT:
+            QMessageBox.information(self, "查找重复", "查找重复图片需要安装 numpy")
+            return
+        if self.duplicate_thread is not None and self.duplicate_thread.isRunning():
+            return
+        
+        all_images = [path for images in self.playlists.values() for path in images]
+        if not all_images:
+            QMessageBox.information(self, "查找重复", "播放列表为空")
+            return
+        
+        self.duplicate_thread = DuplicateScanThread(all_images, self.worker_count)
+        self.duplicate_thread.progress.connect(
+            lambda done, total: self.statusBar().showMessage(f"正在计算图片指纹: {done}/{total}"))
+        self.duplicate_thread.scan_finished.connect(self.on_duplicate_scan_finished)
+        self.duplicate_thread.start()
+    
+    def on_duplicate_scan_finished(self, groups):
+        """重复扫描完成，询问是否从播放列表中移除多余的副本"""
+        self.statusBar().clearMessage()
+        redundant = sum(len(group) - 1 for group in groups)
+        if not groups:
+            QMessageBox.information(self, "查找重复", "没有发现重复图片")
+            return
+        
+        reply = QMessageBox.question(
+            self, "查找重复",
+            f"发现 {len(groups)} 组重复图片，共 {redundant} 张多余副本。\n"
+            f"是否从播放列表中移除副本（保留分辨率最高的一张）?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        # 每组中排在第一位的是分辨率最高的图片
+        rank = {}
+        for group in groups:
+            for order, path in enumerate(group):
+                rank[path] = (id(group), order)
+        
+        removed = 0
+        for name, images in self.playlists.items():
+            kept_groups = {}
+            for path in images:
+                if path in rank:
+                    group_id, order = rank[path]
+                    if group_id not in kept_groups or order < kept_groups[group_id]:
+                        kept_groups[group_id] = order
+            filtered = [path for path in images
+                        if path not in rank or kept_groups[rank[path][0]] == rank[path][1]]
+            # 同一路径重复出现时只保留一次
+            filtered = list(dict.fromkeys(filtered))
+            removed += len(images) - len(filtered)
+            images[:] = filtered
+        
+        self.reset_playlist_query()
+        self.image_list = self.playlists[self.current_playlist]
+        self.current_index = min(self.current_index, max(0, len(self.image_list) - 1))
+        if self.image_list:
+            self.display_current_image()
+        self.update_info_label()
+        self.statusBar().showMessage(f"已移除 {removed} 张重复图片", 3000)
+    
+    def find_similar_images(self):
+        """在所有播放列表中查找与当前图片相似的图片，结果作为新的播放列表"""
+        if not self.image_list:
+            return
+        self.start_similarity_thread(self.image_list[self.current_index], self.on_similarity_search_finished,
+                                     "正在查找类似图片...")
+    
+    def refresh_similarity_index(self):
+        """整理相似度索引：重新计算修改过的图片，移除已删除的图片（文件很多时较慢）"""
+        self.start_similarity_thread(None, self.on_similarity_index_refreshed, "正在整理相似度索引...")
+    
+    def start_similarity_thread(self, query_path, finished, message):
+        """在后台补齐相似度索引，query_path 为None时整理整个索引"""
+        if not NUMPY_SUPPORT:
+            QMessageBox.information(self, "查找类似", "查找类似图片需要安装 numpy")
+            return
+        if self.similarity_thread is not None and self.similarity_thread.isRunning():
+            return
+        
+        if self.similarity_index is None:
+            self.similarity_index = SimilarityIndex()
+        # 不在已有的“类似”列表中搜索，避免结果互相引用
+        all_images = [path for name, images in self.playlists.items()
+                      if not name.startswith("类似: ") for path in images]
+        self.similarity_thread = SimilaritySearchThread(self.similarity_index, query_path, all_images,
+                                                        self.worker_count, refresh=query_path is None)
+        self.similarity_thread.progress.connect(
+            lambda done, total: self.statusBar().showMessage(f"正在计算图片特征: {done}/{total}"))
+        self.similarity_thread.search_finished.connect(finished)
+        self.statusBar().showMessage(message)
+        self.similarity_thread.start()
+    
+    def on_similarity_index_refreshed(self, query_path, paths):
+        """相似度索引整理完成"""
+        self.statusBar().showMessage(f"相似度索引已整理，共 {len(self.similarity_index)} 张图片", 5000)
+    
+    def on_similarity_search_finished(self, query_path, paths):
+        """相似搜索完成，以查询图片开头建立“类似”播放列表"""
+        self.statusBar().clearMessage()
+        if not paths:
+            QMessageBox.information(self, "查找类似", "无法读取当前图片")
+            return
+        
+        name = f"类似: {os.path.basename(query_path.split(ARCHIVE_SEPARATOR)[-1])}"
+        self.playlists[name] = list(dict.fromkeys([query_path] + paths))
+        self.update_playlist_display()
+        self.select_playlist(name)
+    
     def switch_playlist(self, current, previous):
         """切换播放列表"""
         if current is None:
@@ -866,6 +4591,7 @@ class ImageViewerWindow(QMainWindow):
         playlist_name = current.text()
         if playlist_name in self.playlists:
             self.current_playlist = playlist_name
+            self.reset_playlist_query()
             self.image_list = self.playlists[playlist_name]
             self.current_index = 0
             
@@ -898,56 +4624,113 @@ class ImageViewerWindow(QMainWindow):
         if hasattr(self, 'animation') and self.animation:
             self.animation.stop()
         
-        # 获取当前图片路径
-        image_path = self.image_list[self.current_index]
+        # 获取当前图片路径，无法解码的图片被隔离后显示下一张，最多尝试整个列表一遍
+        image_path = None
+        for _ in range(len(self.image_list)):
+            if not self.image_list:
+                break
+            self.current_index %= len(self.image_list)
+            image_path = self.image_list[self.current_index]
+            if image_path in self.quarantined:
+                self.quarantine_image(image_path)
+            else:
+                # 优先使用提前准备好的帧，避免在截止时间上解码和缩放
+                frame_key = self.frame_key(image_path)
+                if self.prepared_frame is not None and self.prepared_frame[0] == frame_key:
+                    scaled_pixmap = self.prepared_frame[1]
+                else:
+                    scaled_pixmap = self.render_frame(image_path)
+                self.prepared_frame = None
+                if image_path not in self.quarantined:
+                    break
+            # 被隔离的图片仍留在当前位置时（不在任何播放列表中的视图）显式前进
+            if self.image_list and self.image_list[self.current_index % len(self.image_list)] == image_path:
+                self.current_index = (self.current_index + 1) % len(self.image_list)
         
+        if image_path is None or image_path in self.quarantined:
+            self.image_label.setText("播放列表中没有可以显示的图片")
+            self.update_info_label()
+            return
+        
+        if scaled_pixmap is not None:
+            # 根据过渡效果类型显示图片
+            if self.transition_type == "无" or not hasattr(self, 'previous_pixmap'):
+                # 直接显示图片
+                self.image_label.setPixmap(scaled_pixmap)
+            else:
+                # 使用过渡效果
+                self.apply_transition_effect(scaled_pixmap)
+            
+            # 保存当前图片用于下一次过渡
+            self.previous_pixmap = scaled_pixmap
+            
+            # 更新图片信息
+            self.update_image_info(image_path)
+        
+        # 预加载下一批图片
+        self.preload_images()
+    
+    def frame_key(self, image_path):
+        """准备帧的缓存键：图片路径、显示区域大小和当前变换"""
+        label_size = self.image_label.size()
+        return (image_path, label_size.width(), label_size.height(),
+                self.image_rotation, self.image_flip_h, self.image_flip_v)
+    
+    def render_frame(self, image_path):
+        """解码（或取缓存）、变换并缩放图片，返回可直接显示的图片"""
         # 检查图片是否在缓存中
         if image_path in self.image_cache:
-            pixmap = self.image_cache[image_path]
+            self.cache_hits += 1
+            image = self.image_cache[image_path]
+            self.image_cache.move_to_end(image_path)
         else:
-            # 如果不在缓存中，直接加载（会阻塞UI，尽量避免）
-            pixmap = QPixmap(image_path)
+            self.cache_misses += 1
+            # 如果不在缓存中，先从压缩缓存还原，否则直接加载（会阻塞UI，尽量避免）
+            target_size = self.frame_target_size()
+            image = self.compressed_cache.restore(image_path, target_size)
+            if image is None:
+                image = load_display_image(image_path, target_size)
+            if image.isNull():
+                self.quarantine_image(image_path)
+                return None
             # 添加到缓存
-            self.image_cache[image_path] = pixmap
+            self.add_to_cache(image_path, image)
         
         # 应用变换（旋转和翻转）
-        if not pixmap.isNull():
-            transform = QTransform()
-            transform.rotate(self.image_rotation)
-            if self.image_flip_h:
-                transform.scale(-1, 1)
-            if self.image_flip_v:
-                transform.scale(1, -1)
-            
-            if not transform.isIdentity():
-                pixmap = pixmap.transformed(transform, Qt.SmoothTransformation)
-            
-            # 缩放图片以适应标签大小，保持纵横比
-            label_size = self.image_label.size()
-            if label_size.width() > 10 and label_size.height() > 10:  # 确保标签有有效大小
-                scaled_pixmap = pixmap.scaled(
-                    label_size.width() - 20, 
-                    label_size.height() - 20,
-                    Qt.KeepAspectRatio, 
-                    Qt.SmoothTransformation
-                )
-                
-                # 根据过渡效果类型显示图片
-                if self.transition_type == "无" or not hasattr(self, 'previous_pixmap'):
-                    # 直接显示图片
-                    self.image_label.setPixmap(scaled_pixmap)
-                else:
-                    # 使用过渡效果
-                    self.apply_transition_effect(scaled_pixmap)
-                
-                # 保存当前图片用于下一次过渡
-                self.previous_pixmap = scaled_pixmap
-                
-                # 更新图片信息
-                self.update_image_info(image_path)
+        transform = QTransform()
+        transform.rotate(self.image_rotation)
+        if self.image_flip_h:
+            transform.scale(-1, 1)
+        if self.image_flip_v:
+            transform.scale(1, -1)
         
-        # 预加载下一批图片
-        self.preload_images()
+        if not transform.isIdentity():
+            image = image.transformed(transform, Qt.SmoothTransformation)
+        
+        # 缩放图片以适应标签大小，保持纵横比
+        label_size = self.image_label.size()
+        if label_size.width() <= 10 or label_size.height() <= 10:  # 确保标签有有效大小
+            return None
+        
+        return QPixmap.fromImage(image.scaled(
+            label_size.width() - 20, 
+            label_size.height() - 20,
+            Qt.KeepAspectRatio, 
+            Qt.SmoothTransformation
+        ))
+    
+    def prepare_next_frame(self):
+        """在截止时间之前准备下一张图片，切换时只需显示"""
+        if not self.image_list:
+            return
+        
+        next_index = self.current_order().upcoming(self.current_index, 1)
+        if not next_index:
+            return
+        image_path = self.image_list[next_index[0]]
+        scaled_pixmap = self.render_frame(image_path)
+        if scaled_pixmap is not None:
+            self.prepared_frame = (self.frame_key(image_path), scaled_pixmap)
     
     def apply_transition_effect(self, new_pixmap):
         """应用过渡效果"""
@@ -961,9 +4744,12 @@ class ImageViewerWindow(QMainWindow):
     def update_image_info(self, image_path):
         """更新图片信息显示"""
         try:
-            # 获取文件信息
-            file_size = os.path.getsize(image_path)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(image_path))
+            # 获取文件信息（已建立索引的图片直接使用缓存的元数据）
+            metadata = self.cached_metadata(image_path)
+            if metadata is None:
+                metadata = probe_image_metadata(image_path)
+                self.image_metadata[verdict_key(image_path)] = metadata
+            file_size = metadata["size"]
             
             # 格式化文件大小
             size_unit = "B"
@@ -977,20 +4763,11 @@ class ImageViewerWindow(QMainWindow):
             
             size_str = f"{size_value:.1f} {size_unit}"
             
-            # 获取图片尺寸
-            pixmap = QPixmap(image_path)
-            width, height = pixmap.width(), pixmap.height()
+            # 图片尺寸只读取文件头，不解码整张图片
+            width, height = metadata["width"], metadata["height"]
             
-            # 尝试获取EXIF信息
-            exif_info = ""
-            if EXIF_SUPPORT:
-                try:
-                    exif_data = piexif.load(image_path)
-                    if "0th" in exif_data and piexif.ImageIFD.Model in exif_data["0th"]:
-                        camera_model = exif_data["0th"][piexif.ImageIFD.Model].decode('utf-8')
-                        exif_info = f" | 相机: {camera_model}"
-                except:
-                    pass  # 忽略EXIF解析错误
+            # EXIF中的相机型号
+            exif_info = f" | 相机: {metadata['camera']}" if metadata["camera"] else ""
             
             # 更新信息标签
             info_text = f"{os.path.basename(image_path)} | {width}×{height} | {size_str}{exif_info}"
@@ -1004,7 +4781,7 @@ class ImageViewerWindow(QMainWindow):
         if not self.image_list:
             return
         
-        self.current_index = (self.current_index + 1) % len(self.image_list)
+        self.current_index = self.current_order().next_index(self.current_index)
         self.display_current_image()
         self.update_info_label()
     
@@ -1013,17 +4790,226 @@ class ImageViewerWindow(QMainWindow):
         if not self.image_list:
             return
         
-        self.current_index = (self.current_index - 1) % len(self.image_list)
+        self.current_index = self.current_order().prev_index(self.current_index)
+        self.display_current_image()
+        self.update_info_label()
+    
+    def navigate_step(self, steps):
+        """按钮或方向键导航：连续快速导航（如按住方向键）时进入快速浏览"""
+        now = time.monotonic()
+        rapid = (now - self.last_nav_time) * 1000 < SCRUB_TRIGGER_MS
+        self.last_nav_time = now
+        if rapid or self.scrubbing:
+            self.scrub_to(offset=steps)
+        elif steps > 0:
+            self.next_image()
+        else:
+            self.prev_image()
+    
+    def scrub_to(self, index=None, offset=0):
+        """快速浏览：只移动位置，渲染合并到下一帧，停止操作后再渲染完整画质"""
+        if not self.image_list:
+            return
+        base = self.current_index if index is None else index % len(self.image_list)
+        self.current_index = self.current_order().advance(base, offset) if offset else base
+        self.scrubbing = True
+        if not self.scrub_render_timer.isActive():
+            self.scrub_render_timer.start(SCRUB_FRAME_MS)
+        self.scrub_settle_timer.start(SCRUB_SETTLE_MS)
+    
+    def render_scrub_frame(self):
+        """快速浏览：用已缓存的帧或缩略图快速缩放显示，不读取图片信息"""
+        if not self.scrubbing or not self.image_list:
+            return
+        image_path = self.image_list[self.current_index]
+        # 缓存的帧是QImage，缩略图是QPixmap，两者的变换和缩放接口相同
+        pixmap = self.image_cache.get(image_path)
+        if pixmap is None:
+            pixmap = self.thumbnail_cache.get(image_path)
+        
+        if pixmap is None:
+            # 内存中没有缩略图时交给后台读取（磁盘缓存或重新生成），暂时保留当前画面
+            self.thumbnail_loader.request([image_path])
+        else:
+            transform = QTransform()
+            transform.rotate(self.image_rotation)
+            if self.image_flip_h:
+                transform.scale(-1, 1)
+            if self.image_flip_v:
+                transform.scale(1, -1)
+            if not transform.isIdentity():
+                pixmap = pixmap.transformed(transform)
+            label_size = self.image_label.size()
+            pixmap = pixmap.scaled(
+                label_size.width() - 20, label_size.height() - 20,
+                Qt.KeepAspectRatio, Qt.FastTransformation)
+            self.image_label.setPixmap(pixmap if isinstance(pixmap, QPixmap) else QPixmap.fromImage(pixmap))
+        self.image_info_label.setText(os.path.basename(image_path))
+        self.update_info_label()
+    
+    def cache_thumbnail(self, path, pixmap):
+        """把缩略图放入内存缓存"""
+        self.thumbnail_cache[path] = pixmap
+        self.thumbnail_cache.move_to_end(path)
+        while len(self.thumbnail_cache) > SCRUB_THUMBNAIL_CACHE:
+            self.thumbnail_cache.popitem(last=False)
+    
+    def on_thumbnail_ready(self, path, image):
+        """后台生成的缩略图完成"""
+        self.cache_thumbnail(path, QPixmap.fromImage(image))
+        if self.scrubbing and self.image_list and self.image_list[self.current_index] == path:
+            if not self.scrub_render_timer.isActive():
+                self.scrub_render_timer.start(SCRUB_FRAME_MS)
+    
+    def end_scrub(self):
+        """停止快速浏览，渲染完整画质的当前图片"""
+        self.scrubbing = False
+        self.scrub_render_timer.stop()
+        self.prepared_frame = None
+        self.display_current_image()
+        self.update_info_label()
+    
+    def navigate_to(self, index=None, offset=0):
+        """跳转到指定序号（None表示当前图片）再偏移若干张，只渲染一次"""
+        if not self.image_list:
+            return
+        base = self.current_index if index is None else index % len(self.image_list)
+        self.current_index = self.current_order().advance(base, offset) if offset else base
+        self.display_current_image()
+        self.update_info_label()
+    
+    def select_playlist(self, name):
+        """按名称切换播放列表"""
+        if name not in self.playlists:
+            return False
+        for row in range(self.playlist_widget.count()):
+            item = self.playlist_widget.item(row)
+            if item.text() == name:
+                if item is self.playlist_widget.currentItem():
+                    self.switch_playlist(item, None)
+                else:
+                    self.playlist_widget.setCurrentItem(item)
+                break
+        return True
+    
+    def open_archive(self):
+        """把压缩包（zip/cbz/tar）作为播放列表打开，不解压"""
+        archives = " ".join("*" + ext for ext in ARCHIVE_EXTENSIONS)
+        path, _ = QFileDialog.getOpenFileName(self, "选择压缩包", "", f"压缩包 ({archives})")
+        if path and not self.open_paths([path]):
+            QMessageBox.warning(self, "警告", "压缩包中没有找到支持的图片")
+    
+    def start_control_server(self, port=None, local_name=None):
+        """启动远程控制服务（本机端口）和单实例本地套接字"""
+        if not port and not local_name:
+            return
+        try:
+            self.control_server = ControlServer(self, port, local_name)
+            if port:
+                print(f"远程控制服务已启动: 127.0.0.1:{port}")
+        except OSError as e:
+            print(f"远程控制服务启动失败: {e}")
+    
+    def open_paths(self, paths):
+        """打开文件夹或图片文件（来自命令行或其他实例转交的请求），返回图片数量"""
+        image_files = []
+        folders = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path) or is_archive_file(path):
+                folders.append(path)
+                image_files.extend(scan_image_folder(path))
+            elif os.path.isfile(path) and validate_image_file(path):
+                image_files.append(path)
+        image_files = self.without_quarantined(image_files)
+        
+        # 把窗口带到前台
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        
+        if not image_files:
+            return 0
+        
+        # 单个文件夹使用文件夹名作为播放列表名称
+        if len(paths) == 1 and len(folders) == 1:
+            if os.path.isdir(folders[0]):
+                self.image_folder = folders[0]
+            name = os.path.basename(folders[0]) or folders[0]
+        else:
+            name = "打开的文件"
+        name = self.unused_playlist_name(name, image_files)
+        
+        self.playlists[name] = image_files
+        self.current_playlist = name
+        self.reset_playlist_query()
+        self.image_list = image_files
+        self.current_index = 0
+        self.update_playlist_display()
+        
+        self.preload_images()
         self.display_current_image()
         self.update_info_label()
+        self.start_slideshow()
+        return len(image_files)
+    
+    def unused_playlist_name(self, name, images):
+        """同名播放列表已有其他内容时加上序号，避免覆盖；内容相同（重复打开）时沿用原列表"""
+        candidate = name
+        number = 2
+        while candidate in self.playlists and self.playlists[candidate] != images:
+            candidate = f"{name} ({number})"
+            number += 1
+        return candidate
+    
+    def control_status(self):
+        """远程控制用的当前状态"""
+        current = self.image_list[self.current_index] if self.image_list else None
+        return {
+            "playlist": self.current_playlist,
+            "index": self.current_index + 1 if self.image_list else 0,
+            "count": len(self.image_list),
+            "current": current,
+            "playing": self.timer.isActive(),
+            "interval": self.slide_interval,
+            "transition": self.transition_type,
+            "music": os.path.basename(self.music_file) if self.music_file else None,
+            "music_playing": self.music_playing,
+        }
+    
+    def control_metrics(self):
+        """远程控制用的运行指标"""
+        return {
+            "slideshow": self.slideshow_stats(),
+            "image_cache": len(self.image_cache),
+            "cache_size": self.cache_size,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "compressed_cache": self.compressed_cache.stats(),
+            "preload_ahead": self.preload_ahead,
+            "workers": self.worker_count,
+            "memory": self.memory_governor.status,
+            "memory_pressure": self.memory_governor.plan["pressure"] if self.memory_governor.plan else False,
+            "playlists": len(self.playlists),
+            "indexed_images": len(self.image_metadata),
+        }
     
     def update_info_label(self):
         """更新信息标签"""
         if not self.image_list:
             self.info_label.setText("播放列表为空")
+            self.position_slider.setRange(0, 0)
             return
         
-        self.info_label.setText(f"播放列表: {self.current_playlist} | 共 {len(self.image_list)} 张图片 | 当前: {self.current_index + 1}/{len(self.image_list)}")
+        # 同步播放位置滑块（不触发快速浏览）
+        self.position_slider.blockSignals(True)
+        self.position_slider.setRange(0, len(self.image_list) - 1)
+        self.position_slider.setValue(self.current_index)
+        self.position_slider.blockSignals(False)
+        
+        filter_info = " (已筛选)" if self.playlist_query["filters"] else ""
+        self.info_label.setText(f"播放列表: {self.current_playlist}{filter_info} | 共 {len(self.image_list)} 张图片 | 当前: {self.current_index + 1}/{len(self.image_list)}")
     
     def toggle_slideshow(self):
         """切换播放/暂停状态"""
@@ -1037,53 +5023,80 @@ class ImageViewerWindow(QMainWindow):
         if not self.image_list:
             return
         
-        self.timer.start(self.slide_interval * 1000)  # 转换为毫秒
-        self.play_btn.setText("暂停")
-        self.play_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-        """)
+        self.slide_clock.reset_stats()
+        self.slide_clock.start()
+        self.schedule_next_slide()
+        self.set_play_button_state(True)
     
     def stop_slideshow(self):
         """停止自动播放"""
+        was_running = self.timer.isActive()
         self.timer.stop()
-        self.play_btn.setText("播放")
-        self.play_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                border: none;
-                padding: 8px 15px;
-                border-radius: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #219653;
-            }
-        """)
+        self.prepare_timer.stop()
+        if was_running:
+            stats = self.slide_clock.stats()
+            if stats["ticks"]:
+                self.statusBar().showMessage(
+                    f"已播放 {stats['ticks']} 次切换 | 平均延迟 {stats['mean_ms']:.1f} ms | "
+                    f"P95 {stats['p95_ms']:.1f} ms | 最大 {stats['max_ms']:.1f} ms | 跳过 {stats['dropped']} 张", 5000)
+        self.set_play_button_state(False)
     
-    def change_interval(self, value):
-        """改变播放间隔"""
-        self.slide_interval = value
-        self.interval_spin.setValue(value)
+    def set_play_button_state(self, playing):
+        """切换播放按钮的文字和颜色（重新套用已解析的样式，不重新解析样式表）"""
+        self.play_btn.setText("暂停" if playing else "播放")
+        if self.play_btn.property("playing") != playing:
+            self.play_btn.setProperty("playing", playing)
+            self.play_btn.style().unpolish(self.play_btn)
+            self.play_btn.style().polish(self.play_btn)
+    
+    def schedule_next_slide(self):
+        """按时钟的下一个截止时间安排切换和预备帧"""
+        # 节拍同步时把下一次切换对齐到音乐节拍
+        if self.beat_sync_enabled:
+            self.slide_clock.sync_to(self.next_beat_deadline())
         
-        # 如果正在播放，重新启动定时器
-        if self.timer.isActive():
-            self.timer.setInterval(self.slide_interval * 1000)
+        remaining = self.slide_clock.time_until_next()
+        self.timer.start(max(0, round(remaining * 1000)))
+        
+        # 提前准备下一帧，间隔很短时按比例缩短提前量
+        lead = min(FRAME_PREPARE_LEAD, self.slide_interval / 2)
+        self.prepare_timer.start(max(0, round((remaining - lead) * 1000)))
+    
+    def on_slide_deadline(self):
+        """截止时间到达：先安排下一次，再显示图片，解码时间不会累积到间隔中"""
+        steps = self.slide_clock.tick()
+        self.schedule_next_slide()
+        
+        # 落后超过一个间隔时直接跳过错过的图片，保证整场按时结束
+        if steps > 1 and self.image_list:
+            self.current_index = self.current_order().advance(self.current_index, steps - 1)
+        self.next_image()
+    
+    def slideshow_stats(self):
+        """返回幻灯片时钟的延迟统计"""
+        return self.slide_clock.stats()
+    
+    def change_interval(self, value):
+        """改变播放间隔（滑块以0.1秒为单位）"""
+        self.set_slide_interval(value / 10)
     
     def change_interval_spin(self, value):
         """通过SpinBox改变播放间隔"""
-        self.interval_slider.setValue(value)
-        self.change_interval(value)
+        self.set_slide_interval(value)
+    
+    def set_slide_interval(self, seconds):
+        """设置播放间隔并同步滑块和数字框"""
+        seconds = min(MAX_SLIDE_INTERVAL, max(MIN_SLIDE_INTERVAL, round(seconds, 1)))
+        if seconds == self.slide_interval:
+            return
+        self.slide_interval = seconds
+        self.interval_slider.setValue(round(seconds * 10))
+        self.interval_spin.setValue(seconds)
+        
+        # 如果正在播放，从上一次截止时间重新安排
+        self.slide_clock.set_interval(seconds)
+        if self.timer.isActive():
+            self.schedule_next_slide()
     
     def change_transition(self, transition):
         """改变过渡效果"""
@@ -1092,6 +5105,9 @@ class ImageViewerWindow(QMainWindow):
     def rotate_image(self):
         """旋转图片"""
         self.image_rotation = (self.image_rotation + 90) % 360
+        # 解码尺寸随方向改变，按原方向解码的帧铺不满屏幕
+        self.image_cache.clear()
+        self.prepared_frame = None
         self.display_current_image()
     
     def flip_horizontal(self):
@@ -1106,20 +5122,14 @@ class ImageViewerWindow(QMainWindow):
     
     def reset_image_transform(self):
         """重置图片变换"""
+        if self.image_rotation in (90, 270):
+            self.image_cache.clear()
+            self.prepared_frame = None
         self.image_rotation = 0
         self.image_flip_h = False
         self.image_flip_v = False
         self.display_current_image()
     
-    def toggle_fullscreen(self):
-        """切换全屏模式"""
-        if self.is_fullscreen:
-            self.showNormal()
-            self.is_fullscreen = False
-        else:
-            self.showFullScreen()
-            self.is_fullscreen = True
-    
     def keyPressEvent(self, event):
         """键盘事件处理"""
         if event.key() == Qt.Key_Escape and self.is_fullscreen:
@@ -1129,9 +5139,9 @@ class ImageViewerWindow(QMainWindow):
         elif event.key() == Qt.Key_Space:
             self.toggle_slideshow()
         elif event.key() == Qt.Key_Left:
-            self.prev_image()
+            self.navigate_step(-1)
         elif event.key() == Qt.Key_Right:
-            self.next_image()
+            self.navigate_step(1)
         elif event.key() == Qt.Key_R:
             self.rotate_image()
         elif event.key() == Qt.Key_H:
@@ -1146,42 +5156,121 @@ class ImageViewerWindow(QMainWindow):
             self.toggle_music()  # Ctrl+O 暂停/继续音乐
         elif event.key() == Qt.Key_M:
             self.toggle_music()  # M键控制音乐
+        elif event.key() == Qt.Key_N:
+            self.next_track()  # N键切换下一首音乐
         else:
             super().keyPressEvent(event)
     
+    def wheelEvent(self, event):
+        """滚轮快速浏览图片（向下滚动为下一张），触控板的小幅滚动累计后再移动"""
+        self.wheel_delta -= event.angleDelta().y()
+        steps = int(self.wheel_delta / 120)
+        if steps:
+            self.wheel_delta -= steps * 120
+            self.scrub_to(offset=steps)
+        event.accept()
+    
     def resizeEvent(self, event):
         """窗口大小改变时重新调整图片大小"""
         super().resizeEvent(event)
         if self.image_list:
             self.display_current_image()
     
-    def paintEvent(self, event):
-        """绘制背景"""
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.background)
-    
-    def mousePressEvent(self, event):
-        """鼠标按下事件"""
-        self.oldPos = event.globalPos()
-    
-    def mouseMoveEvent(self, event):
-        """鼠标移动事件"""
-        if event.buttons() == Qt.LeftButton and not self.is_fullscreen:
-            delta = QPoint(event.globalPos() - self.oldPos)
-            self.move(self.x() + delta.x(), self.y() + delta.y())
-            self.oldPos = event.globalPos()
-    
     def closeEvent(self, event):
-        """窗口关闭时停止音乐"""
+        """窗口关闭时停止后台线程和音乐"""
+        # 先通知可以中断的线程停止，再等待它们退出，避免销毁仍在运行的 QThread
+        for thread in self.ingest_threads:
+            thread.cancelled = True
+        for thread in (self.batch_thread, self.sheet_thread):
+            if thread is not None:
+                thread.cancel()
+        for thread in [*self.ingest_threads, self.batch_thread, self.sheet_thread, self.loader_thread]:
+            if thread is not None:
+                thread.wait()
+        self.compressed_cache.shutdown()
+        self.thumbnail_loader.shutdown()
         try:
+            if self.control_server is not None:
+                self.control_server.close()
+            if self.audio_engine is not None:
+                self.audio_engine.stop()
             pygame.mixer.music.stop()
             pygame.mixer.quit()
         except:
             pass
         event.accept()
 
+def parse_command_line(argv):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Ave Mujica 图片幻灯片播放器")
+    parser.add_argument("--export", metavar="OUTPUT",
+                        help="无界面导出：PNG序列输出到目录，原始帧输出到文件（- 表示标准输出）")
+    parser.add_argument("--playlist", metavar="PATH",
+                        help="导出用的图片文件夹或播放列表文件（每行一个路径）")
+    parser.add_argument("--format", choices=["png", "raw"], default="png",
+                        help="导出格式：PNG序列或原始RGBA帧")
+    parser.add_argument("--encoder", metavar="COMMAND",
+                        help="接收原始RGBA帧的编码器命令，可使用 {width} {height} {fps}，"
+                             "例如 \"ffmpeg -y -f rawvideo -pix_fmt rgba -s {width}x{height} -r {fps} -i - out.mp4\"")
+    parser.add_argument("--size", default="1920x1080", help="导出分辨率，如 1920x1080")
+    parser.add_argument("--fps", type=int, default=30, help="导出帧率")
+    parser.add_argument("--interval", type=float, default=3.0, help="切换间隔(秒)")
+    parser.add_argument("--transition", default="淡入淡出",
+                        help="过渡效果：" + "/".join(TRANSITION_TYPES) + " 或 " + "/".join(TRANSITION_ALIASES))
+    parser.add_argument("--transition-duration", type=int, default=500, help="过渡动画持续时间(毫秒)")
+    parser.add_argument("--workers", type=int, default=None, help="导出使用的进程数")
+    parser.add_argument("--control-port", type=int, default=None, metavar="PORT",
+                        help="在本机端口上启动远程控制服务")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="不转交给已在运行的实例，始终启动新窗口")
+    parser.add_argument("paths", nargs="*", help="启动时打开的图片文件夹或图片文件")
+    # 其余参数（如Qt参数）留给QApplication
+    args, _ = parser.parse_known_args(argv)
+    
+    if args.export:
+        args.transition = TRANSITION_ALIASES.get(args.transition, args.transition)
+        if args.transition not in TRANSITION_TYPES:
+            parser.error(f"未知的过渡效果: {args.transition}")
+        if not args.playlist:
+            parser.error("导出需要指定 --playlist")
+        try:
+            args.width, args.height = (int(v) for v in args.size.lower().split('x'))
+        except ValueError:
+            parser.error(f"无效的分辨率: {args.size}")
+    return args
+
+def export_from_command_line(args):
+    """执行命令行导出，返回退出码"""
+    if os.path.isdir(args.playlist) or is_archive_file(args.playlist):
+        image_paths = scan_image_folder(args.playlist)
+    else:
+        image_paths = read_playlist_file(args.playlist)
+    if not image_paths:
+        print("播放列表中没有图片", file=sys.stderr)
+        return 1
+    
+    output_format = "raw" if args.encoder else args.format
+    exporter = SlideshowExporter(
+        image_paths, args.export, args.width, args.height, args.fps,
+        slide_interval=args.interval, transition_type=args.transition,
+        transition_duration=args.transition_duration,
+        output_format=output_format, encoder=args.encoder, workers=args.workers)
+    exporter.run()
+    return 0
+
 # 应用程序入口
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = parse_command_line(sys.argv[1:])
+    
+    # 无界面导出模式
+    if args.export:
+        sys.exit(export_from_command_line(args))
+    
+    # 单实例模式：已有实例在运行时转交打开请求后直接退出
+    if not args.new_instance and hand_off_to_running_instance(args.paths):
+        sys.exit(0)
+    
     app = QApplication(sys.argv)
     
     # 设置应用程序字体
@@ -1189,6 +5278,9 @@ if __name__ == "__main__":
     app.setFont(font)
     
     window = ImageViewerWindow()
+    window.start_control_server(args.control_port, None if args.new_instance else single_instance_name())
     window.show()
+    if args.paths:
+        window.open_paths(args.paths)
     
     sys.exit(app.exec_())
\ No newline at end of file
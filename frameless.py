@@ -0,0 +1,203 @@
+# 无边框窗口框架：Ave Mujica.py 和 点开有惊喜.pyw 共用的标题栏、拖动、背景绘制、样式表和延迟构建的面板
+from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QLabel, QPushButton, QHBoxLayout, QVBoxLayout
+from PyQt5.QtCore import Qt, QPoint, QTimer
+from PyQt5.QtGui import QPixmap, QPainter
+
+TITLE_BAR_HEIGHT = 40
+TITLE_BUTTON_SIZE = 30
+
+# 框架部分的样式；各程序在此基础上追加自己的规则，合成一张应用级样式表只解析一次
+# 控件通过 objectName 和动态属性区分，不再逐个设置样式表
+FRAME_STYLESHEET = """
+    QMainWindow#frameWindow {
+        background: transparent;
+    }
+    QWidget#titleBar, QWidget#titleBar QLabel {
+        background-color: rgba(40, 40, 40, 180);
+        border-top-left-radius: 10px;
+        border-top-right-radius: 10px;
+    }
+    QLabel#titleLabel {
+        color: white;
+        font-weight: bold;
+        font-size: 14px;
+    }
+    QWidget#titleBar QPushButton {
+        background-color: transparent;
+        color: white;
+        border: none;
+        border-radius: 5px;
+        font-weight: bold;
+    }
+    QWidget#titleBar QPushButton:hover {
+        background-color: rgba(255, 255, 255, 50);
+    }
+    QWidget#titleBar QPushButton#fullscreenButton {
+        font-size: 16px;
+    }
+    QWidget#titleBar QPushButton#closeButton {
+        font-size: 18px;
+    }
+    QWidget#titleBar QPushButton#closeButton:hover {
+        background-color: #e81123;
+    }
+"""
+
+def install_stylesheet(app_rules=""):
+    """把框架样式和程序自己的规则合成一张样式表设置到应用上（内容不变时不会重复解析）"""
+    app = QApplication.instance()
+    stylesheet = FRAME_STYLESHEET + app_rules
+    if app is not None and app.styleSheet() != stylesheet:
+        app.setStyleSheet(stylesheet)
+
+class LazyPanel(QWidget):
+    """延迟构建的面板：窗口第一次显示后（或第一次访问其中的控件时）才调用 build 创建内容"""
+    
+    def __init__(self, build, parent=None):
+        super().__init__(parent)
+        self.build = build
+        self.content = None
+        self.building = False
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+    
+    def is_built(self):
+        return self.content is not None
+    
+    def ensure_built(self):
+        """构建面板内容（只构建一次），返回内容控件"""
+        if self.content is None and not self.building:
+            self.building = True
+            try:
+                self.content = self.build()
+            finally:
+                self.building = False
+            self.layout().addWidget(self.content)
+        return self.content
+    
+    def showEvent(self, event):
+        # 先让窗口显示出来，下一轮事件循环再构建内容
+        super().showEvent(event)
+        if self.content is None:
+            QTimer.singleShot(0, self.ensure_built)
+
+class FramelessWindow(QMainWindow):
+    """半透明无边框主窗口：自绘背景、自定义标题栏、拖动移动，子类在 initUI 中添加内容"""
+    
+    def __init__(self, app_rules=""):
+        super().__init__()
+        self.setObjectName("frameWindow")
+        install_stylesheet(app_rules)
+        
+        # 移除默认窗口边框
+        self.setWindowFlags(Qt.FramelessWindowHint)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        
+        # 默认背景（绘制时使用缩放到窗口大小后缓存的版本）
+        self.background = QPixmap(1200, 800)
+        self.background.fill(Qt.darkGray)
+        self.scaled_background = None
+        
+        self.is_fullscreen = False  # 全屏状态
+        self.lazy_attributes = {}  # {延迟构建的控件属性名: 所在面板}
+        
+        # 初始化拖动变量
+        self.oldPos = self.pos()
+    
+    def __getattr__(self, name):
+        # 访问尚未构建的面板中声明的控件时先构建该面板，窗口显示之前调用的方法也能正常使用；
+        # 其他不存在的属性（包括 hasattr 探测）直接报错，不会触发构建
+        panel = self.__dict__.get('lazy_attributes', {}).get(name)
+        if panel is not None and not panel.is_built():
+            panel.ensure_built()
+            if name in self.__dict__:
+                return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+    
+    def load_background(self, path):
+        """加载背景图像，失败时保留默认背景并返回False"""
+        background = QPixmap(path)
+        if background.isNull():
+            return False
+        self.background = background
+        self.scaled_background = None
+        self.update()
+        return True
+    
+    def lazy_panel(self, build, attributes=()):
+        """创建延迟构建的面板，build 返回面板内容控件，attributes 为 build 中创建的控件属性名"""
+        declared = set(attributes)
+        
+        def checked_build():
+            # build 中新建却未声明的控件在面板构建前访问会直接报错，构建后立即检查漏列的名字
+            # （构建中途顺带构建的其他面板的控件由那个面板声明；信号处理顺带设置的普通状态不算）
+            existing = set(self.__dict__)
+            content = build()
+            undeclared = {name for name, value in self.__dict__.items()
+                          if name not in existing and name not in self.lazy_attributes
+                          and isinstance(value, QWidget)}
+            assert not undeclared, f"{build.__name__} 创建了未声明的控件: {', '.join(sorted(undeclared))}"
+            return content
+        
+        panel = LazyPanel(checked_build)
+        for name in declared:
+            self.lazy_attributes[name] = panel
+        return panel
+    
+    def create_title_bar(self, title, fullscreen_button=False):
+        """创建标题栏：标题、（可选的）全屏按钮、最小化和关闭按钮"""
+        title_bar = QWidget()
+        title_bar.setObjectName("titleBar")
+        title_bar.setFixedHeight(TITLE_BAR_HEIGHT)
+        
+        title_layout = QHBoxLayout(title_bar)
+        title_layout.setContentsMargins(10, 0, 10, 0)
+        
+        title_label = QLabel(title)
+        title_label.setObjectName("titleLabel")
+        title_layout.addWidget(title_label)
+        title_layout.addStretch()
+        
+        buttons = [("—", "minimizeButton", None, self.showMinimized),
+                   ("×", "closeButton", None, self.close)]
+        if fullscreen_button:
+            buttons.insert(0, ("⛶", "fullscreenButton", "切换全屏 (F11)", self.toggle_fullscreen))
+        for text, name, tooltip, slot in buttons:
+            button = QPushButton(text)
+            button.setObjectName(name)
+            button.setFixedSize(TITLE_BUTTON_SIZE, TITLE_BUTTON_SIZE)
+            if tooltip:
+                button.setToolTip(tooltip)
+            button.clicked.connect(slot)
+            title_layout.addWidget(button)
+        
+        return title_bar
+    
+    def toggle_fullscreen(self):
+        """切换全屏模式"""
+        if self.is_fullscreen:
+            self.showNormal()
+            self.is_fullscreen = False
+        else:
+            self.showFullScreen()
+            self.is_fullscreen = True
+    
+    def paintEvent(self, event):
+        """绘制背景：缩放结果按窗口大小缓存，只重绘需要更新的区域"""
+        if self.scaled_background is None or self.scaled_background.size() != self.size():
+            self.scaled_background = self.background.scaled(self.size(), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        painter = QPainter(self)
+        rect = event.rect()
+        painter.drawPixmap(rect, self.scaled_background, rect)
+    
+    def mousePressEvent(self, event):
+        """记录鼠标按下时的位置"""
+        self.oldPos = event.globalPos()
+    
+    def mouseMoveEvent(self, event):
+        """拖动窗口（全屏时不移动）"""
+        if event.buttons() == Qt.LeftButton and not self.is_fullscreen:
+            delta = QPoint(event.globalPos() - self.oldPos)
+            self.move(self.x() + delta.x(), self.y() + delta.y())
+            self.oldPos = event.globalPos()
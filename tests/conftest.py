@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import importlib.util
+
+import pytest
+
+# 无界面运行，缓存写到临时目录，不影响用户的 ~/.ave_mujica_cache
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["HOME"] = tempfile.mkdtemp(prefix="ave_mujica_test_")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 主程序文件名带空格，按路径加载
+_spec = importlib.util.spec_from_file_location("ave_mujica", os.path.join(ROOT, "Ave Mujica.py"))
+ave_mujica = importlib.util.module_from_spec(_spec)
+sys.modules["ave_mujica"] = ave_mujica
+_spec.loader.exec_module(ave_mujica)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app):
+    window = ave_mujica.ImageViewerWindow()
+    yield window
+    window.close()
+    window.deleteLater()
+
+
+@pytest.fixture
+def image_file(app, tmp_path):
+    """在临时目录中生成图片文件，返回路径"""
+    from PyQt5.QtGui import QImage, QColor
+
+    def make(name, width=64, height=48, color=(200, 30, 30)):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(QColor(*color))
+        path = str(tmp_path / name)
+        assert image.save(path)
+        return path
+    return make
@@ -0,0 +1,47 @@
+import zipfile
+
+from conftest import ave_mujica as m
+
+
+def make_zip(path, image_bytes):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("b.png", image_bytes)
+        zf.writestr("a.png", image_bytes)
+        zf.writestr("notes.txt", b"hello")
+    return str(path)
+
+
+def test_split_archive_path_prefers_real_archive(tmp_path, image_file):
+    folder = tmp_path / "x::y"
+    folder.mkdir()
+    with open(image_file("p.png"), "rb") as f:
+        archive = make_zip(folder / "book.zip", f.read())
+
+    assert m.split_archive_path(archive + "::a.png") == (archive, "a.png")
+    assert m.split_archive_path(archive + "::dir::a.png") == (archive, "dir::a.png")
+    plain = str(folder / "plain.png")
+    assert m.split_archive_path(plain) == (None, plain)
+
+
+def test_dropped_archive_members_are_listed_without_reading(tmp_path, image_file, monkeypatch):
+    drop = tmp_path / "drop"
+    drop.mkdir()
+    with open(image_file("p.png"), "rb") as f:
+        archive = make_zip(drop / "book.zip", f.read())
+    loose = str(drop / "loose.png")
+    with open(loose, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+    checked = []
+
+    def validate(path):
+        checked.append(path)
+        return "png"
+    monkeypatch.setattr(m, "validate_image_file", validate)
+
+    thread = m.DropIngestThread("列表", [str(drop)], [])
+    batches = []
+    thread.batch_ready.connect(lambda name, batch: batches.extend(batch))
+    thread.run()
+
+    assert batches == [archive + "::a.png", archive + "::b.png", loose]
+    assert checked == [loose]
@@ -0,0 +1,40 @@
+import os
+
+from PyQt5.QtGui import QImageReader
+
+from conftest import ave_mujica as m
+
+
+def test_output_folder_with_sources_is_rejected(tmp_path, image_file):
+    source = image_file("photo.png")
+    other = tmp_path / "out"
+    other.mkdir()
+    assert m.batch_output_conflicts([source], str(tmp_path)) == [source]
+    assert m.batch_output_conflicts([source], str(other)) == []
+
+
+def test_thread_never_overwrites_originals(app, tmp_path, image_file):
+    source = image_file("photo.png", 20, 10)
+    with open(source, "rb") as f:
+        original = f.read()
+    thread = m.BatchOperationThread([source], str(tmp_path), {"rotation": 90, "format": None})
+    results = []
+    thread.batch_finished.connect(lambda completed, failed, errors: results.append((completed, failed)))
+    thread.run()
+
+    assert results == [(0, 1)]
+    with open(source, "rb") as f:
+        assert f.read() == original
+
+
+def test_source_without_extension_keeps_its_format(tmp_path, image_file):
+    source = tmp_path / "scan"
+    os.rename(image_file("scan.png", 20, 10), source)
+    destination = tmp_path / "out" / "scan"
+    destination.parent.mkdir()
+
+    m.apply_batch_operation(str(source), str(destination), {"rotation": 90})
+
+    reader = QImageReader(str(destination))
+    assert reader.format().data() == b"png"
+    assert reader.size().width() == 10
@@ -0,0 +1,60 @@
+import os
+import time
+
+from conftest import ave_mujica as m
+
+
+def wait_stored(cache, path, timeout=5.0):
+    # 压缩在两个工作线程之一中进行，轮询直到存入
+    deadline = time.monotonic() + timeout
+    while path not in cache and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return path in cache
+
+
+def test_demote_takes_image_and_restores_pixels(image_file):
+    path = image_file("frame.png", 64, 48)
+    image = m.load_display_image(path)
+    cache = m.CompressedFrameCache()
+    try:
+        cache.demote(path, image)
+        assert wait_stored(cache, path)
+        restored = cache.restore(path)
+        assert restored is not None
+        assert restored.size() == image.size()
+        assert restored.pixel(10, 10) == image.pixel(10, 10)
+    finally:
+        cache.shutdown()
+
+
+def test_modified_file_is_not_restored(image_file):
+    path = image_file("frame.png", 64, 48)
+    cache = m.CompressedFrameCache()
+    try:
+        cache.demote(path, m.load_display_image(path))
+        assert wait_stored(cache, path)
+
+        image_file("frame.png", 32, 32)
+        os.utime(path, ns=(1, 10 ** 9))
+        assert cache.restore(path) is None
+        assert path not in cache
+        assert cache.stats()["bytes"] == 0
+    finally:
+        cache.shutdown()
+
+
+def test_failed_restore_does_not_stay_pending(image_file, monkeypatch):
+    path = image_file("frame.png", 64, 48)
+    cache = m.CompressedFrameCache()
+    try:
+        cache.demote(path, m.load_display_image(path))
+        assert wait_stored(cache, path)
+
+        def corrupt(entry, max_size=None):
+            raise m.zlib.error("corrupt frame")
+        monkeypatch.setattr(cache, "decode", corrupt)
+        assert cache.promote(path)
+        cache.executor.shutdown(wait=True)
+        assert path not in cache.pending
+    finally:
+        cache.shutdown()
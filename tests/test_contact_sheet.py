@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from conftest import ave_mujica as m
+
+pytestmark = pytest.mark.skipif(not m.NUMPY_SUPPORT, reason="需要 numpy")
+
+
+def test_render_page_reports_allocation_error(tmp_path, monkeypatch):
+    thread = m.ContactSheetThread(["a.png"], str(tmp_path), "sheet", columns=2, rows=2, cell=16)
+
+    def fail(*args, **kwargs):
+        raise MemoryError("no room for the sheet")
+    monkeypatch.setattr(m.np, "ndarray", fail)
+    monkeypatch.setattr(m.np, "empty", fail)
+
+    with pytest.raises(MemoryError):
+        thread.render_page(None, ["a.png"], 0)
+
+
+def test_sheet_cache_drops_least_recently_used(tmp_path):
+    for i, name in enumerate(["old.jpg", "mid.jpg", "new.jpg"]):
+        path = tmp_path / "list" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    assert m.trim_cache_dir(str(tmp_path), "", 250) == 200
+    assert sorted(os.listdir(tmp_path / "list")) == ["mid.jpg", "new.jpg"]
+
+
+def test_trim_skips_live_sheet_directories(tmp_path):
+    for i, folder in enumerate(["live", "dead"]):
+        path = tmp_path / folder / "page_001.jpg"
+        path.parent.mkdir()
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    m.trim_cache_dir(str(tmp_path), "", 150, keep_dirs=[str(tmp_path / "live")])
+    assert os.listdir(tmp_path / "live") == ["page_001.jpg"]
+    assert os.listdir(tmp_path / "dead") == []
+
+
+def test_regenerated_sheet_removes_extra_old_pages(window, tmp_path, image_file):
+    pages = [image_file(f"sheet_{i:03d}.jpg") for i in range(1, 4)]
+
+    class Finished:
+        cancelled = False
+    window.sheet_thread = Finished()
+    window.sheet_export = False
+    window.sheet_source = "相册"
+    window.on_sheet_finished(pages[:2])
+    window.sheet_thread = None
+
+    assert sorted(os.listdir(tmp_path)) == ["sheet_001.jpg", "sheet_002.jpg"]
+    assert window.playlists["联系表: 相册"] == pages[:2]
@@ -0,0 +1,58 @@
+import json
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtNetwork import QLocalSocket
+import pytest
+
+from conftest import ave_mujica as m
+
+
+class FakeWindow(QObject):
+    def __init__(self, count):
+        super().__init__()
+        self.image_list = [f"{i}.png" for i in range(count)]
+        self.current_index = 0
+
+    def navigate_to(self, index=None, offset=0):
+        base = self.current_index if index is None else index
+        self.current_index = (base + offset) % len(self.image_list)
+
+    def control_status(self):
+        return {"index": self.current_index + 1}
+
+
+def send(server, payload):
+    # 直接走 ControlServer 的读缓冲和队列，不经过真正的连接
+    socket = QLocalSocket()
+    server.buffers[socket] = b""
+    written = []
+    socket.write = lambda data: written.append(data)
+    socket.close = lambda: written.append(b"<closed>")
+    socket.readAll = lambda: payload
+    server.on_ready_read(socket)
+    server.process_queue()
+    return [json.loads(line) if line != b"<closed>" else line
+            for data in written for line in data.splitlines()]
+
+
+@pytest.fixture
+def server(app):
+    window = FakeWindow(5)
+    server = m.ControlServer(window)
+    yield server
+    server.close()
+
+
+def test_jump_out_of_range_is_an_error(app, server):
+    assert send(server, b"jump 3\n") == [{"ok": True, "index": 3}]
+    reply, = send(server, b"jump 0\n")
+    assert not reply["ok"]
+    reply, = send(server, b"jump 6\n")
+    assert not reply["ok"]
+    assert server.window.current_index == 2
+
+
+def test_endless_line_disconnects(app, server):
+    replies = send(server, b"x" * (server.MAX_LINE_BYTES + 1))
+    assert replies[0]["ok"] is False and replies[-1] == b"<closed>"
+    assert not server.buffers
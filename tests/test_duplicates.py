@@ -0,0 +1,87 @@
+import random
+
+from PyQt5.QtGui import QImage, QColor, QPainter
+import pytest
+
+from conftest import ave_mujica as m
+
+pytestmark = pytest.mark.skipif(not m.NUMPY_SUPPORT, reason="需要 numpy")
+
+
+def save_pattern(tmp_path, name, size, seed):
+    # 随机色块组成的图案，缩放和重新编码后哈希应基本不变
+    rng = random.Random(seed)
+    image = QImage(size, size, QImage.Format_RGB32)
+    painter = QPainter(image)
+    block = size // 8
+    for y in range(8):
+        for x in range(8):
+            painter.fillRect(x * block, y * block, block, block, QColor(*(rng.randrange(256) for _ in range(3))))
+    painter.end()
+    path = str(tmp_path / name)
+    assert image.save(path)
+    return path
+
+
+def flip_bits(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_pack_bits_uses_little_endian_bit_order():
+    bits = m.np.zeros((3, 64), dtype=bool)
+    bits[0, 0] = True
+    bits[1, 63] = True
+    bits[2, :] = True
+    assert m.pack_bits(bits).tolist() == [1, 1 << 63, (1 << 64) - 1]
+
+
+def test_resized_copy_hashes_close_and_other_image_far(app, tmp_path):
+    original = save_pattern(tmp_path, "a.png", 256, seed=1)
+    smaller = save_pattern(tmp_path, "a_small.png", 128, seed=1)
+    other = save_pattern(tmp_path, "b.png", 256, seed=2)
+
+    results = {path: (phash, dhash, pixels) for path, phash, dhash, pixels in m.hash_image_batch([original, smaller, other])}
+    assert results[original][2] == 256 * 256 and results[smaller][2] == 128 * 128
+
+    def distance(a, b):
+        return bin(results[a][0] ^ results[b][0]).count("1")
+    assert distance(original, smaller) <= m.DUPLICATE_MAX_DISTANCE
+    assert distance(original, other) > 3 * m.DUPLICATE_MAX_DISTANCE
+
+
+def test_unreadable_files_are_skipped(app, tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"\x89PNG\r\n\x1a\n")
+    assert m.hash_image_batch([str(broken)]) == []
+
+
+def test_find_duplicate_groups_within_distance():
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(4)]
+    phashes = [
+        base[0],
+        flip_bits(base[0], [3, 20, 41, 60]),  # 距离4：重复
+        base[1],
+        flip_bits(base[1], [0, 1, 2, 3, 4]),  # 距离5：超出阈值
+        base[2],
+        base[2],  # 完全相同
+        base[3],
+    ]
+    dhashes = [base[0], base[0], base[1], base[1], 5, 5, base[3]]
+    groups = sorted(sorted(group) for group in m.find_duplicate_groups(phashes, dhashes))
+    assert groups == [[0, 1], [4, 5]]
+
+
+def test_find_duplicate_groups_requires_close_dhash():
+    phash = random.Random(3).getrandbits(64)
+    dhashes = [0, (1 << 20) - 1]  # dHash 相差20位
+    assert m.find_duplicate_groups([phash, flip_bits(phash, [5])], dhashes) == []
+
+
+def test_groups_are_transitive():
+    phash = random.Random(5).getrandbits(64)
+    chain = [phash, flip_bits(phash, [0, 1, 2, 3]), flip_bits(phash, [0, 1, 2, 3, 10, 11, 12, 13])]
+    groups = m.find_duplicate_groups(chain, [0, 0, 0])
+    assert [sorted(group) for group in groups] == [[0, 1, 2]]
@@ -0,0 +1,69 @@
+from PyQt5.QtGui import QImage
+
+from conftest import ave_mujica as m
+
+
+def frame(width, height):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(0)
+    return image
+
+
+def test_usage_is_tracked_and_trimmed(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "FRAME_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(m.frame_cache_usage, "bytes", None)
+    frame_bytes = m.FRAME_HEADER_SIZE + frame(64, 64).sizeInBytes()
+    monkeypatch.setitem(m.frame_cache_usage, "limit", frame_bytes * 4)
+
+    for i in range(3):
+        m.write_cached_frame(str(tmp_path / "aa" / f"{i}.frame"), frame(64, 64))
+    assert m.frame_cache_usage["bytes"] == frame_bytes * 3
+
+    # 覆盖同一帧不重复计数
+    m.write_cached_frame(str(tmp_path / "aa" / "0.frame"), frame(64, 64))
+    assert m.frame_cache_usage["bytes"] == frame_bytes * 3
+
+    for i in range(3, 6):
+        m.write_cached_frame(str(tmp_path / "aa" / f"{i}.frame"), frame(64, 64))
+    remaining = sum(size for _, size, _ in m.scan_cache_dir(str(tmp_path), ".frame"))
+    assert m.frame_cache_usage["bytes"] == remaining <= frame_bytes * 4
+    assert m.read_cached_frame(str(tmp_path / "aa" / "5.frame")).size() == frame(64, 64).size()
+
+
+def test_limit_follows_playlist_length(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "FRAME_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(m.frame_cache_usage, "bytes", None)
+    monkeypatch.setitem(m.frame_cache_usage, "limit", m.FRAME_CACHE_BYTES)
+    free = 100 * m.FRAME_CACHE_BYTES
+    monkeypatch.setattr(m.shutil, "disk_usage", lambda path: m.shutil._ntuple_diskusage(free, 0, free))
+    assert m.set_frame_cache_limit(10, 1024) == m.FRAME_CACHE_BYTES
+    assert m.set_frame_cache_limit(100, 8 * 1024 * 1024) == m.FRAME_CACHE_BYTES
+    assert m.set_frame_cache_limit(10000, 8 * 1024 * 1024) == int(10000 * 8 * 1024 * 1024 * 1.1)
+
+
+def test_disk_share_caps_the_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(m, "FRAME_CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(m.frame_cache_usage, "bytes", 1000)
+    monkeypatch.setitem(m.frame_cache_usage, "limit", m.FRAME_CACHE_BYTES)
+    monkeypatch.setattr(m.shutil, "disk_usage", lambda path: m.shutil._ntuple_diskusage(10 ** 9, 0, 9000))
+    assert m.set_frame_cache_limit(10, 1024) == int(10000 * m.FRAME_CACHE_DISK_SHARE)
+
+
+def test_limit_is_recomputed_only_when_length_changes(window, image_file, monkeypatch):
+    calls = []
+    monkeypatch.setattr(m, "set_frame_cache_limit", lambda count, frame_bytes: calls.append(count))
+    window.image_list = [image_file(f"f{i}.png") for i in range(3)]
+    for index in range(3):
+        window.current_index = index
+        window.preload_images()
+    window.image_list = window.image_list + [image_file("f3.png")]
+    window.preload_images()
+    assert calls == [3, 4]
+
+
+def test_target_size_fits_screen_and_follows_rotation(window):
+    screen = window.screen()
+    size = screen.size() * screen.devicePixelRatio()
+    assert window.frame_target_size() == size
+    window.image_rotation = 90
+    assert window.frame_target_size() == size.transposed()
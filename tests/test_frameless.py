@@ -0,0 +1,51 @@
+import pytest
+
+from PyQt5.QtWidgets import QLabel
+
+from frameless import FramelessWindow
+
+
+class PanelWindow(FramelessWindow):
+    def __init__(self):
+        super().__init__()
+        self.builds = 0
+        self.panel = self.lazy_panel(self.build_panel, ["panel_label"])
+
+    def build_panel(self):
+        self.builds += 1
+        self.panel_label = QLabel("面板")
+        self.panel_state = "built"  # 构建时顺带设置的普通状态不需要声明
+        return self.panel_label
+
+
+def test_probing_unknown_attribute_does_not_build(app):
+    window = PanelWindow()
+    assert not hasattr(window, "animation")
+    assert window.builds == 0 and not window.panel.is_built()
+    window.close()
+
+
+def test_declared_attribute_builds_its_panel_once(app):
+    window = PanelWindow()
+    assert window.panel_label.text() == "面板"
+    assert window.panel_label is window.panel.ensure_built()
+    assert window.builds == 1
+    window.close()
+
+
+class UndeclaredWindow(FramelessWindow):
+    def __init__(self):
+        super().__init__()
+        self.panel = self.lazy_panel(self.build_panel, ["panel_label"])
+
+    def build_panel(self):
+        self.panel_label = QLabel("面板")
+        self.extra_label = QLabel("漏列")
+        return self.panel_label
+
+
+def test_undeclared_attribute_fails_the_build(app):
+    window = UndeclaredWindow()
+    with pytest.raises(AssertionError, match="extra_label"):
+        window.panel.ensure_built()
+    window.close()
@@ -0,0 +1,51 @@
+import struct
+
+from conftest import ave_mujica as m
+
+
+def test_bmp_needs_plausible_file_header(tmp_path, image_file):
+    real = image_file("real.bmp", 16, 16)
+    assert m.sniff_image_format(real) == "bmp"
+
+    fake = tmp_path / "notes.txt"
+    fake.write_bytes(b"BMW service log, mileage 120000 km\n")
+    assert m.sniff_image_format(str(fake)) == ""
+
+    # 像素数据偏移落在信息头之内
+    with open(real, "rb") as f:
+        data = bytearray(f.read())
+    struct.pack_into("<I", data, 10, 20)
+    broken = tmp_path / "broken.bmp"
+    broken.write_bytes(bytes(data))
+    assert m.sniff_image_format(str(broken)) == ""
+
+
+def test_overlapping_drops_do_not_duplicate(window, image_file):
+    paths = [image_file(f"d{i}.png") for i in range(3)]
+    name = window.current_playlist
+    window.playlists[name] = []
+    window.image_list = window.playlists[name]
+
+    first = m.DropIngestThread(name, paths[:2], [])
+    second = m.DropIngestThread(name, paths, [])
+    window.on_ingest_batch(name, paths[:2], first)
+    window.on_ingest_batch(name, paths, second)
+
+    assert window.playlists[name] == paths
+    assert (first.duplicates, second.duplicates) == (0, 2)
+
+
+def test_close_waits_for_running_drops(app, tmp_path, image_file, monkeypatch):
+    window = m.ImageViewerWindow()
+    paths = [image_file(f"c{i}.png") for i in range(200)]
+
+    def slow_validate(path):
+        m.time.sleep(0.002)
+        return "png"
+    monkeypatch.setattr(m, "validate_image_file", slow_validate)
+
+    window.ingest_dropped_paths(window.current_playlist, paths)
+    thread = window.ingest_threads[0]
+    assert thread.isRunning()
+    window.close()
+    assert thread.isFinished()
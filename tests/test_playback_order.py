@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import ave_mujica as m
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 64, 1000, 1025])
+def test_shuffle_is_a_permutation(count):
+    order = m.ShuffleOrder(count, seed=count)
+    images = [order.permute(position) for position in range(count)]
+    assert sorted(images) == list(range(count))
+    assert all(order.position_of(index) == position for position, index in enumerate(images))
+
+
+def test_shuffle_steps_visit_every_image_once():
+    order = m.ShuffleOrder(50, seed=1)
+    index, seen = 0, []
+    for _ in range(50):
+        index = order.next_index(index)
+        seen.append(index)
+    assert sorted(seen) == list(range(50)) and index == 0
+    assert order.prev_index(order.next_index(17)) == 17
+    assert order.upcoming(17, 3) == [order.advance(17, i) for i in (1, 2, 3)]
+    assert order.previous(17, 2) == [order.advance(17, -1), order.advance(17, -2)]
+
+
+def test_shuffle_seed_changes_order():
+    assert ([m.ShuffleOrder(100, seed=1).permute(i) for i in range(100)] !=
+            [m.ShuffleOrder(100, seed=2).permute(i) for i in range(100)])
+
+
+def test_no_repeat_window():
+    order = m.NoRepeatOrder(10, window=4, seed=3)
+    index, history = 0, [0]
+    for _ in range(200):
+        index = order.next_index(index)
+        assert index not in history[-4:]
+        history.append(index)
+
+
+def test_random_order_base_is_abstract():
+    with pytest.raises(TypeError):
+        m.RandomOrder(3)
+
+
+def test_order_is_rebuilt_for_a_new_list_of_same_length(window):
+    window.change_playback_order("随机播放")
+    window.image_list = ["a", "b", "c"]
+    first = window.current_order()
+    assert window.current_order() is first
+    # 新列表可能恰好得到被回收列表的 id，不能按 id 判断
+    window.image_list = ["d", "e", "f"]
+    assert window.current_order() is not first
+
@@ -0,0 +1,85 @@
+import os
+import time
+
+from conftest import ave_mujica as m
+
+
+def wait_for(app, condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def metadata(width, height, size=1000, mtime=0.0, camera=""):
+    return {"mtime": mtime, "size": size, "width": width, "height": height, "camera": camera}
+
+
+def make_index():
+    records = {
+        "a.jpg": metadata(4000, 3000, size=3_000_000, mtime=3, camera="X"),
+        "b.jpg": metadata(600, 800, size=200_000, mtime=1, camera="Y"),
+        "c.jpg": metadata(500, 500, size=100_000, mtime=2, camera="X"),
+        "d.jpg": metadata(1920, 1080, size=900_000, mtime=4),
+    }
+    return m.PlaylistIndex(list(records), records)
+
+
+def test_query_sort_and_reverse():
+    index = make_index()
+    assert index.query("pixels") == ["c.jpg", "b.jpg", "d.jpg", "a.jpg"]
+    assert index.query("mtime", reverse=True) == ["d.jpg", "a.jpg", "c.jpg", "b.jpg"]
+    assert index.query() == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+
+
+def test_query_filters_combine():
+    index = make_index()
+    assert index.query(filters={"orientation": "横向"}) == ["a.jpg", "d.jpg"]
+    assert index.query("size", filters={"camera": "X"}) == ["c.jpg", "a.jpg"]
+    assert index.query(filters={"pixels": (None, 1_000_000 - 1), "camera": "X"}) == ["c.jpg"]
+    assert index.query(filters={"size": (500 * 1024, None)}) == ["a.jpg", "d.jpg"]
+
+
+def test_request_after_switching_playlist_is_not_dropped(window, app, image_file):
+    first = [image_file(f"a{i}.png", 80, 40) for i in range(3)]
+    second = [image_file("b_wide.png", 90, 30), image_file("b_tall.png", 30, 90)]
+    window.playlists["first"] = first
+    window.playlists["second"] = second
+    window.update_playlist_display()
+    window.select_playlist("first")
+
+    window.sort_playlist("size")
+    window.select_playlist("second")
+    window.filter_playlist("orientation", "纵向")
+
+    assert wait_for(app, lambda: window.image_list == [second[1]])
+    assert not window.pending_queries
+
+
+def test_metadata_is_reprobed_after_edit(window, image_file):
+    path = image_file("edited.png", 40, 40)
+    window.update_image_info(path)
+    assert window.cached_metadata(path)["width"] == 40
+
+    image_file("edited.png", 120, 40)
+    os.utime(path, ns=(1, 10 ** 9))
+    assert window.cached_metadata(path) is None
+    window.update_image_info(path)
+    assert window.cached_metadata(path)["width"] == 120
+
+
+def test_weighted_order_waits_for_metadata(window, app, image_file):
+    paths = [image_file(f"w{i}.png", 20, 20) for i in range(4)]
+    for i, path in enumerate(paths):
+        os.utime(path, (1000 + (3 - i) * 100, 1000 + (3 - i) * 100))
+    window.playlists["weighted"] = paths
+    window.update_playlist_display()
+    window.select_playlist("weighted")
+
+    assert window.recency_weights() == [1.0] * 4
+    window.change_playback_order("加权随机(新图片优先)")
+    assert wait_for(app, lambda: all(window.cached_metadata(path) for path in paths))
+    assert window.play_order is None
+    weights = window.recency_weights()
+    assert weights[0] == 4.0 and weights[-1] == 1.0
@@ -0,0 +1,68 @@
+from conftest import ave_mujica as m
+
+
+def write_truncated_png(path):
+    # 文件头有效但数据被截断，图片头校验和解码都会失败
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8)
+    return path
+
+
+def test_duplicate_bad_paths_are_all_removed(window, image_file, tmp_path):
+    good = image_file("good.png")
+    bad = write_truncated_png(str(tmp_path / "bad.png"))
+    window.playlists[window.current_playlist] = [bad, good, bad]
+    window.image_list = window.playlists[window.current_playlist]
+    window.current_index = 0
+
+    window.display_current_image()
+
+    assert window.image_list == [good]
+    assert window.current_index == 0
+    assert bad in window.quarantined
+
+
+def test_quarantined_path_back_in_list_does_not_hang(window, image_file, tmp_path):
+    good = image_file("good.png")
+    bad = write_truncated_png(str(tmp_path / "bad.png"))
+    window.quarantine_image(bad)
+
+    # 例如 .m3u 或压缩包再次带入已隔离的路径
+    window.playlists["other"] = [good]
+    window.image_list = [bad, bad, good, bad]
+    window.current_index = 1
+    window.display_current_image()
+
+    assert window.image_list == [good]
+    assert window.image_label.pixmap() is not None
+
+
+def test_only_bad_images_shows_message(window, tmp_path):
+    bad = write_truncated_png(str(tmp_path / "bad.png"))
+    window.image_list = [bad, bad]
+    window.current_index = 1
+    window.display_current_image()
+
+    assert window.image_list == []
+    assert window.image_label.text()
+
+
+def test_added_paths_skip_quarantined(window, image_file, tmp_path):
+    good = image_file("good.png")
+    bad = write_truncated_png(str(tmp_path / "bad.png"))
+    window.quarantine_image(bad)
+    assert window.without_quarantined([bad, good, bad]) == [good]
+
+
+def test_verdict_cache_drops_least_recently_used(monkeypatch, image_file):
+    monkeypatch.setattr(m, "FORMAT_VERDICT_LIMIT", 2)
+    monkeypatch.setattr(m, "format_verdicts", m.OrderedDict())
+    first, second, third = (image_file(f"{name}.png") for name in ("a", "b", "c"))
+
+    assert m.validate_image_file(first) == "png"
+    m.validate_image_file(second)
+    m.validate_image_file(first)  # 再次命中后 second 成为最久未用的
+    m.quarantine_image_file(third)
+
+    assert [key[0] for key in m.format_verdicts] == [first, third]
+    assert m.validate_image_file(third) == ""
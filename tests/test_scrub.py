@@ -0,0 +1,40 @@
+from PyQt5.QtGui import QPixmap
+
+from conftest import ave_mujica as m
+
+
+def start_scrubbing(window, paths):
+    window.image_list = paths
+    window.current_index = 0
+    window.scrubbing = True
+
+
+def no_disk_read(path):
+    raise AssertionError(f"快速浏览时在界面线程读取了缩略图: {path}")
+
+
+def test_scrub_miss_is_handed_to_the_loader(window, image_file, monkeypatch):
+    picture = image_file("a.png")
+    requested = []
+    monkeypatch.setattr(m, "load_thumbnail", no_disk_read)
+    monkeypatch.setattr(window.thumbnail_loader, "request", requested.extend)
+    start_scrubbing(window, [picture])
+
+    window.render_scrub_frame()
+
+    # 界面线程不读磁盘缓存，交给后台读取
+    assert requested == [picture]
+
+
+def test_scrub_uses_thumbnail_in_memory(window, image_file, monkeypatch):
+    picture = image_file("a.png")
+    requested = []
+    monkeypatch.setattr(window.thumbnail_loader, "request", requested.extend)
+    thumbnail = QPixmap(32, 24)
+    window.cache_thumbnail(picture, thumbnail)
+    start_scrubbing(window, [picture])
+
+    window.render_scrub_frame()
+
+    assert requested == []
+    assert window.image_label.pixmap() is not None
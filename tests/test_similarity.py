@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import ave_mujica as m
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def record(path, seed, mtime_ns=1, size=1):
+    rng = np.random.default_rng(seed)
+    return (path, mtime_ns, size, unit(rng.standard_normal(m.SIMILARITY_DIMENSIONS)))
+
+
+def make_index(tmp_path, count=50):
+    index = m.SimilarityIndex(str(tmp_path / "similarity"))
+    index.update([record(f"/img/{i}.jpg", i) for i in range(count)])
+    return index
+
+
+def test_search_returns_query_first_and_sorted(tmp_path):
+    index = make_index(tmp_path)
+    paths = [entry[0] for entry in index.entries]
+    results = index.search(index.vector("/img/7.jpg"), index.rows_for(paths), limit=10)
+    assert results[0][0] == "/img/7.jpg"
+    assert abs(results[0][1] - 1.0) < 1e-5
+    scores = [score for path, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert len(results) == 10
+
+
+def test_search_only_considers_candidate_rows(tmp_path):
+    index = make_index(tmp_path)
+    candidates = ["/img/1.jpg", "/img/2.jpg", "/not/indexed.jpg"]
+    results = index.search(index.vector("/img/7.jpg"), index.rows_for(candidates))
+    assert sorted(path for path, score in results) == ["/img/1.jpg", "/img/2.jpg"]
+
+
+def test_update_replaces_appends_and_removes(tmp_path):
+    index = make_index(tmp_path, count=5)
+    replacement = record("/img/2.jpg", 99, mtime_ns=2)
+    index.update([replacement, record("/img/new.jpg", 100)], removed=["/img/0.jpg"])
+
+    assert len(index) == 5
+    assert "/img/0.jpg" not in index.rows
+    assert np.allclose(index.vector("/img/2.jpg"), replacement[3])
+    assert index.entries[index.rows["/img/2.jpg"]] == ("/img/2.jpg", 2, 1)
+    assert index.vectors.shape == (5, m.SIMILARITY_DIMENSIONS)
+    assert all(index.entries[row][0] == path for path, row in index.rows.items())
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = make_index(tmp_path)
+    index.save()
+    loaded = m.SimilarityIndex(index.directory)
+    loaded.load()
+    assert loaded.entries == index.entries
+    assert np.allclose(loaded.vector("/img/3.jpg"), index.vector("/img/3.jpg"))
+
+
+class InlinePool:
+    # 测试中在本进程内计算特征（spawn 出的进程无法导入按路径加载的主程序）
+    def __init__(self, max_workers=None, mp_context=None):
+        self.pool = m.concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    def __enter__(self):
+        return self.pool.__enter__()
+
+    def __exit__(self, *exc):
+        return self.pool.__exit__(*exc)
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    monkeypatch.setattr(m.concurrent.futures, "ProcessPoolExecutor", InlinePool)
+
+
+def test_query_stats_only_the_query_image(app, inline_pool, tmp_path, image_file, monkeypatch):
+    paths = [image_file(f"s{i}.png", 32, 32, color=(i * 40, 80, 160)) for i in range(4)]
+    index = m.SimilarityIndex(str(tmp_path / "similarity"))
+    m.SimilaritySearchThread(index, paths[0], paths, workers=1).run()
+    assert len(index) == 4
+
+    stat_calls = []
+    real_stat = m.image_stat
+    monkeypatch.setattr(m, "image_stat", lambda path: stat_calls.append(path) or real_stat(path))
+    results = []
+    thread = m.SimilaritySearchThread(index, paths[1], paths, workers=1)
+    thread.search_finished.connect(lambda query, found: results.append(found))
+    thread.run()
+    assert stat_calls == [paths[1]]
+    assert results[0][0] == paths[1]
+
+
+def test_refresh_drops_deleted_entries(app, inline_pool, tmp_path, image_file):
+    paths = [image_file(f"r{i}.png", 32, 32, color=(i * 40, 80, 160)) for i in range(3)]
+    index = m.SimilarityIndex(str(tmp_path / "similarity"))
+    m.SimilaritySearchThread(index, paths[0], paths, workers=1).run()
+    os.remove(paths[2])
+
+    m.SimilaritySearchThread(index, None, paths[:2], workers=1, refresh=True).run()
+    assert sorted(index.rows) == sorted(paths[:2])
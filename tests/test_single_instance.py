@@ -0,0 +1,61 @@
+import os
+import socket
+
+from PyQt5.QtCore import QObject, QDir
+from PyQt5.QtNetwork import QLocalServer
+import pytest
+
+from conftest import ave_mujica as m
+
+
+@pytest.fixture
+def name():
+    name = f"AveMujicaTest-{os.getpid()}"
+    yield name
+    QLocalServer.removeServer(name)
+
+
+def test_second_server_does_not_steal_live_socket(app, name):
+    owner = QObject()
+    first = m.ControlServer(owner, local_name=name)
+    with pytest.raises(OSError):
+        m.ControlServer(owner, local_name=name)
+    assert m.local_server_alive(name)
+    first.close()
+
+
+def test_stale_socket_file_is_replaced(app, name):
+    # 异常退出留下的套接字文件：存在但没有进程在监听
+    path = os.path.join(QDir.tempPath(), name)
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    assert os.path.exists(path) and not m.local_server_alive(name)
+
+    server = m.ControlServer(QObject(), local_name=name)
+    assert m.local_server_alive(name)
+    server.close()
+
+
+def test_hand_off_requires_acknowledgement(app, name, monkeypatch):
+    # 能连接但不应答的实例不算转交成功
+    silent = QLocalServer()
+    assert silent.listen(name)
+    monkeypatch.setattr(m, "single_instance_name", lambda: name)
+    assert not m.hand_off_to_running_instance(["/tmp"], timeout_ms=50)
+    silent.close()
+
+
+def test_opened_folder_does_not_replace_same_named_playlist(window, image_file, tmp_path):
+    picture = image_file("a.png")
+    name = os.path.basename(str(tmp_path))
+    window.playlists[name] = ["/elsewhere/kept.png"]
+
+    assert window.open_paths([str(tmp_path)]) == 1
+    assert window.playlists[name] == ["/elsewhere/kept.png"]
+    assert window.current_playlist == f"{name} (2)"
+    assert window.playlists[f"{name} (2)"] == [picture]
+
+    # 再次打开同一文件夹沿用已打开的列表
+    window.open_paths([str(tmp_path)])
+    assert f"{name} (3)" not in window.playlists
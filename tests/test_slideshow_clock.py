@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import ave_mujica as m
+
+
+def test_clock_deadlines_do_not_drift():
+    clock = m.SlideshowClock(2.0)
+    clock.start(now=100.0)
+    assert clock.next_deadline() == 102.0
+    # 定时器晚了0.3秒触发，下一次截止时间仍按起点计算
+    assert clock.tick(now=102.3) == 1
+    assert clock.next_deadline() == 104.0
+    assert clock.time_until_next(now=102.3) == pytest.approx(1.7)
+
+
+def test_clock_skips_missed_slides():
+    clock = m.SlideshowClock(1.0)
+    clock.start(now=0.0)
+    # 卡顿了3.5秒：跳过错过的张数，按时赶上
+    assert clock.tick(now=3.5) == 3
+    assert clock.next_deadline() == 4.0
+    assert clock.dropped_ticks == 2
+    assert clock.max_lateness == pytest.approx(2.5)
+
+
+def test_clock_external_deadline_restarts_interval():
+    clock = m.SlideshowClock(2.0)
+    clock.start(now=0.0)
+    clock.sync_to(1.5)
+    assert clock.next_deadline() == 1.5
+    assert clock.tick(now=1.5) == 1
+    assert clock.next_deadline() == 3.5